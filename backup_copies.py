@@ -0,0 +1,167 @@
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from copy_manifest import hash_file
+from file_transfer import DirectoryCache, TransferError, copy_stream, part_path_for
+from write_pipeline import LagBudget, MirrorTarget, WritePipeline
+
+logger = logging.getLogger(__name__)
+
+# Called with the (path, hash) of a verified backup, or None and the error
+BackupCallback = Callable[[Optional[Tuple[Path, str]], Optional[Exception]], None]
+
+@dataclass
+class BackupDestination:
+    """Backup root with its own lag budget and finishing queue"""
+    root: Path
+    budget: LagBudget
+    executor: ThreadPoolExecutor
+
+@dataclass
+class BackupMirror:
+    """Backup copy of one file that is being written"""
+    destination: BackupDestination
+    path: Path
+    target: Optional[MirrorTarget]  # None for a copy made only from the primary file
+
+class BackupCopies:
+    """Further copies of every file under backup roots, from a single camera read
+
+    While a file downloads, every buffer is also written to the backup
+    roots through their disk writers. A backup that falls more than
+    `max_lag` bytes behind stops receiving data, so a slow NAS cannot hold
+    back the primary. Each backup is then finished on the queue of its
+    root: missing ranges are copied from the primary file, the result is
+    hashed and must match the hash of the primary.
+    """
+
+    def __init__(self, primary_root: Path, backup_roots: Sequence[Path], pipeline: WritePipeline,
+                 algorithm: str, max_lag: int = 256 * 1024 * 1024):
+        self.primary_root = Path(primary_root)
+        self.pipeline = pipeline
+        self.algorithm = algorithm  # Same as the hash of the primary copy
+        self.directories = DirectoryCache()
+        self.destinations = [
+            BackupDestination(Path(root), LagBudget(max_lag),
+                              ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"backup-{index}"))
+            for index, root in enumerate(backup_roots)
+        ]
+        self._futures: List[Future] = []
+
+    def open(self, target_path: Path) -> List[BackupMirror]:
+        """Open the backups of a file before it is downloaded to `target_path`"""
+        mirrors = []
+        relative = Path(target_path).relative_to(self.primary_root)
+        for destination in self.destinations:
+            path = destination.root / relative
+            self.directories.ensure(path.parent)
+            flags = os.O_RDWR | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+            fd = os.open(part_path_for(path), flags)
+            mirrors.append(BackupMirror(destination, path, self.pipeline.open_mirror(fd, destination.budget)))
+        return mirrors
+
+    def pipeline_for(self, mirrors: Sequence[BackupMirror]):
+        """Pipeline for the download that fans out to the backups"""
+        return self.pipeline.mirrored([mirror.target for mirror in mirrors])
+
+    def abort(self, mirrors: Sequence[BackupMirror]):
+        """Drop the backups of a download that failed, the next attempt rewrites them"""
+        for mirror in mirrors:
+            mirror.target.wait()
+            os.close(mirror.target.fd)
+            part_path_for(mirror.path).unlink(missing_ok=True)
+
+    def finish(self, mirrors: Sequence[BackupMirror], source: Path, size: int,
+               content_hash: str, on_done: Optional[BackupCallback] = None) -> List[Future]:
+        """Complete and verify the backups of a downloaded file on their queues
+
+        Args:
+            on_done: Called on the backup queue when each backup is verified or failed
+
+        Returns:
+            List[Future]: One per backup, resolving to (path, hash) or raising TransferError
+        """
+        futures = [
+            mirror.destination.executor.submit(self._run, on_done, mirror, Path(source), size, content_hash)
+            for mirror in mirrors
+        ]
+        self._futures.extend(futures)
+        return futures
+
+    def copy_existing(self, source: Path, on_done: Optional[BackupCallback] = None) -> List[Future]:
+        """Back up a file that is already at the primary destination, skipping backups that exist"""
+        source = Path(source)
+        size = source.stat().st_size
+        relative = source.relative_to(self.primary_root)
+        mirrors = []
+        for destination in self.destinations:
+            path = destination.root / relative
+            if path.exists() and path.stat().st_size == size:
+                continue
+            mirrors.append(BackupMirror(destination, path, None))
+        return self.finish(mirrors, source, size, '', on_done) if mirrors else []
+
+    def _run(self, on_done: Optional[BackupCallback], mirror: BackupMirror, source: Path, size: int,
+             content_hash: str) -> Tuple[Path, str]:
+        try:
+            result = self._complete(mirror, source, size, content_hash)
+        except Exception as e:
+            if on_done is not None:
+                on_done(None, e)
+            raise
+        if on_done is not None:
+            on_done(result, None)
+        return result
+
+    def _complete(self, mirror: BackupMirror, source: Path, size: int, content_hash: str) -> Tuple[Path, str]:
+        part_path = part_path_for(mirror.path)
+        if mirror.target is None:
+            self.directories.ensure(mirror.path.parent)
+            flags = os.O_RDWR | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+            fd = os.open(part_path, flags)
+            gaps = [(0, size)]
+        else:
+            mirror.target.wait()
+            fd = mirror.target.fd
+            gaps = mirror.target.gaps(size)
+        try:
+            if mirror.target is not None and mirror.target.error is not None:
+                raise TransferError(f"Backup write to {mirror.path} failed: {mirror.target.error}")
+            if gaps and mirror.target is not None:
+                logger.info(f"Backup {mirror.path.name}: copying {sum(end - start for start, end in gaps)} "
+                            f"missed bytes from the primary copy")
+            with open(source, 'rb', buffering=0) as src:
+                for start, end in gaps:
+                    src.seek(start)
+                    copy_stream(src, fd, start, end - start)
+            os.ftruncate(fd, size)
+            os.fsync(fd)
+        except OSError as e:
+            raise TransferError(f"Backup of {source.name} to {mirror.path} failed: {e}") from e
+        finally:
+            os.close(fd)
+
+        expected = content_hash or hash_file(source, self.algorithm)
+        if hash_file(part_path, self.algorithm) != expected:
+            part_path.unlink(missing_ok=True)
+            raise TransferError(f"Backup {mirror.path} does not match the primary copy")
+        os.replace(part_path, mirror.path)
+        return mirror.path, expected
+
+    def wait(self):
+        """Wait for every queued backup to finish"""
+        futures, self._futures = self._futures, []
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass  # Reported through on_done
+
+    def close(self):
+        self.wait()
+        for destination in self.destinations:
+            destination.executor.shutdown()
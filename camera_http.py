@@ -0,0 +1,38 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+CAMERA_PORT = 8080
+
+def create_camera_session(pool_size: int = 10) -> requests.Session:
+    """Create an HTTP session shared by all requests to the cameras
+
+    Args:
+        pool_size: Number of keep-alive connections kept per camera
+
+    Returns:
+        requests.Session: Session with a connection pool sized for the rig
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    return session
+
+def media_list_url(camera_ip: str) -> str:
+    """URL of the media list of a camera"""
+    return f"http://{camera_ip}:{CAMERA_PORT}/gopro/media/list"
+
+def media_file_url(camera_ip: str, folder: str, file_name: str) -> str:
+    """URL of a media file on a camera"""
+    return f"http://{camera_ip}:{CAMERA_PORT}/videos/DCIM/{folder}/{file_name}"
+
+def media_delete_url(camera_ip: str, camera_path: str) -> str:
+    """URL deleting a media file, camera_path being relative to DCIM (100GOPRO/GX010001.MP4)"""
+    return f"http://{camera_ip}:{CAMERA_PORT}/gopro/media/delete/file?path={camera_path}"
+
+def turbo_transfer_url(camera_ip: str, enable: bool) -> str:
+    """URL switching Turbo Transfer on or off"""
+    return f"http://{camera_ip}:{CAMERA_PORT}/gopro/media/turbo_transfer?p={1 if enable else 0}"
+
+def keep_alive_url(camera_ip: str) -> str:
+    """URL of the keep alive message"""
+    return f"http://{camera_ip}:{CAMERA_PORT}/gopro/camera/keep_alive"
@@ -0,0 +1,124 @@
+import logging
+import re
+import shutil
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from file_manager import FileInfo
+
+logger = logging.getLogger(__name__)
+
+# GoPro chaptered video: G + encoding (H - AVC, X - HEVC) + chapter (2 digits) + clip (4 digits)
+CHAPTER_PATTERN = re.compile(r'^G([HX])(\d{2})(\d{4})\.MP4$', re.IGNORECASE)
+
+def parse_chapter(file_name: str) -> Optional[Tuple[str, int, int]]:
+    """Parse a chaptered video name
+
+    Returns:
+        Tuple: (encoding letter, chapter number, clip number) or None for other files
+    """
+    match = CHAPTER_PATTERN.match(file_name)
+    if not match:
+        return None
+    return match.group(1).upper(), int(match.group(2)), int(match.group(3))
+
+def chain_key(camera_id: str, file_name: str) -> Optional[str]:
+    """Identifier of the chain a video chapter belongs to"""
+    parsed = parse_chapter(file_name)
+    if parsed is None:
+        return None
+    encoding, _, clip = parsed
+    return f"{camera_id}_G{encoding}{clip:04d}"
+
+@dataclass
+class ClipChain:
+    """Chapters of one recording on one camera"""
+    id: str
+    camera_id: str
+    clip_number: int
+    chapters: List[FileInfo] = field(default_factory=list)
+
+    @property
+    def size(self) -> int:
+        return sum(f.size for f in self.chapters)
+
+    @property
+    def created_at(self):
+        return self.chapters[0].created_at
+
+    def get_progress(self) -> float:
+        """Progress of the whole recording weighted by chapter size"""
+        total = self.size
+        if not total:
+            return sum(f.progress for f in self.chapters) / max(len(self.chapters), 1)
+        return sum(f.progress * f.size for f in self.chapters) / total
+
+def build_chains(files: Sequence[FileInfo]) -> Dict[str, ClipChain]:
+    """Link the chapters of chaptered videos into chains
+
+    Sets `chain_id` and `chapter` on every chapter and returns the chains
+    with their chapters in recording order. Single-chapter videos form a
+    chain of one.
+    """
+    chains: Dict[str, ClipChain] = {}
+    for file in files:
+        parsed = parse_chapter(file.original_name)
+        if parsed is None:
+            continue
+        _, chapter, clip = parsed
+        file.chain_id = chain_key(file.camera_id, file.original_name)
+        file.chapter = chapter
+        chain = chains.get(file.chain_id)
+        if chain is None:
+            chain = chains[file.chain_id] = ClipChain(file.chain_id, file.camera_id, clip)
+        chain.chapters.append(file)
+
+    for chain in chains.values():
+        chain.chapters.sort(key=lambda f: f.chapter)
+        if len(chain.chapters) > 1:
+            logger.debug(f"Chain {chain.id}: {len(chain.chapters)} chapters")
+    return chains
+
+def concat_chapters(chapter_paths: Sequence[Path], output_path: Path) -> bool:
+    """Join chapters into one file without re-encoding (ffmpeg concat demuxer)"""
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        logger.warning("ffmpeg not found, chapters are not joined")
+        return False
+
+    list_path = output_path.with_suffix('.concat.txt')
+    try:
+        with open(list_path, 'w', encoding='utf-8') as f:
+            for path in chapter_paths:
+                escaped = str(Path(path).resolve()).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        result = subprocess.run(
+            [ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', '-f', 'concat', '-safe', '0',
+             '-i', str(list_path), '-map', '0', '-c', 'copy', str(output_path)],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            logger.error(f"Failed to join chapters into {output_path.name}: {result.stderr.strip()}")
+            return False
+        logger.info(f"Joined {len(chapter_paths)} chapters into {output_path.name}")
+        return True
+    finally:
+        try:
+            list_path.unlink()
+        except OSError:
+            pass
+
+class ChainConcatenator:
+    """Joins copied chains in the background, one ffmpeg process at a time"""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='concat')
+
+    def submit(self, chapter_paths: Sequence[Path], output_path: Path) -> Future:
+        return self._executor.submit(concat_chapters, list(chapter_paths), output_path)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
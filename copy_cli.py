@@ -0,0 +1,98 @@
+# Copyright (c) 2024 Andrii Shramko
+# Contact: zmei116@gmail.com
+# LinkedIn: https://www.linkedin.com/in/andrii-shramko/
+# Tags: #ShramkoVR #ShramkoCamera #ShramkoSoft
+# License: This code is free to use for non-commercial projects.
+# For commercial use, please contact Andrii Shramko at the above email or LinkedIn.
+
+"""Offload the cameras from camera_cache.json without the GUI
+
+Usage: python copy_cli.py [destination] [--no-resume]
+
+Runs the same copy engine as the GUI, so it works on a headless ingest
+server or as a systemd service. SIGINT and SIGTERM cancel the session;
+partial files and the copy journal are kept, so the next run continues.
+Exit code 0 when every file was copied, 1 when some failed, 2 when the
+session could not start and 130 when it was cancelled.
+"""
+
+import argparse
+import logging
+import signal
+import sys
+import time
+from pathlib import Path
+
+from copy_engine import CopyEngine
+from utils import setup_logging
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_LOG_INTERVAL = 5.0  # Seconds between progress lines in the log
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Copy footage from the cameras and sort it into scenes")
+    parser.add_argument("destination", nargs="?", help="Target directory (default: last_target_dir from config.json)")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="List the cameras again instead of continuing an interrupted session")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    engine = CopyEngine()
+    if args.no_resume:
+        engine.config.setdefault("copy_settings", {})["resume_from_journal"] = False
+    destination = args.destination or engine.config.get("last_target_dir")
+    if not destination:
+        parser.error("no destination given and no last_target_dir in config.json")
+
+    result = {}
+    last_report = [0.0]
+
+    def on_status(status: dict):
+        if status.get("status") in ("completed", "cancelled", "error"):
+            result.update(status)
+
+    def on_progress(batch: dict):
+        # Progress batches arrive several times a second, the log gets one line every few seconds
+        if "total_files" not in batch or time.monotonic() - last_report[0] < PROGRESS_LOG_INTERVAL:
+            return
+        last_report[0] = time.monotonic()
+        eta = f", {batch['eta']:.0f}s left" if batch.get("eta") is not None else ""
+        if batch.get("capped"):
+            eta += " (limited by concurrent downloads)"
+        elif batch.get("bottleneck"):
+            eta += f" (slowest camera {batch['bottleneck']})"
+        logger.info(f"Copied {batch['copied_files']} of {batch['total_files']} files, "
+                    f"{batch['failed_files']} failed, {batch['speed'] / 1e6:.1f} MB/s{eta}")
+
+    engine.status_signal.connect(on_status)
+    engine.progress_signal.connect(on_progress)
+    engine.error_signal.connect(lambda message: logger.error(message))
+    engine.scene_signal.connect(lambda scene: logger.info(
+        f"Scene {scene['name']} ready in {scene['scene_dir']}" if scene["complete"] else
+        f"Scene {scene['name']} done with {scene['failed_files']} failed files"))
+
+    def on_signal(signum, frame):
+        logger.info(f"Received signal {signum}, cancelling the copy session")
+        engine.cancel()
+
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+
+    engine.start_copy_session(Path(destination))
+    if engine.copy_thread is None and not result:
+        return 2
+    # Waiting in short steps keeps the main thread responsive to signals
+    while not engine.wait(timeout=0.5):
+        pass
+
+    logger.info(f"Copy session {result.get('status', 'finished')}: {result.get('copied_files', 0)} of "
+                f"{result.get('total_files', 0)} files copied, {result.get('failed_files', 0)} failed")
+    if engine.is_cancelled or result.get("status") == "cancelled":
+        return 130
+    if result.get("status") == "error":
+        return 2
+    return 1 if result.get("failed_files") else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
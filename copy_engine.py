@@ -0,0 +1,1863 @@
+# Copyright (c) 2024 Andrii Shramko
+# Contact: zmei116@gmail.com
+# LinkedIn: https://www.linkedin.com/in/andrii-shramko/
+# Tags: #ShramkoVR #ShramkoCamera #ShramkoSoft
+# License: This code is free to use for non-commercial projects.
+# For commercial use, please contact Andrii Shramko at the above email or LinkedIn.
+
+import json
+import logging
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Dict, Optional
+import time
+import os
+import threading
+import numpy as np
+from functools import partial
+from dataclasses import dataclass, field
+
+from file_manager import FileInfo, SceneInfo, FileStatistics
+from camera_http import create_camera_session, media_file_url
+from media_list_fetcher import iter_media_lists, fetch_media_list, flatten_media_list
+from media_index import MediaIndex
+from scene_clustering import factorize
+from take_matching import match_takes
+from clip_chains import build_chains, ChainConcatenator
+from download_scheduler import DownloadScheduler, ConcurrencyController, global_download_cap, infer_hub
+from write_pipeline import WritePipeline
+from destination_index import DestinationIndex
+from copy_manifest import CopyManifest, ManifestEntry, default_hash_algorithm, new_hasher, hasher_name
+from turbo_transfer import TurboTransferSession, TransferThroughput
+from backup_copies import BackupCopies
+from verified_delete import VerifiedDeleter
+from disk_space import DestinationFull, SpaceLedger, SpaceNeeds, is_disk_full
+from frame_extraction import FrameExtractor, FrameJob, FRAMES_DIR
+from progress_aggregator import ProgressAggregator
+from copy_journal import CopyJournal, file_key, file_record, file_from_entry
+from file_transfer import (download_file, download_file_segmented, copy_local_file,
+                           COPY_BUFFER_SIZE, CHECKPOINT_BYTES, DirectoryCache, SegmentTuner, TransferCancelled)
+
+logger = logging.getLogger(__name__)
+
+class EngineEvent:
+    """Callbacks of one engine event, the plain Python counterpart of a Qt signal
+    
+    Callbacks run in the thread that emits the event; a failing callback
+    is logged and does not stop the copy.
+    """
+    
+    def __init__(self):
+        self._callbacks: List[Callable] = []
+        
+    def connect(self, callback: Callable):
+        self._callbacks.append(callback)
+        
+    def disconnect(self, callback: Callable):
+        self._callbacks.remove(callback)
+        
+    def emit(self, *args):
+        for callback in list(self._callbacks):
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error(f"Event callback {callback} failed: {e}", exc_info=True)
+
+@dataclass
+class SceneInfo:
+    """Information about the scene (group of files)"""
+    id: str
+    name: str
+    created_at: datetime
+    files: List[FileInfo]
+    total_size: int = 0
+    status: str = "pending"  # pending, copying, completed, error
+    has_jpg: bool = False
+    has_gpr: bool = False
+    file_counts: Dict[str, int] = field(default_factory=lambda: {"MP4": 0, "JPG": 0, "GPR": 0})
+    confidence: float = 1.0  # How well the files of the cameras match as one take (0..1)
+    
+    def __post_init__(self):
+        self.total_size = sum(f.size for f in self.files)
+        # Counting the number of files of each type
+        for file in self.files:
+            file_type = file.name.split('.')[-1].upper()
+            if file_type in self.file_counts:
+                self.file_counts[file_type] += 1
+                if file_type == 'JPG':
+                    self.has_jpg = True
+                elif file_type == 'GPR':
+                    self.has_gpr = True
+        
+    def get_clips(self) -> List[List[FileInfo]]:
+        """Logical clips of the scene: all chapters of a recording form one clip"""
+        clips: Dict[str, List[FileInfo]] = {}
+        for index, file in enumerate(self.files):
+            clips.setdefault(file.chain_id or f"file_{index}", []).append(file)
+        return list(clips.values())
+        
+    def get_progress(self) -> float:
+        """Get the overall progress of copying the scene"""
+        if not self.files:
+            return 0.0
+        clips = self.get_clips()
+        clip_progress = []
+        for clip in clips:
+            size = sum(f.size for f in clip)
+            if size:
+                clip_progress.append(sum(f.progress * f.size for f in clip) / size)
+            else:
+                clip_progress.append(sum(f.progress for f in clip) / len(clip))
+        return sum(clip_progress) / len(clips)
+        
+    def create_folder_structure(self, base_path: Path):
+        """Generates directory structure for the scene"""
+        scene_path = base_path / self.name
+        scene_path.mkdir(parents=True, exist_ok=True)
+        
+        # Creates a folder structure for the scene
+        if self.has_jpg and self.file_counts['JPG'] > 0:
+            jpg_path = scene_path / 'JPG'
+            jpg_path.mkdir(exist_ok=True)
+            
+        if self.has_gpr and self.file_counts['GPR'] > 0:
+            gpr_path = scene_path / 'GPR'
+            gpr_path.mkdir(exist_ok=True)
+            
+        return scene_path
+
+class SceneTracker:
+    """Counts the files left per scene and reports each scene once when they are all done"""
+    
+    def __init__(self, on_finished: Callable[[SceneInfo, Path, int, int], None]):
+        self.on_finished = on_finished  # Called with (scene, scene_dir, files, failed)
+        self._scenes: Dict[str, list] = {}  # scene id -> [scene_dir, files, left, failed]
+        self._lock = threading.Lock()
+        
+    def add(self, scene: SceneInfo, scene_dir: Path, files_left: int):
+        """Track a scene; one with nothing left to copy is reported right away"""
+        with self._lock:
+            self._scenes[scene.id] = [scene_dir, files_left, files_left, 0]
+        if files_left == 0:
+            self.on_finished(scene, scene_dir, 0, 0)
+            
+    def file_done(self, scene: SceneInfo, success: bool):
+        with self._lock:
+            state = self._scenes.get(scene.id)
+            if state is None or state[2] == 0:
+                return
+            state[2] -= 1
+            if not success:
+                state[3] += 1
+            if state[2]:
+                return
+        self.on_finished(scene, state[0], state[1], state[3])
+
+class CopyWorker:
+    """Copies the files of a session in its own thread"""
+    
+    def __init__(self, manager, target_dir):
+        # Events for the GUI, the CLI or any other front end
+        self.progress_signal = EngineEvent()  # Copying progress (dict)
+        self.error_signal = EngineEvent()     # Errors (str)
+        self.status_signal = EngineEvent()    # Operation status (dict)
+        self.finished_signal = EngineEvent()  # Completion
+        self.scene_signal = EngineEvent()     # All files of a scene are done (dict)
+        self.manager = manager
+        self.target_dir = target_dir
+        self.is_running = False
+        self.retry_manager = RetryManager()  # Shared by all download lanes
+        self.directories = DirectoryCache()  # Scene folders are created once per session
+        self.probed_sizes: Dict[str, int] = {}  # Sizes asked from the cameras, one probe per file
+        self.destination_index = DestinationIndex.for_root(
+            target_dir, persist=manager.config.get("copy_settings", {}).get("persist_destination_index", True)
+        )  # Files already at the destination, scanned once per session
+        self.manifest = CopyManifest(target_dir)  # Hash of every file copied in this session
+        self.turbo: Optional[TurboTransferSession] = None  # Turbo Transfer of the participating cameras
+        self.backups: Optional[BackupCopies] = manager.create_backup_copies(target_dir)  # Written from the same reads
+        self.deleter: Optional[VerifiedDeleter] = None  # Frees the cards as files are verified
+        self.space: Optional[SpaceLedger] = None  # Free space of the destinations, reserved per file
+        self.frames: Optional[FrameExtractor] = None  # Frames of the videos for training, taken as they land
+        self._full_destinations: set = set()  # Destinations already reported as full
+        self.progress = ProgressAggregator(
+            self.progress_signal.emit,
+            rate_hz=manager.config.get("copy_settings", {}).get("progress_rate_hz", 10),
+            extras=self._progress_extras
+        )  # Per-file counters of the workers, sent to the front end in batches
+        self.journal: Optional[CopyJournal] = manager.journal  # Per-file state for resuming after a crash
+        self._thread: Optional[threading.Thread] = None
+        
+    def start(self):
+        """Run the session in a background thread"""
+        self._thread = threading.Thread(target=self.run, name="copy-session", daemon=True)
+        self._thread.start()
+        
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the session thread, True once it has finished"""
+        thread = self._thread
+        if thread is None:
+            return True
+        if thread is not threading.current_thread():
+            thread.join(timeout)
+        return not thread.is_alive()
+        
+    def run(self):
+        """Start copying in a separate thread"""
+        try:
+            self.is_running = True
+            if self.manager.is_cancelled:
+                logger.info("Copy session cancelled before start")
+                return
+                
+            # Turbo Transfer stays on only while the session runs, whatever way it ends
+            self.turbo = self.manager.create_turbo_session()
+            self.deleter = self.manager.create_verified_deleter()
+            self.frames = self.manager.create_frame_extractor()
+            try:
+                self._copy_files(self.target_dir)
+            finally:
+                self.turbo.stop()
+                if self.backups is not None:
+                    self.backups.close()
+                if self.deleter is not None:
+                    self.deleter.close(drain=not self.manager.is_cancelled)
+                if self.frames is not None:
+                    self.frames.close(cancel=self.manager.is_cancelled)
+                self.manager.transfer_throughput.save()
+                logger.info(f"Throughput per camera (MB/s): {self.manager.transfer_throughput.summary()}")
+            
+        except Exception as e:
+            logger.error(f"Error in copy thread: {e}", exc_info=True)
+            self.error_signal.emit(f"Copy thread failed: {str(e)}")
+        finally:
+            self.is_running = False
+            if self.journal is not None:
+                self.journal.close()
+            if self.manager.is_cancelled:
+                self.status_signal.emit({
+                    "status": "cancelled",
+                    "message": "Copy session cancelled"
+                })
+            self.finished_signal.emit()
+            
+    def _copy_files(self, target_dir: Path):
+        """Internal method for copying files"""
+        try:
+            self.manager.statistics.start()
+            self.destination_index.scan()
+            self._probe_unknown_sizes()
+            
+            # Checking for pause before starting copying
+            while self.manager.is_paused and not self.manager.is_cancelled:
+                time.sleep(0.1)  # Reduce the interval for faster response
+                
+            if self.manager.is_cancelled:
+                logger.info("Copy session cancelled during initial pause")
+                return
+                    
+            # Creating scenes in the GUI and checking existing files
+            for scene in self.manager.scenes:
+                # Checking for operation cancellation
+                if self.manager.is_cancelled:
+                    logger.info("Copy session cancelled during scene preparation")
+                    return
+                    
+                # Checking for pause
+                while self.manager.is_paused and not self.manager.is_cancelled:
+                    time.sleep(0.1)
+                    
+                if self.manager.is_cancelled:
+                    return
+                    
+                scene_files = []
+                scene_dir = self.directories.ensure(target_dir / scene.name)
+                
+                # First, check all files
+                for file in scene.files:
+                    # Determining the subfolder depending on the file type
+                    file_type = file.name.split('.')[-1].upper()
+                    file_name_with_sn = f"{file.camera_id}_{file.name}"
+                    
+                    if file_type == 'JPG':
+                        target_path = scene_dir / 'JPG' / file_name_with_sn
+                    elif file_type == 'GPR':
+                        target_path = scene_dir / 'GPR' / file_name_with_sn
+                    else:
+                        target_path = scene_dir / file_name_with_sn
+                        
+                    # Creating the directory if it does not exist
+                    self.directories.ensure(target_path.parent)
+                    
+                    # Files already offloaded according to the media index need no check
+                    existing = self.destination_index.find(target_path)
+                    if file.status != "completed" and existing is not None:
+                        actual_size = existing.size
+                        camera_ip = self.manager.get_camera_ip(file.camera_id)
+                        if camera_ip:
+                            real_size = self.get_expected_size(camera_ip, file)
+                            if real_size > 0 and actual_size == real_size and target_path.name.startswith(f"{file.camera_id}_"):
+                                file.status = "completed"
+                                file.progress = 100
+                                self.manager.media_index.mark_copied(file.media_key, target_path)
+                                logger.info(f"File already exists with correct size and camera ID: {file_name_with_sn}")
+                    
+                    if self.journal is not None:
+                        self._journal_file(file, scene, target_path)
+                    self.progress.add_file(file_key(file), file.prefixed_name, scene.id, file.camera_id, self._size_of(file),
+                                           "Completed" if file.status == "completed" else "Pending")
+                    scene_files.append((file, file.camera_id, file_key(file)))
+                
+                # Now sending scene information to the GUI with current statuses
+                self.progress_signal.emit({
+                    "add_scene": {
+                        "id": scene.id,
+                        "name": scene.name,
+                        "files": scene_files,
+                        "scene_dir": str(scene_dir)
+                    }
+                })
+                
+                # Checking for pause after adding the scene
+                while self.manager.is_paused and not self.manager.is_cancelled:
+                    time.sleep(0.1)
+            
+            # Creating a list of files for copying
+            all_files = []
+            for scene in self.manager.scenes:
+                scene_dir = target_dir / scene.name
+                for file in scene.files:
+                    if file.status != "completed":  # Skipping already completed files
+                        file.scene_id = scene.id
+                        all_files.append((file, scene_dir, scene))
+
+            self.space = self.manager.create_space_ledger(target_dir, self.backups)
+            if self.space is not None:
+                self._check_space(all_files)
+
+            total_files = len(all_files)
+            counts = {"completed": 0, "failed": 0}
+            counts_lock = threading.Lock()
+
+            # Scenes are reported as soon as their last file is done
+            scene_tracker = SceneTracker(self._scene_finished)
+            for scene in self.manager.scenes:
+                scene_tracker.add(scene, target_dir / scene.name,
+                                  sum(1 for file in scene.files if file.status != "completed"))
+
+            def record_result(scene: SceneInfo, success: bool):
+                scene_tracker.file_done(scene, success)
+                with counts_lock:
+                    if success:
+                        counts["completed"] += 1
+                        self.manager.statistics.copied_files += 1
+                    else:
+                        counts["failed"] += 1
+                        self.manager.statistics.failed_files += 1
+                    # Overall progress goes out with the next progress batch
+                    self.progress.totals["copied_files"] = counts["completed"]
+                    self.progress.totals["failed_files"] = counts["failed"]
+
+            def record_retry(result, error):
+                # A file copied on its retry was counted as failed by its first attempt
+                if not result or error is not None:
+                    return
+                with counts_lock:
+                    counts["completed"] += 1
+                    counts["failed"] -= 1
+                    self.manager.statistics.copied_files += 1
+                    self.manager.statistics.failed_files -= 1
+                    self.progress.totals["copied_files"] = counts["completed"]
+                    self.progress.totals["failed_files"] = counts["failed"]
+            
+            self.progress.totals["total_files"] = total_files
+
+            # Separating files into videos and photos (JPG and GPR)
+            video_files = [(f, d, s) for f, d, s in all_files if f.name.endswith('.MP4')]
+            photo_files = [(f, d, s) for f, d, s in all_files if not f.name.endswith('.MP4')]
+
+            tasks = []  # (scene position, camera_id, task, on_done)
+            scene_order = {scene.id: index for index, scene in enumerate(self.manager.scenes)}
+            for file, scene_dir, scene in photo_files:
+                tasks.append((
+                    scene_order[scene.id], file.camera_id,
+                    partial(self.copy_file, file, scene_dir, scene),
+                    partial(self._record_task, record_result, scene)
+                ))
+            # All chapters of a recording are copied one after another on one lane
+            for chain_files in self._group_video_chains(video_files):
+                tasks.append((scene_order[chain_files[0][2].id], chain_files[0][0].camera_id,
+                              partial(self._copy_chain, chain_files, record_result), None))
+            # By default every camera works through its files scene by scene, so all views
+            # of a take land together; "type" keeps all photos before all videos
+            if self.manager.config.get("copy_settings", {}).get("schedule_order", "scene") == "scene":
+                tasks.sort(key=lambda task: task[0])
+
+            # Every camera works through its own queue so all cameras transfer
+            # at the same time over their own links
+            scheduler = self.manager.create_download_scheduler()
+            for _, camera_id, task, on_done in tasks:
+                scheduler.submit(camera_id, task, on_done)
+            self.progress.model.set_download_cap(
+                scheduler.max_active,
+                self.manager.config.get("copy_settings", {}).get("lanes_per_camera", 2)
+            )
+            # Cameras that have not sent anything yet are estimated from earlier sessions
+            for camera_id in {file.camera_id for file, _, _ in all_files}:
+                turbo = self.turbo is not None and self.turbo.is_enabled(camera_id)
+                self.progress.model.set_prior(camera_id, self.manager.transfer_throughput.rate(camera_id, turbo))
+            self.progress.start()
+            try:
+                scheduler.run()
+                # Failed files get one more pass on the lanes while progress is still reported
+                retries = self._retryable(all_files)
+                if retries and not self.manager.is_cancelled:
+                    logger.info(f"Retrying failed files: {len(retries)}")
+                    for file, scene_dir, scene in retries:
+                        scheduler.submit(file.camera_id, partial(self.copy_file, file, scene_dir, scene), record_retry)
+                    scheduler.run()
+                if self.backups is not None:
+                    self.backups.wait()
+            finally:
+                self.progress.stop()
+            logger.info(f"Write pipeline: {self.manager.write_pipeline.metrics()}")
+            self.destination_index.save()
+            self.manifest.close()
+            
+            completed = counts["completed"]
+            failed = counts["failed"]
+
+            self.manager.statistics.finish()
+            
+            # Sending the final status
+            if self.manager.is_cancelled:
+                self.status_signal.emit({
+                    "status": "cancelled",
+                    "message": "Copy session cancelled",
+                    "total_files": total_files,
+                    "copied_files": completed,
+                    "failed_files": failed,
+                    "duration": self.manager.statistics.get_duration(),
+                    "speed": self.manager.statistics.get_speed()
+                })
+            else:
+                self.status_signal.emit({
+                    "status": "completed",
+                    "message": "Copy session completed",
+                    "total_files": total_files,
+                    "copied_files": completed,
+                    "failed_files": failed,
+                    "duration": self.manager.statistics.get_duration(),
+                    "speed": self.manager.statistics.get_speed()
+                })
+            
+        except Exception as e:
+            logger.error(f"Error in copy session: {e}", exc_info=True)
+            self.error_signal.emit(f"Copy session failed: {str(e)}")
+            self.status_signal.emit({
+                "status": "error",
+                "message": f"Copy session failed: {str(e)}"
+            })
+
+    def _retryable(self, all_files: List[tuple]) -> List[tuple]:
+        """Files of the session that failed and have retries left"""
+        retries = []
+        for file, scene_dir, scene in all_files:
+            attempt = self.retry_manager.failed_files.get(f"{file.camera_id}_{file.name}")
+            if file.status != "completed" and attempt is not None and attempt['attempts'] < self.retry_manager.max_retries:
+                retries.append((file, scene_dir, scene))
+        return retries
+
+    def _progress_extras(self) -> dict:
+        """Pipeline and concurrency state for the progress batches"""
+        extras = {"pipeline": self.manager.write_pipeline.metrics()}
+        if self.manager.concurrency is not None:
+            self.manager.statistics.concurrency = self.manager.concurrency.snapshot()
+            extras["concurrency"] = self.manager.statistics.concurrency
+        if self.deleter is not None:
+            extras["deleted_files"] = self.deleter.deleted
+        return extras
+
+    def _space_needs(self, file: FileInfo, size: int) -> SpaceNeeds:
+        """Bytes a file still has to write on the primary and every backup root"""
+        entry = self.journal.entries.get(file_key(file)) if self.journal is not None else None
+        on_disk = entry.offset if entry is not None and not entry.finished else 0
+        needs = [(self.target_dir, max(size - on_disk, 0))]
+        if self.backups is not None:
+            needs.extend((destination.root, size) for destination in self.backups.destinations)
+        return needs
+        
+    def _check_space(self, all_files: List[tuple]):
+        """Tell the operator up front which scenes the destinations have no room for
+        
+        Files whose size the cameras did not report are counted at the
+        largest known size of their type, not as empty.
+        """
+        largest: Dict[str, int] = {}
+        for file, _, _ in all_files:
+            file_type = file.original_name.rsplit('.', 1)[-1].upper()
+            largest[file_type] = max(largest.get(file_type, 0), self._size_of(file))
+        scenes: Dict[str, tuple] = {}
+        estimated = 0
+        for file, _, scene in all_files:
+            size = self._size_of(file)
+            if not size:
+                size = largest.get(file.original_name.rsplit('.', 1)[-1].upper()) or max(largest.values(), default=0)
+                estimated += 1
+            scenes.setdefault(scene.id, (scene.name, []))[1].append(self._space_needs(file, size))
+        if estimated:
+            logger.warning(f"Size of {estimated} files unknown, counted at the largest size of their type")
+        plan = self.space.plan(scenes.values())
+        for destination, needed in plan.needed.items():
+            logger.info(f"Space on {destination}: {needed / 1e9:.2f} GB needed, "
+                        f"{plan.available[destination] / 1e9:.2f} GB available")
+        if not plan.fits:
+            message = (f"Not enough free space for {len(plan.unfit_scenes)} of {len(scenes)} scenes, "
+                       f"copying stops when the disk is full. Scenes that will not fit: "
+                       f"{', '.join(plan.unfit_scenes)}")
+            logger.error(message)
+            self.error_signal.emit(message)
+            
+    def _refuse_no_space(self, file: FileInfo, journal_key: str, destination: str) -> bool:
+        """Leave a file on the camera because a destination is full"""
+        file.status = "error"
+        file.error_message = f"Not enough space on {destination}"
+        if destination not in self._full_destinations:
+            self._full_destinations.add(destination)
+            self.error_signal.emit(f"Destination {destination} is full, the remaining files are not copied")
+        if self.journal is not None:
+            self.journal.failed(journal_key, file.error_message)
+        self.progress.set_status(journal_key, "Failed")
+        return False
+        
+    def _journal_file(self, file: FileInfo, scene: SceneInfo, target_path: Path):
+        """Add a file of the session to the journal, files restored from it are already there"""
+        key = file_key(file)
+        entry = self.journal.entries.get(key)
+        if entry is None:
+            scene_record = {
+                "id": scene.id,
+                "name": scene.name,
+                "created_at": scene.created_at.isoformat(),
+                "confidence": scene.confidence
+            }
+            self.journal.queued(key, file_record(file), scene_record, target_path, self._size_of(file))
+            entry = self.journal.entries[key]
+        if file.status == "completed" and not entry.finished:
+            self.journal.verified(key, self._size_of(file))
+
+    def _group_video_chains(self, video_files: List[tuple]) -> List[List[tuple]]:
+        """Grouping video files into chains so that the chapters of a recording are copied contiguously"""
+        chains: Dict[str, List[tuple]] = {}
+        for index, item in enumerate(video_files):
+            file = item[0]
+            chains.setdefault(file.chain_id or f"file_{index}", []).append(item)
+        for chain_files in chains.values():
+            chain_files.sort(key=lambda item: item[0].chapter)
+        return list(chains.values())
+        
+    def _copy_chain(self, chain_files: List[tuple], record_result) -> bool:
+        """Copying the chapters of a recording in order"""
+        chain_ok = True
+        for file, scene_dir, scene in chain_files:
+            if self.manager.is_cancelled:
+                return False
+            try:
+                success = self.copy_file(file, scene_dir, scene)
+            except Exception as e:
+                logger.error(f"Error copying video file: {e}")
+                success = False
+            chain_ok = chain_ok and success
+            record_result(scene, success)
+            if success and self.frames is not None:
+                self._extract_frames(file, scene_dir, scene)
+            
+        if chain_ok and not self.manager.is_cancelled:
+            self._concat_chain(chain_files)
+        return chain_ok
+        
+    @staticmethod
+    def _record_task(record_result, scene: SceneInfo, result, error):
+        """Done callback of a single-file download task"""
+        record_result(scene, bool(result) and error is None)
+        
+    def _scene_finished(self, scene: SceneInfo, scene_dir: Path, files: int, failed: int):
+        """Report a scene whose files are all done, so processing of the take can start"""
+        scene.status = "error" if failed else "completed"
+        if failed:
+            logger.warning(f"Scene {scene.name} finished with {failed} of {files} files failed")
+        else:
+            logger.info(f"Scene {scene.name} complete: {len(scene.files)} files in {scene_dir}")
+        self.scene_signal.emit({
+            "id": scene.id,
+            "name": scene.name,
+            "scene_dir": str(scene_dir),
+            "files": len(scene.files),
+            "failed_files": failed,
+            "complete": not failed
+        })
+        
+    def _extract_frames(self, file: FileInfo, scene_dir: Path, scene: SceneInfo):
+        """Queue a copied video for frame extraction, timed against the start of its scene"""
+        offsets = self.manager.clock_offsets
+        scene_start = min(f.created_at.timestamp() - offsets.get(f.camera_id, 0.0) for f in scene.files)
+        video_start = file.created_at.timestamp() - offsets.get(file.camera_id, 0.0)
+        self.frames.submit(FrameJob(
+            video=scene_dir / file.prefixed_name,
+            camera_id=file.camera_id,
+            frames_root=scene_dir / FRAMES_DIR,
+            start=max(video_start - scene_start, 0.0)
+        ))
+        
+    def _concat_chain(self, chain_files: List[tuple]):
+        """Joining a fully copied chain in the background if enabled"""
+        if len(chain_files) < 2 or not self.manager.config.get("copy_settings", {}).get("concat_chapters", False):
+            return
+        first_file, scene_dir, _ = chain_files[0]
+        chapter_paths = [scene_dir / file.prefixed_name for file, _, _ in chain_files]
+        output_path = scene_dir / f"{first_file.chain_id}_joined.MP4"
+        self.manager.concatenator.submit(chapter_paths, output_path)
+        
+    def get_expected_size(self, camera_ip: str, file_info: FileInfo) -> int:
+        """Size a copy is checked against
+        
+        The media list size is trusted; the camera is asked (once per file)
+        only when the size is unknown or copy_settings.verify_size_with_camera is set.
+        """
+        verify = self.manager.config.get("copy_settings", {}).get("verify_size_with_camera", False)
+        if file_info.size > 0 and not verify:
+            return file_info.size
+        file_id = f"{file_info.camera_id}_{file_info.name}"
+        if file_id not in self.probed_sizes:
+            self.probed_sizes[file_id] = self.get_file_size_from_camera(camera_ip, file_info)
+        return self.probed_sizes[file_id] or file_info.size
+        
+    def _size_of(self, file: FileInfo) -> int:
+        """Size from the media list or from the camera, 0 while it is unknown"""
+        return file.size or self.probed_sizes.get(f"{file.camera_id}_{file.name}", 0)
+        
+    def _probe_unknown_sizes(self):
+        """Ask the cameras for the sizes the media list leaves out (members of groups), in parallel"""
+        unknown = [file for scene in self.manager.scenes for file in scene.files
+                   if not file.size and file.status != "completed"]
+        if not unknown:
+            return
+        
+        def probe(file: FileInfo):
+            camera_ip = self.manager.get_camera_ip(file.camera_id)
+            if camera_ip:
+                self.get_expected_size(camera_ip, file)
+        
+        with ThreadPoolExecutor(max_workers=8, thread_name_prefix="size-probe") as executor:
+            list(executor.map(probe, unknown))
+        missing = sum(1 for file in unknown if not self._size_of(file))
+        logger.info(f"Asked the cameras for the size of {len(unknown)} files in groups"
+                    + (f", {missing} still unknown" if missing else ""))
+        
+    def get_file_size_from_camera(self, camera_ip: str, file_info: FileInfo) -> int:
+        """Obtain the file size from the camera."""
+        # For the request to the camera, we use the original path, as the camera does not know about prefixes
+        camera_path = file_info.path.split('DCIM/')[1]  # Path relative to DCIM for the request to the camera
+        url = f"http://{camera_ip}:8080/videos/DCIM/{camera_path}"
+        try:
+            response = self.manager.http_session.head(url, timeout=5)
+            if response.status_code == 200:
+                return int(response.headers.get('Content-Length', 0))
+            else:
+                logging.error(f"Failed to get file size for {file_info.prefixed_name} from camera {camera_ip}: {response.status_code}")
+                return 0
+        except Exception as e:
+            logging.error(f"Error getting file size for {file_info.prefixed_name} from camera {camera_ip}: {e}")
+            return 0
+
+    def check_file_exists(self, file: FileInfo, target_dir: Path) -> bool:
+        """Checking file existence"""
+        file_path = target_dir / file.prefixed_name
+        existing = self.destination_index.find(file_path)
+        if existing is not None:
+            # Checking camera_id in the file name
+            file_camera_id = file_path.name.split('_')[0]
+            if file_camera_id != file.camera_id:
+                logger.warning(f"Camera ID mismatch for {file.prefixed_name}: expected {file.camera_id}, got {file_camera_id}")
+                try:
+                    file_path.unlink()
+                    self.destination_index.remove(file_path)
+                    logger.info(f"Removed file with incorrect camera ID: {file.prefixed_name}")
+                except Exception as e:
+                    logger.error(f"Failed to remove file {file.prefixed_name}: {e}")
+                return False
+            
+            # Getting the camera's IP address
+            camera_ip = self.manager.get_camera_ip(file.camera_id)
+            if not camera_ip:
+                logger.warning(f"Could not get camera IP for {file.camera_id}")
+                return False
+
+            # Checking file size
+            actual_size = existing.size
+            expected_size = self.get_expected_size(camera_ip, file)
+            if actual_size != expected_size:
+                logger.warning(f"Size mismatch for {file.prefixed_name}: expected {expected_size}, got {actual_size}")
+                try:
+                    file_path.unlink()
+                    self.destination_index.remove(file_path)
+                    logger.info(f"Removed file with incorrect size: {file.prefixed_name}")
+                except Exception as e:
+                    logger.error(f"Failed to remove file {file.prefixed_name}: {e}")
+                return False
+
+            # Checking the file hash
+            camera_hash = self.get_file_hash_from_camera(camera_ip, file)
+            local_hash = self.get_local_file_hash(file_path)
+            
+            if camera_hash and local_hash and camera_hash == local_hash:
+                logger.info(f"File already exists with correct hash: {file.prefixed_name}")
+                return True
+            else:
+                logger.warning(f"Hash mismatch for {file.prefixed_name}")
+                try:
+                    file_path.unlink()
+                    self.destination_index.remove(file_path)
+                    logger.info(f"Removed file with incorrect hash: {file.prefixed_name}")
+                except Exception as e:
+                    logger.error(f"Failed to remove file {file.prefixed_name}: {e}")
+                return False
+        return False
+
+    def copy_file(self, file: FileInfo, target_dir: Path, scene: SceneInfo) -> bool:
+        """Copying a single file with progress tracking"""
+        if not hasattr(self, 'retry_manager'):
+            self.retry_manager = RetryManager()
+
+        camera_ip = self.manager.get_camera_ip(file.camera_id)
+        
+        # Checking the possibility of a retry
+        file_id = f"{file.camera_id}_{file.name}"
+        if file_id in self.retry_manager.failed_files:
+            if self.retry_manager.failed_files[file_id]['attempts'] >= self.retry_manager.max_retries:
+                logger.warning(f"Max retries exceeded for {file.prefixed_name}")
+                return False
+            # Waiting for the required time before the next retry
+            time_since_last = time.time() - self.retry_manager.failed_files[file_id]['last_try']
+            required_delay = self.retry_manager.retry_delay * (2 ** (self.retry_manager.failed_files[file_id]['attempts'] - 1))
+            if time_since_last < required_delay:
+                time.sleep(required_delay - time_since_last)
+
+        reported = {'bytes': None, 'journalled': 0}
+        journal_key = file_key(file)
+        try:
+            if self.manager.is_cancelled:
+                logger.info(f"Copy of {file.prefixed_name} cancelled before start")
+                return False
+            
+            while self.manager.is_paused:
+                time.sleep(0.5)
+                if self.manager.is_cancelled:
+                    return False
+
+            if not camera_ip:
+                raise Exception(f"Camera IP not found for {file.camera_id}")
+            
+            camera_path = file.path.split('DCIM/')[1]
+            file_url = f"http://{camera_ip}:8080/videos/DCIM/{camera_path}"
+            if not file_url:
+                raise Exception(f"File URL is empty for {file.prefixed_name}")
+            
+            file_type = file.original_name.split('.')[-1].upper()
+            if file_type in ['JPG', 'GPR']:
+                target_path = target_dir / file_type / file.prefixed_name
+            else:
+                target_path = target_dir / file.prefixed_name
+            
+            self.directories.ensure(target_path.parent)
+            
+            # Checking the existing file by size and hash
+            existing = self.destination_index.find(target_path)
+            if existing is not None:
+                actual_size = existing.size
+                real_size = self.get_expected_size(camera_ip, file)
+                if real_size > 0 and actual_size == real_size:
+                    logger.info(f"File already exists with correct size: {file.prefixed_name}")
+                    file.status = "completed"
+                    file.progress = 100
+                    if self.journal is not None:
+                        self.journal.verified(journal_key, actual_size)
+                    self.manager.media_index.mark_copied(file.media_key, target_path)
+                    if self.backups is not None:
+                        self.backups.copy_existing(target_path,
+                                                   partial(self._backup_done, file, camera_path, time.time()))
+                    self.progress.set_status(journal_key, "Completed", actual_size)
+                    return True
+                else:
+                    target_path.unlink(missing_ok=True)
+                    self.destination_index.remove(target_path)
+
+            # Copying the file, continuing a partial download of an earlier attempt
+            timeout = 30 if file.original_name.endswith('.MP4') else 10
+            
+            # The GET itself reports Content-Length, the media list size is enough up front
+            total_size = self.get_expected_size(camera_ip, file)
+            
+            # Space is reserved before the download starts, a full disk admits no further files
+            on_size = None
+            if self.space is not None and total_size:
+                full = self.space.reserve(journal_key, self._space_needs(file, total_size))
+                if full is not None:
+                    return self._refuse_no_space(file, journal_key, full)
+            elif self.space is not None:
+                # The camera did not tell the size up front, the GET's Content-Length is reserved instead
+                def on_size(size: int):
+                    full = self.space.reserve(journal_key, self._space_needs(file, size))
+                    if full is not None:
+                        raise DestinationFull(full)
+            
+            if self.journal is not None:
+                self.journal.started(journal_key)
+            
+            def report_progress(downloaded_size: int, size: int):
+                # The first report of a resumed download includes what was already on disk
+                if self.manager.concurrency is not None and reported['bytes'] is not None:
+                    self.manager.concurrency.record(file.camera_id, downloaded_size - reported['bytes'])
+                reported['bytes'] = downloaded_size
+                if self.journal is not None and downloaded_size - reported['journalled'] >= CHECKPOINT_BYTES:
+                    reported['journalled'] = downloaded_size
+                    self.journal.checkpoint(journal_key, downloaded_size)
+                file.progress = int((downloaded_size / (size or total_size)) * 100)
+                self.progress.update(journal_key, downloaded_size)
+            
+            copy_settings = self.manager.config.get("copy_settings", {})
+            segmented_min_size = copy_settings.get("segmented_min_size_mb", 256) * 1024 * 1024
+            # The content hash is computed while the data streams through
+            hasher = new_hasher(copy_settings.get("hash_algorithm", "auto"))
+            copy_started = time.time()
+            # Backups are written from the same buffers, the camera is read once
+            mirrors = self.backups.open(target_path) if self.backups is not None else []
+            pipeline = self.backups.pipeline_for(mirrors) if mirrors else self.manager.write_pipeline
+            try:
+                if total_size >= segmented_min_size:
+                    # Large chapters are fetched as several Range segments in parallel
+                    started = time.monotonic()
+                    size = download_file_segmented(
+                        self.manager.http_session, file_url, target_path, total_size,
+                        segments=self.manager.segment_tuner.segments_for(file.camera_id),
+                        timeout=timeout,
+                        progress_cb=report_progress,
+                        should_stop=lambda: self.manager.is_cancelled,
+                        pipeline=pipeline,
+                        hasher=hasher
+                    )
+                    self.manager.segment_tuner.record(file.camera_id, size, time.monotonic() - started)
+                else:
+                    size = download_file(
+                        self.manager.http_session, file_url, target_path,
+                        expected_size=total_size,
+                        timeout=timeout,
+                        progress_cb=report_progress,
+                        should_stop=lambda: self.manager.is_cancelled,
+                        pipeline=pipeline,
+                        hasher=hasher,
+                        on_size=on_size
+                    )
+            except BaseException:
+                if mirrors:
+                    self.backups.abort(mirrors)
+                raise
+            self.manager.transfer_throughput.record(
+                file.camera_id, self.turbo is not None and self.turbo.is_enabled(file.camera_id),
+                size, time.time() - copy_started
+            )
+            self.manager.statistics.add_copied(size)
+            content_hash = hasher.hexdigest()
+            self.manifest.record(ManifestEntry(
+                serial=file.camera_id,
+                source=camera_path,
+                size=size,
+                hash=content_hash,
+                algorithm=hasher_name(hasher),
+                dest=str(target_path),
+                started=copy_started,
+                finished=time.time()
+            ))
+            if self.journal is not None:
+                self.journal.verified(journal_key, size, content_hash)
+            if self.deleter is not None:
+                self.deleter.track(journal_key, file.camera_id, camera_path, target_path, size, content_hash,
+                                   file.media_key, backups=len(mirrors))
+            if mirrors:
+                self.backups.finish(mirrors, target_path, size, content_hash,
+                                    partial(self._backup_done, file, camera_path, copy_started))
+            file.status = "completed"
+            file.progress = 100
+            self.progress.set_status(journal_key, "Completed", size)
+            self.manager.media_index.mark_copied(file.media_key, target_path)
+            self.destination_index.add(target_path)
+            
+            # Successful copy - removing from failed_files
+            if file_id in self.retry_manager.failed_files:
+                del self.retry_manager.failed_files[file_id]
+            
+            logger.info(f"Successfully copied {file.prefixed_name}")
+            return True
+
+        except DestinationFull as e:
+            return self._refuse_no_space(file, journal_key, e.destination)
+            
+        except TransferCancelled:
+            logger.info(f"Copy of {file.prefixed_name} cancelled, partial file kept for resuming")
+            if self.journal is not None and reported['bytes']:
+                self.journal.checkpoint(journal_key, reported['bytes'])
+            self.progress.set_status(journal_key, "Cancelled")
+            return False
+            
+        except Exception as e:
+            logger.error(f"Error copying {file.prefixed_name}: {e}")
+            # Retrying on a full disk only fails again
+            if is_disk_full(e) and self.space is not None:
+                full = self.space.mark_full(target_path)
+                if full is not None:
+                    return self._refuse_no_space(file, journal_key, full)
+            # Registering a failed attempt (a partial download is kept and resumed on retry)
+            if file_id not in self.retry_manager.failed_files:
+                self.retry_manager.failed_files[file_id] = {'attempts': 0, 'last_try': 0}
+            self.retry_manager.failed_files[file_id]['attempts'] += 1
+            self.retry_manager.failed_files[file_id]['last_try'] = time.time()
+            if self.journal is not None:
+                self.journal.failed(journal_key, str(e))
+            self.progress.set_status(journal_key, "Failed")
+            try:
+                self.manager.media_index.mark_failed(file.media_key)
+            except Exception as index_error:
+                logger.warning(f"Failed to update media index for {file.prefixed_name}: {index_error}")
+            return False
+
+    def _backup_done(self, file: FileInfo, camera_path: str, started: float, result, error):
+        """Record a verified backup copy in the manifest, or report why it failed"""
+        if error is not None:
+            logger.error(f"Backup of {file.prefixed_name} failed: {error}")
+            self.error_signal.emit(f"Backup of {file.prefixed_name} failed: {error}")
+            if self.deleter is not None:
+                self.deleter.backup_failed(file_key(file))
+            return
+        backup_path, content_hash = result
+        self.manifest.record(ManifestEntry(
+            serial=file.camera_id,
+            source=camera_path,
+            size=backup_path.stat().st_size,
+            hash=content_hash,
+            algorithm=self.backups.algorithm,
+            dest=str(backup_path),
+            started=started,
+            finished=time.time()
+        ))
+        logger.info(f"Backup verified: {backup_path}")
+        if self.deleter is not None:
+            self.deleter.backup_verified(file_key(file))
+
+    def _copy_file(self, source: Path, target: Path, file_info):
+        """Copying a single file with progress tracking"""
+        try:
+            if self.manager.is_cancelled:
+                logger.info(f"Copy of {source.name} cancelled before start")
+                return False
+                
+            # Checking for pause before starting file copy
+            while self.manager.is_paused and not self.manager.is_cancelled:
+                time.sleep(0.1)
+                
+            if self.manager.is_cancelled:
+                logger.info(f"Copy of {source.name} cancelled during pause")
+                return False
+                
+            # Creating parent directories
+            self.directories.ensure(target.parent)
+            
+            file_size = source.stat().st_size
+            copied = 0
+            
+            def on_chunk(size: int):
+                nonlocal copied
+                copied += size
+                progress = int((copied / file_size) * 100) if file_size else 100
+                file_info.progress = progress
+                # Sending an update to the GUI
+                self.progress_signal.emit({
+                    "update_file": {
+                        "scene_id": file_info.scene_id,
+                        "name": file_info.name,
+                        "progress": progress
+                    }
+                })
+            
+            def should_stop() -> bool:
+                # Checking for pause
+                while self.manager.is_paused and not self.manager.is_cancelled:
+                    time.sleep(0.1)
+                return self.manager.is_cancelled
+            
+            try:
+                copy_local_file(source, target, on_chunk=on_chunk, should_stop=should_stop,
+                                pipeline=self.manager.write_pipeline)
+            except TransferCancelled:
+                logger.info(f"Copy of {source.name} cancelled during copy")
+                return False
+                    
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error copying {source.name}: {e}")
+            return False
+
+class CopyEngine:
+    """File copy manager for cameras, without any GUI dependency
+    
+    Front ends connect to `progress_signal`, `error_signal`,
+    `status_signal` and `scene_signal` and call `start_copy_session`, `pause`, `resume` and
+    `cancel`. Events are emitted from the copy threads.
+    """
+    
+    def __init__(self, max_workers: int = 4):
+        # Events for the GUI, the CLI or any other front end
+        self.progress_signal = EngineEvent()  # Copying progress (dict)
+        self.error_signal = EngineEvent()     # Errors (str)
+        self.status_signal = EngineEvent()    # Operation status (dict)
+        self.scene_signal = EngineEvent()     # All files of a scene are done (dict)
+        self.config = self.load_config()
+        self.max_workers = self.config.get("copy_settings", {}).get("max_workers", max_workers)
+        self.statistics = FileStatistics()
+        self.scenes: List[SceneInfo] = []
+        self.current_session: Optional[Path] = None
+        self.is_paused = False
+        self.is_cancelled = False
+        self.failed_files = []  # List of failed copies for retry attempts
+        self.temp_files = []    # List of temporary files for cleanup
+        self.journal: Optional[CopyJournal] = None  # Per-file state of the session in the destination
+        self.camera_ips = {}    # Dictionary for storing camera IP addresses
+        self.http_session = create_camera_session(pool_size=32)  # Shared by all camera requests
+        self.media_index = MediaIndex()  # Offload status of every file across sessions
+        self.concatenator = ChainConcatenator()  # Joins chaptered recordings in the background
+        self.clock_offsets: Dict[str, float] = {}  # Seconds per camera, from the last grouping into scenes
+        self.segment_tuner = SegmentTuner(
+            max_segments=self.config.get("copy_settings", {}).get("max_segments", 4)
+        )  # Connections per large file, tuned per camera
+        self.concurrency: Optional[ConcurrencyController] = None  # Adaptive transfers per camera and hub
+        self.transfer_throughput = TransferThroughput()  # MB/s per camera with and without Turbo Transfer
+        self.write_pipeline = WritePipeline(
+            buffers=self.config.get("copy_settings", {}).get("write_buffers", 32) + self._backup_buffers(),
+            buffer_size=COPY_BUFFER_SIZE
+        )  # Disk writes run on one thread per destination device
+        
+        # Initialization of the thread and timer
+        self.copy_thread = None
+        
+    def load_config(self) -> dict:
+        """Loading configuration"""
+        try:
+            config_path = Path("config.json")
+            if config_path.exists():
+                with open(config_path, "r") as f:
+                    return json.load(f)
+            else:
+                # Default values
+                default_config = {
+                    "scene_settings": {
+                        "max_interval_seconds": 300,
+                        "clock_offsets": {},  # Measured offsets per camera serial in seconds
+                        "estimate_clock_offsets": True
+                    },
+                    "copy_settings": {
+                        "max_workers": 4,
+                        "retry_count": 3,
+                        "retry_delay": 5,
+                        "concat_chapters": False,  # Join chaptered recordings after copying (needs ffmpeg)
+                        "lanes_per_camera": 2,
+                        "host_throughput_mb_s": 400,  # What the target disk and USB controllers can sink
+                        "camera_link_mb_s": 40,
+                        "segmented_min_size_mb": 256,  # Files from this size are downloaded in segments
+                        "max_segments": 4,
+                        "write_buffers": 32,  # Buffers shared by readers and disk writers (4 MB each)
+                        "verify_size_with_camera": False,  # One HEAD per file instead of trusting the media list
+                        "persist_destination_index": True,  # Keep the destination listing between sessions
+                        "hash_algorithm": "auto",  # xxh3_128 / blake3 when installed, else blake2b
+                        "turbo_transfer": True,  # Turbo Transfer on the cameras while a session runs
+                        "adaptive_concurrency": True,  # Transfers per camera/hub follow measured throughput
+                        "max_downloads_per_camera": 4,
+                        "camera_hubs": {},  # camera serial -> hub name, overrides the hub inferred from the IP
+                        "resume_from_journal": True,  # Continue an interrupted session without listing the cameras
+                        "journal_sync_interval": 1.0,  # Seconds between fsyncs of the copy journal
+                        "backup_enabled": False,  # Write every file to the backup path(s) too
+                        "backup_path": "",  # One path or a list of paths
+                        "backup_buffer_mb": 256,  # How far a backup may lag before it is finished from the primary
+                        "progress_rate_hz": 10,  # Progress batches per second sent to the GUI
+                        "delete_after_copy": False,  # Delete files from the cameras once every copy is verified
+                        "delete_interval": 0.5,  # Seconds between deletes on one camera while downloading
+                        "delete_reread_primary": True,  # Hash the primary copy again from disk before deleting
+                        "schedule_order": "scene",  # "scene": take by take across the cameras, "type": photos first
+                        "check_free_space": True,  # Check the destinations before copying and stop before they fill
+                        "min_free_space_mb": 1024,  # Space always left free on every destination disk
+                        "extract_frames": False,  # Extract frames from every copied video (ffmpeg or PyAV)
+                        "frame_rate": 2,  # Frames per second of video
+                        "frame_workers": 2,  # Videos decoded at once next to the copy
+                        "frame_threads": 2,  # Decoder threads per video
+                        "frame_layout": "camera",  # "camera": frames/<camera>/<ms>, "time": frames/<ms>/<camera>
+                        "frame_format": "jpg"
+                    },
+                    "last_target_dir": str(Path.home() / "Downloads")  # Default path
+                }
+                # Saving the default configuration
+                with open(config_path, "w") as f:
+                    json.dump(default_config, f, indent=4)
+                return default_config
+        except Exception as e:
+            logger.error(f"Error loading config: {e}")
+            return {}
+        
+    def save_target_dir(self, target_dir: Path):
+        """Saving the last selected directory"""
+        try:
+            config_path = Path("config.json")
+            config = self.config
+            config["last_target_dir"] = str(target_dir)
+            
+            with open(config_path, "w") as f:
+                json.dump(config, f, indent=4)
+            logger.info(f"Saved last target directory: {target_dir}")
+            
+        except Exception as e:
+            logger.error(f"Error saving target directory: {e}")
+
+    def start_copy_session(self, target_dir: Path):
+        """Starting the copy process"""
+        try:
+            # Saving the selected directory
+            self.save_target_dir(target_dir)
+            
+            # Resetting state flags
+            self.is_paused = False
+            self.is_cancelled = False
+            self.failed_files.clear()
+            self.temp_files.clear()
+            
+            # An interrupted session continues from its journal, otherwise the cameras are listed
+            if not self.restore_journal_session(target_dir):
+                if not self.prepare_copy_session(target_dir):
+                    return
+                self.journal.start_session({
+                    "started": datetime.now().isoformat(),
+                    "target_dir": str(target_dir),
+                    "camera_ips": self.camera_ips
+                })
+                
+            self._start_copy_thread(target_dir)
+            
+        except Exception as e:
+            logger.error(f"Error starting copy: {e}", exc_info=True)
+            self.error_signal.emit(f"Failed to start copy: {str(e)}")
+            self.status_signal.emit({
+                "status": "error",
+                "message": f"Failed to start copy: {str(e)}"
+            })
+            
+    def _start_copy_thread(self, target_dir: Path):
+        """Creating and starting the copy thread"""
+        self.copy_thread = CopyWorker(self, target_dir)
+        
+        # Connecting signals
+        self.copy_thread.progress_signal.connect(self.progress_signal.emit)
+        self.copy_thread.error_signal.connect(self.error_signal.emit)
+        self.copy_thread.status_signal.connect(self.status_signal.emit)
+        self.copy_thread.scene_signal.connect(self.scene_signal.emit)
+        self.copy_thread.finished_signal.connect(self._on_copy_finished)
+        
+        # Starting the copy process
+        self.copy_thread.start()
+        
+    def open_journal(self, target_dir: Path) -> CopyJournal:
+        """Open the copy journal of a destination, replaying what it recorded"""
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = CopyJournal.for_target(
+            target_dir,
+            sync_interval=self.config.get("copy_settings", {}).get("journal_sync_interval", 1.0)
+        )
+        return self.journal
+        
+    def restore_journal_session(self, target_dir: Path) -> bool:
+        """Rebuild an interrupted session from the copy journal of the destination
+        
+        Scenes and files of the interrupted session come from the journal.
+        Verified files are marked completed, partial downloads continue from
+        their checkpoints. Files that failed do not make a session
+        resumable on their own: when nothing is queued or in progress the
+        cameras are listed as usual. The cameras that can be reached are
+        listed too, and what they recorded since becomes new scenes.
+        
+        Returns:
+            bool: True if there was an unfinished session to restore
+        """
+        journal = self.open_journal(target_dir)
+        if not self.config.get("copy_settings", {}).get("resume_from_journal", True):
+            return False
+        resumable = journal.resumable()
+        if not resumable:
+            return False
+        
+        scenes: Dict[str, SceneInfo] = {}
+        files: List[FileInfo] = []
+        for entry in journal.entries.values():
+            file = file_from_entry(entry)
+            file.scene_id = entry.scene["id"]
+            scene = scenes.get(file.scene_id)
+            if scene is None:
+                scene = scenes[file.scene_id] = SceneInfo(
+                    id=file.scene_id,
+                    name=entry.scene["name"],
+                    created_at=datetime.fromisoformat(entry.scene["created_at"]),
+                    files=[],
+                    confidence=entry.scene.get("confidence", 1.0)
+                )
+            scene.files.append(file)
+            files.append(file)
+        # Totals and file type counts are computed from the files
+        self.scenes = [SceneInfo(id=s.id, name=s.name, created_at=s.created_at, files=s.files,
+                                 confidence=s.confidence) for s in scenes.values()]
+        
+        target_dir.mkdir(parents=True, exist_ok=True)
+        self.current_session = target_dir
+        self.camera_ips.update(journal.session.get("camera_ips", {}))
+        logger.info(f"Resuming copy session from journal: {len(resumable)} of {len(files)} files "
+                    f"in {len(self.scenes)} scenes left")
+        
+        new_files = self._list_new_files(journal)
+        if new_files:
+            new_scenes = self.group_files_into_scenes(new_files, first_number=len(self.scenes) + 1)
+            logger.info(f"Adding {len(new_files)} files recorded since the interrupted session "
+                        f"in {len(new_scenes)} scenes")
+            self.scenes.extend(new_scenes)
+            files.extend(new_files)
+        
+        self.statistics.total_files = len(files)
+        self.statistics.total_size = sum(f.size for f in files)
+        return True
+        
+    def _list_new_files(self, journal: CopyJournal) -> List[FileInfo]:
+        """Files on the cameras that the journal does not know, nothing if no camera can be listed"""
+        try:
+            cameras = self.read_camera_cache()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cameras are not listed for new files, camera cache unreadable: {e}")
+            return []
+        if not cameras:
+            return []
+        listed = self._list_camera_files(cameras) or []
+        return [file for file in listed if file_key(file) not in journal.entries and file.status != "completed"]
+        
+    def pause(self):
+        """Pausing copying"""
+        if not self.is_paused:
+            self.is_paused = True
+            logger.info("Copy session paused")
+            self.status_signal.emit({
+                "status": "paused",
+                "message": "Copy session paused"
+            })
+        
+    def resume(self):
+        """Resuming copying"""
+        if self.is_paused:
+            self.is_paused = False
+            logger.info("Copy session resumed")
+            self.status_signal.emit({
+                "status": "resumed",
+                "message": "Copy session resumed"
+            })
+        
+    def cancel(self):
+        """Canceling copying"""
+        if not self.is_cancelled:
+            self.is_cancelled = True
+            logger.info("Copy session cancelled")
+            self.status_signal.emit({
+                "status": "cancelled",
+                "message": "Copy session cancelled"
+            })
+            
+            # If the copy thread exists, wait for it to finish
+            self.wait()
+        
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the running session to finish, True once it has"""
+        copy_thread = self.copy_thread
+        return copy_thread is None or copy_thread.wait(timeout)
+        
+    def _on_copy_finished(self):
+        """Copy completion handler"""
+        self.copy_thread = None
+        logger.info("Copy session finished")
+        
+    def __del__(self):
+        """Destructor for cleaning up temporary files"""
+        self.cleanup_temp_files() 
+        
+    def get_camera_media_list(self, camera_ip: str) -> List[Dict]:
+        """Getting the list of media files from the camera via API"""
+        try:
+            logger.info(f"Getting media list from camera {camera_ip}")
+            media_list = flatten_media_list(fetch_media_list(self.http_session, camera_ip, timeout=5))
+            logger.info(f"Found {len(media_list)} media files on camera {camera_ip}")
+            return media_list
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to get media list from camera {camera_ip}: {e}")
+            return []
+            
+    def read_camera_cache(self) -> List[Dict]:
+        """Reading the list of cameras from the camera cache"""
+        cache_path = Path("camera_cache.json")
+        logger.debug(f"Looking for camera cache at: {cache_path.absolute()}")
+        
+        if not cache_path.exists():
+            logger.error(f"Camera cache file not found at: {cache_path.absolute()}")
+            return []
+            
+        with open(cache_path, "r") as f:
+            cameras = json.load(f)
+        logger.debug(f"Loaded camera cache: {cameras}")
+        
+        if not isinstance(cameras, list):
+            logger.error(f"Invalid camera cache format. Expected list, got {type(cameras)}")
+            raise ValueError("Camera cache must be a list")
+            
+        if not cameras:
+            logger.warning("Camera cache is empty")
+            return []
+            
+        for camera in cameras:
+            if not camera.get('ip'):
+                logger.warning(f"No IP address for camera: {camera}")
+        return [camera for camera in cameras if camera.get('ip')]
+            
+    def load_camera_cache(self) -> List[Dict]:
+        """Loading camera cache and retrieving the list of files"""
+        try:
+            cameras = self.read_camera_cache()
+            
+            # Getting the list of files from all cameras concurrently
+            cameras_with_media = []
+            for camera, media_list, error in iter_media_lists(cameras, timeout=5, session=self.http_session):
+                if media_list:
+                    camera['media'] = flatten_media_list(media_list)
+                    cameras_with_media.append(camera)
+            return cameras_with_media
+                
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse camera cache: {e}")
+        except Exception as e:
+            logger.error(f"Error loading camera cache: {e}", exc_info=True)
+        return []
+            
+    def group_files_into_scenes(self, files: List[FileInfo], scene_interval: int = 5,
+                                clock_offsets: Optional[Dict[str, float]] = None,
+                                first_number: int = 1) -> List[SceneInfo]:
+        """Grouping files into scenes (takes) with one clip per camera
+        
+        Args:
+            first_number: Number of the first scene, to continue the scenes of a resumed session
+        """
+        if not files:
+            return []
+        
+        scene_settings = self.config.get("scene_settings", {})
+        if clock_offsets is None:
+            clock_offsets = scene_settings.get("clock_offsets", {})
+        
+        # A unit is a chaptered recording, a group (burst, sequence) or a single file of one camera
+        units: Dict[tuple, List[FileInfo]] = {}
+        for index, file in enumerate(files):
+            if file.chain_id:
+                key = (file.camera_id, file.chain_id)
+            elif file.group_id:
+                key = (file.camera_id, file.group_id)
+            else:
+                key = (file.camera_id, index)
+            units.setdefault(key, []).append(file)
+        unit_files = list(units.values())
+        
+        unit_times = np.fromiter((min(f.created_at for f in unit).timestamp() for unit in unit_files),
+                                 dtype=np.float64, count=len(unit_files))
+        camera_index, camera_ids = factorize([unit[0].camera_id for unit in unit_files])
+        measured = np.array([clock_offsets.get(camera_id, np.nan) for camera_id in camera_ids], dtype=np.float64)
+        
+        match = match_takes(
+            unit_times, camera_index, len(camera_ids),
+            offsets=measured,
+            gap=scene_interval,
+            estimate_offsets=scene_settings.get("estimate_clock_offsets", True)
+        )
+        self.clock_offsets = {camera_id: float(offset) for camera_id, offset in zip(camera_ids, match.offsets)}
+        for camera_id, offset in zip(camera_ids, match.offsets):
+            if offset:
+                logger.info(f"Clock offset of camera {camera_id}: {offset:+.2f}s")
+        
+        takes: List[List[FileInfo]] = [[] for _ in range(len(match.confidence))]
+        for label, unit in zip(match.labels.tolist(), unit_files):
+            takes[label].extend(unit)
+        
+        scenes = []
+        for take_files, confidence in zip(takes, match.confidence.tolist()):
+            take_files.sort(key=lambda f: (f.created_at, f.camera_id))
+            scene_number = first_number + len(scenes)
+            scenes.append(SceneInfo(
+                id=f"scene_{scene_number}",
+                name=f"scene{scene_number:02d}_{take_files[0].created_at.strftime('%Y_%m_%d_%H_%M_%S')}",
+                created_at=take_files[0].created_at,
+                files=take_files,
+                confidence=confidence
+            ))
+        
+        # Logging information about scenes
+        logger.info(f"Grouped {len(files)} files into {len(scenes)} scenes")
+        for scene in scenes:
+            logger.debug(f"Scene {scene.name}: {len(scene.files)} files, "
+                         f"{scene.files[0].created_at} - {scene.files[-1].created_at}, "
+                         f"types {scene.file_counts}, confidence {scene.confidence:.2f}")
+            if scene.confidence < 0.5:
+                logger.warning(f"Scene {scene.name} matched with low confidence {scene.confidence:.2f}")
+        
+        return scenes
+        
+    def _build_camera_files(self, camera_id: str, camera_ip: str, media_list: List[Dict]) -> List[FileInfo]:
+        """Building FileInfo objects from the media list of a single camera"""
+        files = []
+        
+        # Processing each directory
+        for directory in media_list:
+            dir_name = directory.get('d', '')
+            
+            # Processing each file in the directory
+            for file in directory.get('fs', []):
+                file_name = file.get('n', '').upper()
+                created_time = datetime.fromtimestamp(int(file.get('cre', 0)))
+                size = int(file.get('s', 0))
+                group_id = file.get('g')
+                file_type = file.get('t', '')
+                
+                # Checking if the file is part of a sequence
+                if 'b' in file and 'l' in file:  # If there is a start and end of the sequence
+                    start_num = int(file['b'])
+                    end_num = int(file['l'])
+                    missing_numbers = file.get('m', [])
+                    
+                    # Getting the letter code of the group from the file name
+                    group_letters = file_name[2:4] if not file_name.startswith('GX') else None
+                    
+                    # Generating all files in the sequence
+                    for i in range(start_num, end_num + 1):
+                        if i not in missing_numbers:
+                            if group_letters:
+                                original_name = f"GP{group_letters}{i:04d}.JPG"
+                            else:
+                                original_name = f"GX{i:06d}.MP4"
+                                
+                            # Creating a file name with the camera_id prefix
+                            prefixed_name = f"{camera_id}_{original_name}"
+                            
+                            logger.debug(f"Adding sequence file: {prefixed_name}")
+                            
+                            files.append(FileInfo(
+                                name=prefixed_name,
+                                path=media_file_url(camera_ip, dir_name, original_name),
+                                size=0,  # "s" of a group is its number of files, the camera is asked per file
+                                created_at=created_time,
+                                camera_id=camera_id,
+                                is_sequence=True,
+                                group_id=group_id,
+                                file_type='JPG' if group_letters else 'MP4',
+                                folder=dir_name
+                            ))
+                else:
+                    # Processing regular files
+                    files.append(FileInfo(
+                        name=f"{camera_id}_{file_name}",  # Prefixed name
+                        path=media_file_url(camera_ip, dir_name, file_name),
+                        size=size,
+                        created_at=created_time,
+                        camera_id=camera_id,
+                        is_sequence=False,
+                        group_id=group_id,
+                        file_type=file_type,
+                        folder=dir_name
+                    ))
+        
+        logger.info(f"Found {len(files)} files on camera {camera_id}")
+        return files
+        
+    def _apply_media_index(self, camera_id: str, camera_files: List[FileInfo]):
+        """Refreshing the media index of a camera and marking files already offloaded in earlier sessions"""
+        try:
+            self.media_index.refresh(camera_id, [f.media_key[1:] for f in camera_files])
+            copied = self.media_index.copied(camera_id)
+        except Exception as e:
+            logger.error(f"Media index unavailable for camera {camera_id}: {e}")
+            return
+            
+        skipped = 0
+        for file in camera_files:
+            dest_path = copied.get(file.media_key)
+            if not dest_path or not os.path.isfile(dest_path):
+                continue
+            # Members of a group have no size in the media list, their copy was checked when it was made
+            if (os.path.getsize(dest_path) == file.size) if file.size else os.path.getsize(dest_path) > 0:
+                file.status = "completed"
+                file.progress = 100
+                skipped += 1
+        if skipped:
+            logger.info(f"Camera {camera_id}: {skipped} files already offloaded according to the media index")
+            
+    def prepare_copy_session(self, target_dir: Path) -> bool:
+        """Preparing the copy session"""
+        try:
+            logger.info(f"Preparing copy session to: {target_dir}")
+            
+            # Creating the directory if it does not exist
+            target_dir.mkdir(parents=True, exist_ok=True)
+            self.current_session = target_dir
+            
+            # Loading the list of cameras
+            try:
+                cameras = self.read_camera_cache()
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to parse camera cache: {e}")
+                cameras = []
+            if not cameras:
+                logger.error("No cameras found in cache")
+                self.error_signal.emit("No cameras found in cache")
+                return False
+            
+            logger.info(f"Found {len(cameras)} cameras in cache")
+            
+            files = self._list_camera_files(cameras)
+            if files is None:
+                return False
+            
+            # Grouping files into scenes
+            scenes = self.group_files_into_scenes(files)
+            if not scenes:
+                logger.error("No scenes found")
+                self.error_signal.emit("No scenes found")
+                return False
+            
+            logger.info(f"Grouped {len(files)} files into {len(scenes)} scenes")
+            
+            # Saving information about scenes
+            self.scenes = scenes
+            
+            # Updating statistics
+            self.statistics.total_files = len(files)
+            self.statistics.total_size = sum(f.size for f in files)
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error in prepare_copy_session: {e}", exc_info=True)
+            self.error_signal.emit(f"Error preparing copy session: {str(e)}")
+            return False
+            
+    def _list_camera_files(self, cameras: List[Dict]) -> Optional[List[FileInfo]]:
+        """Files on the cameras, with chapters linked and offloaded files marked completed
+        
+        Returns:
+            Optional[List[FileInfo]]: None if the session was cancelled while listing
+        """
+        # Collecting information about files, processing each camera as soon as its list arrives
+        files = []
+        file_names = {}  # Dict[str, List[FileInfo]]
+        
+        for camera in cameras:
+            # Saving the camera's IP address
+            self.camera_ips[camera.get('name', '')] = camera['ip']
+        
+        for camera, media_list, error in iter_media_lists(cameras, timeout=10, session=self.http_session):
+            # Checking for operation cancellation
+            if self.is_cancelled:
+                logger.info("Copy session cancelled during file list preparation")
+                return None
+                
+            camera_id = camera.get('name', '')
+            if error is not None:
+                self.error_signal.emit(f"Error getting files from camera {camera_id}: {error}")
+                continue
+                
+            try:
+                camera_files = self._build_camera_files(camera_id, camera['ip'], media_list)
+            except Exception as e:
+                logger.error(f"Error getting files from camera {camera_id}: {e}")
+                self.error_signal.emit(f"Error getting files from camera {camera_id}: {e}")
+                continue
+                
+            self._apply_media_index(camera_id, camera_files)
+            files.extend(camera_files)
+            for file_info in camera_files:
+                file_names.setdefault(file_info.original_name, []).append(file_info)
+            
+        # Checking for duplicates
+        for original_name, file_list in file_names.items():
+            if len(file_list) > 1:
+                camera_ids = [f.camera_id for f in file_list]
+                logger.warning(f"File {original_name} exists in cameras: {', '.join(camera_ids)}")
+            
+        # Linking the chapters of chaptered videos
+        chains = build_chains(files)
+        logger.info(f"Found {len(chains)} video recordings, "
+                    f"{sum(1 for c in chains.values() if len(c.chapters) > 1)} of them chaptered")
+        return files
+        
+    def update_scene_progress(self, scene: SceneInfo):
+        """Updating scene progress"""
+        completed = 0
+        failed = 0
+        total_size = 0
+        
+        # Collecting statistics about files
+        for file in scene.files:
+            if file.status == "completed":
+                completed += 1
+            elif file.status == "error":
+                failed += 1
+            total_size += file.size
+            
+            # Sending the updated status of each file
+            self.progress_signal.emit({
+                "file": file.name,
+                "progress": file.progress,
+                "scene_id": scene.id,
+                "status": file.status,
+                "camera_id": file.camera_id
+            })
+        
+        # Sending the overall progress of the scene
+        self.progress_signal.emit({
+            "scene_progress": {
+                "id": scene.id,
+                "total_files": len(scene.files),
+                "copied_files": completed,
+                "failed_files": failed,
+                "total_size": total_size
+            }
+        })
+        
+    def cleanup_temp_files(self):
+        """Cleaning up temporary files"""
+        for file_path in self.temp_files:
+            try:
+                if isinstance(file_path, (str, Path)):
+                    path = Path(file_path)
+                    if path.exists():
+                        path.unlink()
+                        logger.info(f"Removed temp file: {path}")
+            except Exception as e:
+                logger.warning(f"Failed to remove temp file {file_path}: {e}")
+        self.temp_files.clear()
+        
+    def retry_failed(self):
+        """Retrying the copy of failed files"""
+        if not self.failed_files:
+            logger.info("No failed files to retry")
+            self.status_signal.emit({
+                "status": "info",
+                "message": "No failed files to retry"
+            })
+            return
+            
+        logger.info(f"Retrying {len(self.failed_files)} failed files")
+        self.status_signal.emit({
+            "status": "info",
+            "message": f"Retrying {len(self.failed_files)} failed files"
+        })
+        
+        # Creating a list of files for retry attempts
+        retry_files = self.failed_files.copy()
+        self.failed_files.clear()
+        
+        # Starting the copy in the same thread
+        if self.copy_thread and self.copy_thread.is_running:
+            logger.warning("Copy session is already running")
+            return
+            
+        self.is_paused = False
+        self.is_cancelled = False
+        
+        # Creating new scenes only from failed files
+        scenes = {}  # scene_id -> SceneInfo
+        for file, target_dir, scene in retry_files:
+            if scene.id not in scenes:
+                scenes[scene.id] = SceneInfo(
+                    id=scene.id,
+                    name=scene.name,
+                    created_at=scene.created_at,
+                    files=[]
+                )
+            scenes[scene.id].files.append(file)
+            
+        self.scenes = list(scenes.values())
+        self.statistics = FileStatistics()
+        self.statistics.total_files = len(retry_files)
+        self.statistics.total_size = sum(f[0].size for f in retry_files)
+        
+        self._start_copy_thread(self.current_session)
+        
+    def create_download_scheduler(self) -> DownloadScheduler:
+        """Creating a scheduler with download lanes per camera
+        
+        With copy_settings.adaptive_concurrency the number of transfers per
+        camera and per shared link (hub) follows measured throughput;
+        otherwise every camera runs lanes_per_camera transfers.
+        """
+        copy_settings = self.config.get("copy_settings", {})
+        max_active = copy_settings.get("max_active_downloads") or global_download_cap(
+            copy_settings.get("host_throughput_mb_s", 400),
+            copy_settings.get("camera_link_mb_s", 40)
+        )
+        lanes_per_camera = copy_settings.get("lanes_per_camera", 2)
+        self.concurrency = None
+        if copy_settings.get("adaptive_concurrency", True):
+            hub_overrides = copy_settings.get("camera_hubs", {})
+            hubs = {camera_id: hub_overrides.get(camera_id) or infer_hub(ip)
+                    for camera_id, ip in self.camera_ips.items()}
+            self.concurrency = ConcurrencyController(
+                hubs,
+                max_per_camera=copy_settings.get("max_downloads_per_camera", 4),
+                max_total=max_active,
+                initial_per_camera=lanes_per_camera
+            )
+            lanes_per_camera = self.concurrency.max_per_camera
+        return DownloadScheduler(
+            lanes_per_camera=lanes_per_camera,
+            max_active=max_active,
+            is_cancelled=lambda: self.is_cancelled,
+            controller=self.concurrency
+        )
+        
+    def create_turbo_session(self) -> TurboTransferSession:
+        """Turbo Transfer for the cameras with files left to copy
+        
+        Enabled when copy_settings.turbo_transfer is set; otherwise it is
+        switched off on all cameras in case an earlier crash left it on.
+        """
+        camera_ids = {file.camera_id for scene in self.scenes for file in scene.files
+                      if file.status != "completed"}
+        camera_ips = {camera_id: self.get_camera_ip(camera_id) for camera_id in camera_ids
+                      if self.get_camera_ip(camera_id)}
+        turbo = TurboTransferSession(self.http_session, camera_ips)
+        if self.config.get("copy_settings", {}).get("turbo_transfer", True):
+            turbo.start()
+        else:
+            turbo.disable_all()
+        return turbo
+        
+    def backup_roots(self) -> List[Path]:
+        """Backup destinations from copy_settings.backup_path when backups are enabled"""
+        copy_settings = self.config.get("copy_settings", {})
+        if not copy_settings.get("backup_enabled", False):
+            return []
+        paths = copy_settings.get("backup_path") or []
+        if isinstance(paths, str):
+            paths = [paths]
+        return [Path(path) for path in paths]
+        
+    def _backup_buffers(self) -> int:
+        """Extra pipeline buffers for the data the backups may lag behind"""
+        lag = self.config.get("copy_settings", {}).get("backup_buffer_mb", 256) * 1024 * 1024
+        return len(self.backup_roots()) * (lag // COPY_BUFFER_SIZE)
+        
+    def create_backup_copies(self, target_dir: Path) -> Optional[BackupCopies]:
+        """Backups of the session, None when no backup destination is configured"""
+        roots = [root for root in self.backup_roots() if root.resolve() != Path(target_dir).resolve()]
+        if not roots:
+            return None
+        copy_settings = self.config.get("copy_settings", {})
+        algorithm = copy_settings.get("hash_algorithm", "auto")
+        if algorithm in ("", "auto"):
+            algorithm = default_hash_algorithm()
+        logger.info(f"Backing up to: {', '.join(str(root) for root in roots)}")
+        return BackupCopies(target_dir, roots, self.write_pipeline, algorithm,
+                            max_lag=copy_settings.get("backup_buffer_mb", 256) * 1024 * 1024)
+        
+    def create_space_ledger(self, target_dir: Path, backups: Optional[BackupCopies]) -> Optional[SpaceLedger]:
+        """Free space of the session's destinations, None when copy_settings.check_free_space is off"""
+        copy_settings = self.config.get("copy_settings", {})
+        if not copy_settings.get("check_free_space", True):
+            return None
+        roots = [Path(target_dir)]
+        if backups is not None:
+            roots.extend(destination.root for destination in backups.destinations)
+        return SpaceLedger(roots, margin=copy_settings.get("min_free_space_mb", 1024) * 1024 * 1024)
+        
+    def create_verified_deleter(self) -> Optional[VerifiedDeleter]:
+        """Deletes from the cameras after verification, None unless copy_settings.delete_after_copy is set"""
+        copy_settings = self.config.get("copy_settings", {})
+        if not copy_settings.get("delete_after_copy", False):
+            return None
+        algorithm = copy_settings.get("hash_algorithm", "auto")
+        if algorithm in ("", "auto"):
+            algorithm = default_hash_algorithm()
+        logger.info("Files are deleted from the cameras once all their copies are verified")
+        return VerifiedDeleter(
+            self.http_session, dict(self.camera_ips), self.media_index, algorithm,
+            interval=copy_settings.get("delete_interval", 0.5),
+            reread_primary=copy_settings.get("delete_reread_primary", True)
+        )
+        
+    def create_frame_extractor(self) -> Optional[FrameExtractor]:
+        """Frame extraction of the copied videos, None unless copy_settings.extract_frames is set"""
+        copy_settings = self.config.get("copy_settings", {})
+        if not copy_settings.get("extract_frames", False):
+            return None
+        if not FrameExtractor.available():
+            logger.warning("Frame extraction needs ffmpeg or PyAV, frames are not extracted")
+            return None
+        return FrameExtractor(
+            rate=copy_settings.get("frame_rate", 2),
+            workers=copy_settings.get("frame_workers", 2),
+            threads=copy_settings.get("frame_threads", 2),
+            layout=copy_settings.get("frame_layout", "camera"),
+            image_format=copy_settings.get("frame_format", "jpg")
+        )
+        
+    def get_camera_ip(self, camera_id: str) -> str:
+        """Obtain the camera's IP address from its ID."""
+        return self.camera_ips.get(camera_id, '')
+        
+class RetryManager:
+    def __init__(self):
+        self.max_retries = 3
+        self.retry_delay = 5  # Initial delay in seconds.
+        self.failed_files = {}  # {file_id: {attempts: int, last_try: timestamp}}
+        self.max_concurrent = 5  # Maximum concurrent connections to a single camera
+        self.active_connections = {}  # {camera_ip: current_connections}
+        
+    def can_retry(self, file_info):
+        file_id = f"{file_info.camera_id}_{file_info.name}"
+        if file_id not in self.failed_files:
+            return True
+            
+        file_data = self.failed_files[file_id]
+        if file_data['attempts'] >= self.max_retries:
+            return False
+            
+        # Checking the time of the last attempt.
+        time_since_last = time.time() - file_data['last_try']
+        required_delay = self.retry_delay * (2 ** (file_data['attempts'] - 1))
+        return time_since_last >= required_delay
+        
+    def register_attempt(self, file_info, success):
+        file_id = f"{file_info.camera_id}_{file_info.name}"
+        if success:
+            if file_id in self.failed_files:
+                del self.failed_files[file_id]
+        else:
+            if file_id not in self.failed_files:
+                self.failed_files[file_id] = {'attempts': 0, 'last_try': 0}
+            self.failed_files[file_id]['attempts'] += 1
+            self.failed_files[file_id]['last_try'] = time.time()
+        
\ No newline at end of file
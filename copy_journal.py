@@ -0,0 +1,274 @@
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from file_manager import FileInfo
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_NAME = '.copy_journal.jsonl'
+
+# File states in the journal
+QUEUED = 'queued'
+STARTED = 'started'
+CHECKPOINT = 'checkpoint'
+VERIFIED = 'verified'
+FAILED = 'failed'
+
+@dataclass
+class JournalEntry:
+    """Last known state of one file of the session"""
+    key: str
+    state: str = QUEUED
+    file: dict = field(default_factory=dict)    # FileInfo fields needed to rebuild the session
+    scene: dict = field(default_factory=dict)   # id, name, created_at, confidence
+    dest: str = ''
+    size: int = 0
+    offset: int = 0   # Bytes known to be on disk
+    hash: str = ''
+    error: str = ''
+    attempts: int = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.state == VERIFIED
+
+class CopyJournal:
+    """Append-only journal of per-file state transitions of a copy session
+
+    Every transition is one JSON line appended to the journal in the
+    destination. Lines reach the OS immediately and are fsynced in batches
+    (every `sync_records` lines or `sync_interval` seconds), so a crash
+    loses at most the last batch; partial downloads keep their own
+    checkpoints next to the data. When the journal grows past
+    `compact_records` lines it is rewritten with one line per file.
+    Replaying it rebuilds the session without asking the cameras.
+    """
+
+    def __init__(self, path: Path, sync_interval: float = 1.0, sync_records: int = 256,
+                 compact_records: int = 50000):
+        self.path = Path(path)
+        self.sync_interval = sync_interval
+        self.sync_records = sync_records
+        self.compact_records = compact_records
+        self.session: dict = {}
+        self.entries: Dict[str, JournalEntry] = {}
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._records = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._stop = threading.Event()
+        self._sync_thread: Optional[threading.Thread] = None
+        self.replay()
+
+    @classmethod
+    def for_target(cls, target_dir: Path, **kwargs) -> 'CopyJournal':
+        return cls(Path(target_dir) / JOURNAL_NAME, **kwargs)
+
+    def replay(self) -> Tuple[dict, Dict[str, JournalEntry]]:
+        """Rebuild the session state from the journal on disk"""
+        started = time.monotonic()
+        self.session, self.entries, self._records = {}, {}, 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return self.session, self.entries
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # The last line of a crashed session may be cut off
+            self._apply(record)
+            self._records += 1
+        logger.info(f"Copy journal replayed: {len(self.entries)} files from {self._records} records "
+                    f"in {(time.monotonic() - started) * 1000:.0f} ms")
+        return self.session, self.entries
+
+    def _apply(self, record: dict):
+        event = record.get('e')
+        if event == 'session':
+            self.session = record.get('session', {})
+            return
+        key = record.get('k')
+        if not key:
+            return
+        if event == 'snapshot':
+            self.entries[key] = JournalEntry(**record['entry'])
+            return
+        entry = self.entries.setdefault(key, JournalEntry(key))
+        if event == QUEUED:
+            entry.state = QUEUED
+            entry.file = record.get('file', entry.file)
+            entry.scene = record.get('scene', entry.scene)
+            entry.dest = record.get('dest', entry.dest)
+            entry.size = record.get('size', entry.size)
+        elif event == STARTED:
+            entry.state = STARTED
+            entry.attempts += 1
+        elif event == CHECKPOINT:
+            entry.state = STARTED if entry.state != VERIFIED else VERIFIED
+            entry.offset = record.get('offset', entry.offset)
+        elif event == VERIFIED:
+            entry.state = VERIFIED
+            entry.offset = entry.size = record.get('size', entry.size)
+            entry.hash = record.get('hash', entry.hash)
+            entry.error = ''
+        elif event == FAILED:
+            entry.state = FAILED
+            entry.error = record.get('error', '')
+
+    def _append(self, record: dict):
+        line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            self._apply(record)
+            if self._fd is None:
+                self._open()
+            os.write(self._fd, line)
+            self._records += 1
+            self._unsynced += 1
+            if self._unsynced >= self.sync_records:
+                self._sync_locked()
+            compact = self._records > self.compact_records
+        if compact:
+            self.compact()
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0)
+        self._fd = os.open(self.path, flags)
+        if self._sync_thread is None:
+            self._stop.clear()
+            self._sync_thread = threading.Thread(target=self._sync_loop, name="journal-sync", daemon=True)
+            self._sync_thread.start()
+
+    def _sync_locked(self):
+        if self._fd is not None and self._unsynced:
+            os.fsync(self._fd)
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _sync_loop(self):
+        while not self._stop.wait(self.sync_interval):
+            with self._lock:
+                if self._unsynced and time.monotonic() - self._last_sync >= self.sync_interval:
+                    self._sync_locked()
+
+    def sync(self):
+        """Force every appended record to disk"""
+        with self._lock:
+            self._sync_locked()
+
+    def compact(self):
+        """Rewrite the journal with one record per file"""
+        with self._lock:
+            temp = self.path.with_name(self.path.name + '.tmp')
+            with open(temp, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'e': 'session', 'session': self.session}) + '\n')
+                for entry in self.entries.values():
+                    f.write(json.dumps({'e': 'snapshot', 'k': entry.key, 'entry': asdict(entry)},
+                                       ensure_ascii=False, separators=(',', ':')) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            os.replace(temp, self.path)
+            self._records = len(self.entries) + 1
+            self._unsynced = 0
+        logger.info(f"Copy journal compacted to {self._records} records")
+
+    def close(self):
+        """Sync and close; compacts a journal that grew since it was opened"""
+        self._stop.set()
+        if self._sync_thread is not None:
+            self._sync_thread.join()
+            self._sync_thread = None
+        with self._lock:
+            self._sync_locked()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            compact = self._records > 2 * len(self.entries) + 1
+        if compact:
+            self.compact()
+
+    # State transitions
+
+    def start_session(self, session: dict):
+        """Start the journal of a new session, replacing the one of the previous session"""
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            self.path.unlink(missing_ok=True)
+            self.entries = {}
+            self._records = 0
+            self._unsynced = 0
+        self._append({'e': 'session', 'session': session})
+
+    def queued(self, key: str, file: dict, scene: dict, dest: Path, size: int):
+        self._append({'e': QUEUED, 'k': key, 'file': file, 'scene': scene, 'dest': str(dest), 'size': size})
+
+    def started(self, key: str):
+        self._append({'e': STARTED, 'k': key})
+
+    def checkpoint(self, key: str, offset: int):
+        self._append({'e': CHECKPOINT, 'k': key, 'offset': offset})
+
+    def verified(self, key: str, size: int, content_hash: str = ''):
+        self._append({'e': VERIFIED, 'k': key, 'size': size, 'hash': content_hash})
+
+    def failed(self, key: str, error: str):
+        self._append({'e': FAILED, 'k': key, 'error': error})
+
+    def unfinished(self) -> List[JournalEntry]:
+        """Files of the session that are not verified yet"""
+        with self._lock:
+            return [entry for entry in self.entries.values() if not entry.finished]
+
+    def resumable(self) -> List[JournalEntry]:
+        """Files still queued or in progress; failed files were given up by their session"""
+        with self._lock:
+            return [entry for entry in self.entries.values() if entry.state in (QUEUED, STARTED)]
+
+def file_key(file: FileInfo) -> str:
+    """Key of a file in the journal"""
+    return f"{file.camera_id}/{file.folder}/{file.original_name}"
+
+def file_record(file: FileInfo) -> dict:
+    """FileInfo fields that describe the file on the camera"""
+    return {
+        'name': file.name,
+        'path': file.path,
+        'size': file.size,
+        'created_at': file.created_at.isoformat(),
+        'camera_id': file.camera_id,
+        'is_sequence': file.is_sequence,
+        'group_id': file.group_id,
+        'file_type': file.file_type,
+        'folder': file.folder,
+        'chain_id': file.chain_id,
+        'chapter': file.chapter
+    }
+
+def file_from_entry(entry: JournalEntry) -> FileInfo:
+    """FileInfo of a journalled file with its status and progress"""
+    record = dict(entry.file)
+    record['created_at'] = datetime.fromisoformat(record['created_at'])
+    file = FileInfo(**record)
+    if entry.finished:
+        file.status = "completed"
+        file.progress = 100
+    elif entry.size:
+        file.progress = int(entry.offset * 100 / entry.size)
+    if entry.state == FAILED:
+        file.error_message = entry.error
+    return file
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_DIR = 'manifests'
+
+def default_hash_algorithm() -> str:
+    """Fastest content hash available: xxh3, then BLAKE3, then hashlib BLAKE2b"""
+    if xxhash is not None:
+        return 'xxh3_128'
+    if blake3 is not None:
+        return 'blake3'
+    return 'blake2b'
+
+def new_hasher(algorithm: Optional[str] = None):
+    """Incremental hasher with `update` and `hexdigest`
+
+    Args:
+        algorithm: 'xxh3_128', 'blake3', a hashlib name, or None/'auto' for the fastest available
+    """
+    if algorithm in (None, '', 'auto'):
+        algorithm = default_hash_algorithm()
+    if algorithm == 'xxh3_128':
+        if xxhash is None:
+            raise ValueError("xxhash is not installed")
+        return xxhash.xxh3_128()
+    if algorithm == 'blake3':
+        if blake3 is None:
+            raise ValueError("blake3 is not installed")
+        return blake3.blake3()
+    return hashlib.new(algorithm)
+
+def hasher_name(hasher) -> str:
+    """Algorithm name of a hasher made by new_hasher"""
+    if xxhash is not None and isinstance(hasher, xxhash.xxh3_128):
+        return 'xxh3_128'
+    if blake3 is not None and isinstance(hasher, blake3.blake3):
+        return 'blake3'
+    return hasher.name
+
+@dataclass
+class ManifestEntry:
+    """One copied file"""
+    serial: str
+    source: str         # Path on the camera (e.g. 100GOPRO/GX010001.MP4)
+    size: int
+    hash: str
+    algorithm: str
+    dest: str
+    started: float      # Unix time
+    finished: float
+
+    @property
+    def seconds(self) -> float:
+        return self.finished - self.started
+
+class CopyManifest:
+    """Per-session manifest of copied files with their content hashes
+
+    Entries are appended as JSON lines to
+    `<destination>/manifests/copy_<timestamp>.jsonl` when each file
+    finishes. Later verification, dedup and the safe-to-format check can then
+    work from the manifests without reading the footage again.
+    """
+
+    def __init__(self, destination_root: Path, session_name: Optional[str] = None):
+        session_name = session_name or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.path = Path(destination_root) / MANIFEST_DIR / f"copy_{session_name}.jsonl"
+        self._lock = threading.Lock()
+        self._file = None
+
+    def record(self, entry: ManifestEntry):
+        """Append a copied file to the manifest"""
+        line = json.dumps(asdict(entry), ensure_ascii=False)
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def read_manifests(destination_root: Path) -> List[ManifestEntry]:
+    """Entries of all sessions copied to a destination, oldest session first"""
+    entries: List[ManifestEntry] = []
+    for path in sorted((Path(destination_root) / MANIFEST_DIR).glob('copy_*.jsonl')):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(ManifestEntry(**json.loads(line)))
+                except (TypeError, ValueError):
+                    # A session cut off while writing leaves a partial last line
+                    logger.warning(f"Skipping invalid manifest line {path.name}:{line_number}")
+    return entries
+
+def hash_file(path: Path, algorithm: Optional[str] = None, chunk_size: int = 4 * 1024 * 1024) -> str:
+    """Hash of a file on disk"""
+    hasher = new_hasher(algorithm)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def verify_entry(entry: ManifestEntry) -> bool:
+    """Check that the copied file still matches its manifest entry"""
+    path = Path(entry.dest)
+    try:
+        if path.stat().st_size != entry.size:
+            return False
+        return hash_file(path, entry.algorithm) == entry.hash
+    except (OSError, ValueError) as e:
+        logger.warning(f"Cannot verify {path}: {e}")
+        return False
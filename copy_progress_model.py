@@ -0,0 +1,298 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import humanize
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, Qt
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionProgressBar
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_ROLE = Qt.UserRole + 1  # Percentage drawn as a bar by ProgressBarDelegate
+
+# Statuses of the older per-file events mapped to the ones of the progress batches
+STATUS_NAMES = {"completed": "Completed", "Skipped": "Completed", "error": "Failed", "pending": "Pending"}
+
+class FileRow:
+    """One file of a scene"""
+    __slots__ = ('scene', 'row', 'key', 'name', 'camera_id', 'size', 'progress', 'status')
+
+    def __init__(self, scene: 'SceneRow', row: int, key: str, name: str, camera_id: str, size: int, status: str):
+        self.scene = scene
+        self.row = row
+        self.key = key
+        self.name = name
+        self.camera_id = camera_id
+        self.size = size
+        self.progress = 100.0 if status == "Completed" else 0.0
+        self.status = status
+
+class SceneRow:
+    """A scene with its files and aggregates kept up to date with every file change"""
+    __slots__ = ('row', 'id', 'name', 'scene_dir', 'files', 'fetched', 'total_size', 'done_bytes',
+                 'copied', 'failed')
+
+    def __init__(self, row: int, scene_id: str, name: str, scene_dir: Optional[str]):
+        self.row = row
+        self.id = scene_id
+        self.name = name
+        self.scene_dir = scene_dir
+        self.files: List[FileRow] = []
+        self.fetched = 0  # Files already exposed to the view
+        self.total_size = 0
+        self.done_bytes = 0.0
+        self.copied = 0
+        self.failed = 0
+
+    def count(self, file: FileRow, sign: int):
+        """Add (sign=1) or remove (sign=-1) the state of a file from the aggregates"""
+        self.done_bytes += sign * file.size * file.progress / 100
+        if file.status == "Completed":
+            self.copied += sign
+        elif file.status == "Failed":
+            self.failed += sign
+
+class CopyProgressModel(QAbstractItemModel):
+    """Scenes and their files for the copy progress view
+
+    Scenes are the top-level rows and their files the children. File rows
+    are handed to the view in chunks of FETCH_BATCH only when a scene is
+    expanded and scrolled, so a sweep of tens of thousands of files costs
+    a few plain objects each instead of widgets. Updates find their row by
+    file key in a dict and adjust the scene totals by the difference.
+    """
+
+    COLUMNS = ["Name", "Camera", "Size", "Progress", "Status"]
+    NAME, CAMERA, SIZE, PROGRESS, STATUS = range(5)
+    FETCH_BATCH = 256
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.scenes: List[SceneRow] = []
+        self._scene_ids: Dict[str, SceneRow] = {}
+        self._files: Dict[str, FileRow] = {}                  # file key -> row
+        self._names: Dict[Tuple[str, str], FileRow] = {}      # (scene id, file name) -> row
+
+    # Building the model
+
+    def add_scene(self, scene_id: str, name: str, files: Iterable[tuple], scene_dir: Optional[str] = None) -> bool:
+        """Add a scene and its files
+
+        Args:
+            files: (FileInfo, camera_id, key) tuples; without a key the
+                scene id and file name identify the file
+
+        Returns:
+            bool: False if the scene is already shown
+        """
+        if scene_id in self._scene_ids:
+            return False
+        scene = SceneRow(len(self.scenes), scene_id, name, scene_dir)
+        for entry in files:
+            file, camera_id = entry[0], entry[1] or getattr(entry[0], 'camera_id', '')
+            key = entry[2] if len(entry) > 2 else f"{scene_id}/{file.name}"
+            display_name = f"{camera_id}_{file.name}" if camera_id and not file.name.startswith(f"{camera_id}_") else file.name
+            status = STATUS_NAMES.get(getattr(file, 'status', ''), "Pending")
+            row = FileRow(scene, len(scene.files), key, display_name, camera_id, file.size, status)
+            scene.files.append(row)
+            scene.total_size += row.size
+            scene.count(row, 1)
+            self._files[key] = row
+            self._names[(scene_id, file.name)] = row
+            self._names[(scene_id, display_name)] = row
+
+        self.beginInsertRows(QModelIndex(), scene.row, scene.row)
+        self.scenes.append(scene)
+        self._scene_ids[scene_id] = scene
+        self.endInsertRows()
+        return True
+
+    def clear(self):
+        self.beginResetModel()
+        self.scenes.clear()
+        self._scene_ids.clear()
+        self._files.clear()
+        self._names.clear()
+        self.endResetModel()
+
+    def apply_updates(self, updates: Iterable[dict]):
+        """Apply file updates and notify the view once per scene
+
+        Args:
+            updates: Dicts with `key` (or `scene_id` and `file`), `progress`,
+                `status` and optionally `camera_id`
+        """
+        changed: Dict[SceneRow, List[int]] = {}
+        for update in updates:
+            file = self._files.get(update.get("key")) or self._names.get((update.get("scene_id"), update.get("file")))
+            if file is None:
+                continue
+            scene = file.scene
+            scene.count(file, -1)
+            status = update.get("status") or file.status
+            file.status = STATUS_NAMES.get(status, status)
+            file.progress = 100.0 if status == "Skipped" else float(update.get("progress", file.progress))
+            camera_id = update.get("camera_id")
+            if camera_id and camera_id != file.camera_id:
+                file.camera_id = camera_id
+            scene.count(file, 1)
+
+            # Rows the view has not fetched yet need no notification, only their scene does
+            rows = changed.setdefault(scene, [])
+            if file.row < scene.fetched:
+                if rows:
+                    rows[0] = min(rows[0], file.row)
+                    rows[1] = max(rows[1], file.row)
+                else:
+                    rows.extend((file.row, file.row))
+
+        if not changed:
+            return
+        last_column = len(self.COLUMNS) - 1
+        for scene, rows in changed.items():
+            if rows:
+                parent = self.createIndex(scene.row, 0, scene)
+                self.dataChanged.emit(self.index(rows[0], 0, parent), self.index(rows[1], last_column, parent))
+        first = min(scene.row for scene in changed)
+        last = max(scene.row for scene in changed)
+        self.dataChanged.emit(self.createIndex(first, 0, self.scenes[first]),
+                              self.createIndex(last, last_column, self.scenes[last]))
+
+    def totals(self) -> Dict[str, int]:
+        """Files and bytes over all scenes"""
+        return {
+            "total_files": len(self._files),
+            "copied_files": sum(scene.copied for scene in self.scenes),
+            "failed_files": sum(scene.failed for scene in self.scenes),
+            "total_bytes": sum(scene.total_size for scene in self.scenes),
+            "bytes_done": int(sum(scene.done_bytes for scene in self.scenes))
+        }
+
+    # QAbstractItemModel
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        if not parent.isValid():
+            if 0 <= row < len(self.scenes):
+                return self.createIndex(row, column, self.scenes[row])
+            return QModelIndex()
+        scene = parent.internalPointer()
+        if isinstance(scene, SceneRow) and 0 <= row < scene.fetched:
+            return self.createIndex(row, column, scene.files[row])
+        return QModelIndex()
+
+    def parent(self, index: QModelIndex) -> QModelIndex:
+        if not index.isValid():
+            return QModelIndex()
+        item = index.internalPointer()
+        if isinstance(item, FileRow):
+            return self.createIndex(item.scene.row, 0, item.scene)
+        return QModelIndex()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if not parent.isValid():
+            return len(self.scenes)
+        if parent.column() != 0:
+            return 0
+        item = parent.internalPointer()
+        return item.fetched if isinstance(item, SceneRow) else 0
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return len(self.COLUMNS)
+
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        if not parent.isValid():
+            return bool(self.scenes)
+        item = parent.internalPointer()
+        return parent.column() == 0 and isinstance(item, SceneRow) and bool(item.files)
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        if not parent.isValid():
+            return False
+        item = parent.internalPointer()
+        return isinstance(item, SceneRow) and item.fetched < len(item.files)
+
+    def fetchMore(self, parent: QModelIndex):
+        scene = parent.internalPointer()
+        count = min(self.FETCH_BATCH, len(scene.files) - scene.fetched)
+        if count <= 0:
+            return
+        self.beginInsertRows(parent, scene.fetched, scene.fetched + count - 1)
+        scene.fetched += count
+        self.endInsertRows()
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole) -> Any:
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        item = index.internalPointer()
+        column = index.column()
+        if isinstance(item, SceneRow):
+            return self._scene_data(item, column, role)
+        return self._file_data(item, column, role)
+
+    def _scene_data(self, scene: SceneRow, column: int, role: int) -> Any:
+        progress = scene.done_bytes * 100 / scene.total_size if scene.total_size else \
+            (100.0 if scene.files and scene.copied == len(scene.files) else 0.0)
+        if role == PROGRESS_ROLE and column == self.PROGRESS:
+            return int(progress)
+        if role == Qt.DisplayRole:
+            if column == self.NAME:
+                return f"Scene: {scene.name}"
+            if column == self.SIZE:
+                return humanize.naturalsize(scene.total_size)
+            if column == self.PROGRESS:
+                return f"{progress:.0f}%"
+            if column == self.STATUS:
+                text = f"Files: {scene.copied}/{len(scene.files)}"
+                return f"{text} ({scene.failed} failed)" if scene.failed else text
+        elif role == Qt.FontRole and column == self.NAME:
+            font = QApplication.font()
+            font.setBold(True)
+            return font
+        elif role == Qt.ForegroundRole and column == self.STATUS and scene.failed:
+            return QColor("red")
+        return None
+
+    def _file_data(self, file: FileRow, column: int, role: int) -> Any:
+        if role == PROGRESS_ROLE and column == self.PROGRESS:
+            return int(file.progress)
+        if role == Qt.DisplayRole:
+            if column == self.NAME:
+                return file.name
+            if column == self.CAMERA:
+                return file.camera_id
+            if column == self.SIZE:
+                return humanize.naturalsize(file.size)
+            if column == self.PROGRESS:
+                return f"{file.progress:.0f}%"
+            if column == self.STATUS:
+                return file.status
+        elif role == Qt.ForegroundRole and column == self.STATUS:
+            if file.status == "Failed":
+                return QColor("red")
+            if file.status == "Completed":
+                return QColor("green")
+        return None
+
+class ProgressBarDelegate(QStyledItemDelegate):
+    """Draws the progress column as a progress bar without creating widgets"""
+
+    def paint(self, painter, option, index):
+        value = index.data(PROGRESS_ROLE)
+        if value is None:
+            super().paint(painter, option, index)
+            return
+        bar = QStyleOptionProgressBar()
+        bar.rect = option.rect.adjusted(2, 2, -2, -2)
+        bar.minimum = 0
+        bar.maximum = 100
+        bar.progress = value
+        bar.text = f"{value}%"
+        bar.textVisible = True
+        bar.state = option.state
+        style = option.widget.style() if option.widget is not None else QApplication.style()
+        style.drawControl(QStyle.CE_ProgressBar, bar, painter)
@@ -7,13 +7,26 @@
 
 import os
 import sys
-import requests
 import logging
+import numpy as np
 from datetime import datetime
 from pathlib import Path
 from goprolist_and_start_usb import discover_gopro_devices
 from prime_camera_sn import serial_number as prime_camera_sn
 from utils import get_app_root, setup_logging, check_dependencies
+from media_list_fetcher import iter_media_lists
+from scene_clustering import cluster_scenes, factorize, group_by_labels
+from clip_chains import chain_key
+from camera_http import create_camera_session
+from file_transfer import download_file, DirectoryCache, VerificationError
+from write_pipeline import WritePipeline
+from destination_index import DestinationIndex
+from copy_manifest import CopyManifest, ManifestEntry, new_hasher, hasher_name
+
+# Shared by all downloads of the script
+http_session = create_camera_session()
+directories = DirectoryCache()
+write_pipeline = WritePipeline()
 
 def create_folder_structure_and_copy_files(destination_root, scene_time_threshold=5):
     """
@@ -40,9 +53,11 @@ def create_folder_structure_and_copy_files(destination_root, scene_time_threshol
             
         files_info = collect_files_info(devices)
         
-        # Step 2: Checking existing files
+        # Step 2: Checking existing files (one walk of the destination for all cameras)
         logger.info("Checking existing files...")
-        existing_files = check_existing_files(destination_root, files_info)
+        destination_index = DestinationIndex.for_root(destination_root)
+        destination_index.scan()
+        existing_files = check_existing_files(destination_root, files_info, destination_index)
         
         # Step 3: Grouping files into scenes
         logger.info("Calculating scene ranges...")
@@ -64,6 +79,7 @@ def create_folder_structure_and_copy_files(destination_root, scene_time_threshol
         # Step 5: Copying files
         copied_files = []
         failed_files = []
+        manifest = CopyManifest(destination_root)
         
         for scene_folder in scene_folders:
             logger.info(f"Processing scene: {scene_folder['name']}")
@@ -85,8 +101,9 @@ def create_folder_structure_and_copy_files(destination_root, scene_time_threshol
                 logger.info(f"Processing {file['type']} file: {dest_filename}")
                 
                 # Check the existing file taking the prefix into account
-                if dest_path.exists():
-                    actual_size = dest_path.stat().st_size
+                existing = destination_index.find(dest_path)
+                if existing is not None:
+                    actual_size = existing.size
                     # Check that this file is indeed from this camera
                     if dest_path.name.startswith(f"{file['camera']}_"):
                         if actual_size == file['size']:
@@ -95,7 +112,8 @@ def create_folder_structure_and_copy_files(destination_root, scene_time_threshol
                             continue
                         else:
                             logger.warning(f"Size mismatch for {dest_filename}, re-copying")
-                            dest_path.unlink()
+                            dest_path.unlink(missing_ok=True)
+                            destination_index.remove(dest_path)
                     else:
                         # If the file exists but is from another camera, skip deletion
                         logger.info(f"Found file with same name but different camera, keeping both: {dest_filename}")
@@ -106,18 +124,16 @@ def create_folder_structure_and_copy_files(destination_root, scene_time_threshol
                     # Creating URL taking into account the camera's folder structure
                     source_url = f"http://{files_info[file['camera']]['ip']}:8080/videos/DCIM/{file['folder']}/{file['name']}"
                     
-                    # Checking file availability before copying
-                    check_response = requests.head(source_url, timeout=5)
-                    if check_response.status_code != 200:
-                        raise Exception(f"File not accessible. Status code: {check_response.status_code}")
-                    
                     success = copy_file_with_verification(
                         source_url, 
                         dest_path, 
-                        file['size']
+                        file['size'],
+                        manifest=manifest,
+                        serial=file['camera']
                     )
                     
                     if success:
+                        destination_index.add(dest_path)
                         copied_files.append({'camera': file['camera'], 'file': file['name'], 'type': file['type']})
                         logger.info(f"Successfully copied {file['type']} file: {dest_filename}")
                     else:
@@ -137,6 +153,9 @@ def create_folder_structure_and_copy_files(destination_root, scene_time_threshol
                         'reason': str(e)
                     })
         
+        destination_index.save()
+        manifest.close()
+        
         # After copying files, add copy statistics
         for scene_idx, scene_folder in enumerate(scene_folders, 1):
             scene_files = scene_folder['files']
@@ -255,52 +274,22 @@ def calculate_scene_time_ranges(files_info, scene_time_threshold=5):
                     'type': file_info['type']
                 })
     
-    # Sorting files by time
-    all_files.sort(key=lambda x: x['time'])
+    if not all_files:
+        return []
     
-    # Grouping files into scenes
-    scenes = []
-    current_scene = []
+    # Files belong to the same scene if they are within the threshold of the scene start
+    # and each camera contributes one shot (a JPG and its GPR, or all chapters of a video, count as one shot)
+    timestamps = np.fromiter((f['time'].timestamp() for f in all_files), dtype=np.float64, count=len(all_files))
+    camera_index, _ = factorize([f['camera'] for f in all_files])
+    shot_ids, _ = factorize([
+        chain_key(f['camera'], f['name']) or (f['camera'], f['name'].rsplit('.', 1)[0].upper())
+        for f in all_files
+    ])
+    labels = cluster_scenes(timestamps, camera_index, shot_ids, gap=scene_time_threshold)
     
-    for i, file in enumerate(all_files):
-        if not current_scene:
-            current_scene = [file]
-        else:
-            # Checking the time difference and belonging to the same scene
-            time_diff = abs((file['time'] - current_scene[0]['time']).total_seconds())
-            
-            # Files belong to the same scene if:
-            # 1. The time difference is less than the threshold
-            # 2. Files are from different cameras
-            if time_diff <= scene_time_threshold and not any(
-                cf['camera'] == file['camera'] for cf in current_scene
-            ):
-                current_scene.append(file)
-            else:
-                if len(current_scene) > 0:
-                    # Counting the number of files of each type in the scene
-                    scene_stats = {
-                        'files': current_scene,
-                        'file_counts': {'MP4': 0, 'JPG': 0, 'GPR': 0},
-                        'has_jpg': False,
-                        'has_gpr': False,
-                        'start_time': current_scene[0]['time'],
-                        'end_time': current_scene[-1]['time']
-                    }
-                    
-                    for scene_file in current_scene:
-                        file_type = scene_file['type']
-                        scene_stats['file_counts'][file_type] += 1
-                        if file_type == 'JPG':
-                            scene_stats['has_jpg'] = True
-                        elif file_type == 'GPR':
-                            scene_stats['has_gpr'] = True
-                    
-                    scenes.append(scene_stats)
-                current_scene = [file]
-    
-    # Adding the last scene
-    if current_scene:
+    scenes = []
+    for current_scene in group_by_labels(all_files, labels, timestamps):
+        # Counting the number of files of each type in the scene
         scene_stats = {
             'files': current_scene,
             'file_counts': {'MP4': 0, 'JPG': 0, 'GPR': 0},
@@ -430,102 +419,116 @@ def log_copy_operation(destination_root, verification_results):
 def collect_files_info(devices):
     """Collect information about files on all cameras"""
     files_info = {}
+    cameras = [
+        {'ip': device["ip"], 'serial_number': device["name"].split("._gopro-web._tcp.local.")[0]}
+        for device in devices
+    ]
     
-    for device in devices:
-        ip = device["ip"]
-        serial_number = device["name"].split("._gopro-web._tcp.local.")[0]
-        
-        try:
-            # Using the documented endpoint /gopro/media/list
-            media_url = f"http://{ip}:8080/gopro/media/list"
-            response = requests.get(media_url, timeout=10)
-            response.raise_for_status()
-            
-            media_list = response.json().get("media", [])
-            files_info[serial_number] = {
-                'ip': ip,
-                'total_files': 0,
-                'files': [],
-                'size': 0,
-                'has_jpg': False,
-                'has_gpr': False,
-                'file_counts': {'MP4': 0, 'JPG': 0, 'GPR': 0}
-            }
-            
-            # First, collect all JPG files with the RAW flag
-            raw_jpgs = set()
-            for media in media_list:
-                for file in media.get("fs", []):
-                    file_name = file.get("n", "").upper()
-                    if file_name.endswith('.JPG') and bool(file.get("raw")):
-                        raw_jpgs.add(file_name)
-            
-            # Now processing all files
-            for media in media_list:
-                for file in media.get("fs", []):
-                    file_name = file.get("n", "").upper()
-                    
-                    # Determining the file type
-                    if file_name.endswith('.MP4'):
-                        file_type = 'MP4'
-                    elif file_name.endswith('.JPG'):
-                        file_type = 'JPG'
-                        files_info[serial_number]['has_jpg'] = True
-                    elif file_name.endswith('.GPR'):
-                        file_type = 'GPR'
-                        files_info[serial_number]['has_gpr'] = True
-                    else:
-                        continue  # Skipping unknown file types
-                    
-                    # Incrementing the counter for this file type
-                    files_info[serial_number]['file_counts'][file_type] += 1
-                    
-                    # Adding file information
-                    file_info = {
-                        'name': file.get("n"),  # Keeping the original name
-                        'folder': media.get("d"),
-                        'size': int(file.get("s", "0")),
-                        'time': datetime.fromtimestamp(int(file.get("cre"))),
-                        'type': file_type,
-                        'camera_id': serial_number,  # Adding camera_id
-                        'has_gpr': file_name in raw_jpgs if file_type == 'JPG' else False
-                    }
-                    files_info[serial_number]['files'].append(file_info)
-                    files_info[serial_number]['total_files'] += 1
-                    files_info[serial_number]['size'] += file_info['size']
-                    
-                    # If this is a JPG with the RAW flag, add the corresponding GPR file
-                    if file_type == 'JPG' and file_name in raw_jpgs:
-                        gpr_name = file_name.replace('.JPG', '.GPR')
-                        gpr_info = {
-                            'name': gpr_name,
-                            'folder': media.get("d"),
-                            'size': int(file.get("s", "0")),  # Using the same size
-                            'time': datetime.fromtimestamp(int(file.get("cre"))),
-                            'type': 'GPR'
-                        }
-                        files_info[serial_number]['files'].append(gpr_info)
-                        files_info[serial_number]['total_files'] += 1
-                        files_info[serial_number]['size'] += gpr_info['size']
-                        files_info[serial_number]['has_gpr'] = True
-                        files_info[serial_number]['file_counts']['GPR'] += 1
-            
-            logging.info(f"Camera {serial_number}: found {files_info[serial_number]['total_files']} files")
-            logging.info(f"Total size: {files_info[serial_number]['size'] / (1024*1024):.2f} MB")
-            
-            # Logging information about file types
-            for file_type, count in files_info[serial_number]['file_counts'].items():
-                if count > 0:
-                    logging.info(f"Camera {serial_number}: {count} {file_type} files")
+    # Media lists are requested from all cameras at once and processed as they arrive
+    for camera, media_list, error in iter_media_lists(cameras, timeout=10):
+        serial_number = camera['serial_number']
+        if error is not None:
+            logging.error(f"Error collecting files from camera {serial_number}: {error}")
+            files_info[serial_number] = {'error': str(error)}
+            continue
             
+        try:
+            files_info[serial_number] = parse_camera_files(serial_number, camera['ip'], media_list)
         except Exception as e:
             logging.error(f"Error collecting files from camera {serial_number}: {e}")
             files_info[serial_number] = {'error': str(e)}
     
     return files_info
 
-def check_existing_files(destination_root, files_info):
-    """Checking existing files in the target directories"""
+def parse_camera_files(serial_number, ip, media_list):
+    """Build the file information of a single camera from its media list"""
+    camera_info = {
+        'ip': ip,
+        'total_files': 0,
+        'files': [],
+        'size': 0,
+        'has_jpg': False,
+        'has_gpr': False,
+        'file_counts': {'MP4': 0, 'JPG': 0, 'GPR': 0}
+    }
+    
+    # First, collect all JPG files with the RAW flag
+    raw_jpgs = set()
+    for media in media_list:
+        for file in media.get("fs", []):
+            file_name = file.get("n", "").upper()
+            if file_name.endswith('.JPG') and bool(file.get("raw")):
+                raw_jpgs.add(file_name)
+    
+    # Now processing all files
+    for media in media_list:
+        for file in media.get("fs", []):
+            file_name = file.get("n", "").upper()
+            
+            # Determining the file type
+            if file_name.endswith('.MP4'):
+                file_type = 'MP4'
+            elif file_name.endswith('.JPG'):
+                file_type = 'JPG'
+                camera_info['has_jpg'] = True
+            elif file_name.endswith('.GPR'):
+                file_type = 'GPR'
+                camera_info['has_gpr'] = True
+            else:
+                continue  # Skipping unknown file types
+            
+            # Incrementing the counter for this file type
+            camera_info['file_counts'][file_type] += 1
+            
+            # Adding file information
+            file_info = {
+                'name': file.get("n"),  # Keeping the original name
+                'folder': media.get("d"),
+                'size': int(file.get("s", "0")),
+                'time': datetime.fromtimestamp(int(file.get("cre"))),
+                'type': file_type,
+                'camera_id': serial_number,  # Adding camera_id
+                'has_gpr': file_name in raw_jpgs if file_type == 'JPG' else False
+            }
+            camera_info['files'].append(file_info)
+            camera_info['total_files'] += 1
+            camera_info['size'] += file_info['size']
+            
+            # If this is a JPG with the RAW flag, add the corresponding GPR file
+            if file_type == 'JPG' and file_name in raw_jpgs:
+                gpr_name = file_name.replace('.JPG', '.GPR')
+                gpr_info = {
+                    'name': gpr_name,
+                    'folder': media.get("d"),
+                    'size': int(file.get("s", "0")),  # Using the same size
+                    'time': datetime.fromtimestamp(int(file.get("cre"))),
+                    'type': 'GPR'
+                }
+                camera_info['files'].append(gpr_info)
+                camera_info['total_files'] += 1
+                camera_info['size'] += gpr_info['size']
+                camera_info['has_gpr'] = True
+                camera_info['file_counts']['GPR'] += 1
+    
+    logging.info(f"Camera {serial_number}: found {camera_info['total_files']} files")
+    logging.info(f"Total size: {camera_info['size'] / (1024*1024):.2f} MB")
+    
+    # Logging information about file types
+    for file_type, count in camera_info['file_counts'].items():
+        if count > 0:
+            logging.info(f"Camera {serial_number}: {count} {file_type} files")
+    
+    return camera_info
+
+def check_existing_files(destination_root, files_info, destination_index=None):
+    """Checking existing files in the target directories
+
+    File names are looked up in an index of the destination built with one
+    walk of the tree instead of walking it again for every camera.
+    """
+    if destination_index is None:
+        destination_index = DestinationIndex(destination_root)
+        destination_index.scan()
     existing_files = {}
     
     for serial_number, info in files_info.items():
@@ -534,80 +537,85 @@ def check_existing_files(destination_root, files_info):
             
         existing_files[serial_number] = []
         
-        # Searching for files in all subdirectories
-        for root, _, files in os.walk(destination_root):
-            for file_info in info['files']:
-                # Creating a file name with the serial_number prefix
-                file_name = f"{serial_number}_{file_info['name']}"
-                if file_name in files:
-                    file_path = os.path.join(root, file_name)
-                    actual_size = os.path.getsize(file_path)
-                    
-                    # Checking size consistency
-                    if actual_size == file_info['size']:
-                        existing_files[serial_number].append({
-                            'name': file_name,
-                            'path': file_path,
-                            'size': actual_size,
-                            'verified': True
-                        })
-                        logging.info(f"Found existing file with matching size: {file_name}")
-                    else:
-                        logging.warning(f"Found file {file_name} but size mismatch: expected {file_info['size']}, got {actual_size}")
-                        try:
-                            # Removing the file with the wrong size
-                            os.remove(file_path)
-                            logging.info(f"Removed file with incorrect size: {file_name}")
-                        except Exception as e:
-                            logging.error(f"Failed to remove file {file_name}: {e}")
+        for file_info in info['files']:
+            # Creating a file name with the serial_number prefix
+            file_name = f"{serial_number}_{file_info['name']}"
+            entry = destination_index.get(file_name)
+            if entry is None:
+                continue
+            
+            # Checking size consistency
+            if entry.size == file_info['size']:
+                existing_files[serial_number].append({
+                    'name': file_name,
+                    'path': entry.path,
+                    'size': entry.size,
+                    'verified': True
+                })
+                logging.info(f"Found existing file with matching size: {file_name}")
+            else:
+                logging.warning(f"Found file {file_name} but size mismatch: expected {file_info['size']}, got {entry.size}")
+                try:
+                    # Removing the file with the wrong size
+                    os.remove(entry.path)
+                    destination_index.remove(Path(entry.path))
+                    logging.info(f"Removed file with incorrect size: {file_name}")
+                except Exception as e:
+                    logging.error(f"Failed to remove file {file_name}: {e}")
     
     return existing_files
 
-def copy_file_with_verification(source_url, dest_path, expected_size):
-    """Copying file with size verification"""
+def copy_file_with_verification(source_url, dest_path, expected_size, verify_with_camera=False,
+                                manifest=None, serial=None):
+    """Copying file with size verification, resuming a partial copy of an earlier run
+
+    The size from the media list is trusted and the download checks it
+    against Content-Length of the GET; `verify_with_camera` adds one HEAD
+    probe for the size up front. The content hash is computed while
+    streaming and recorded in `manifest`.
+    """
     try:
-        # Checking file availability and getting the actual size
-        head_response = requests.head(source_url, timeout=5)
-        if head_response.status_code != 200:
-            raise Exception(f"File not accessible. Status code: {head_response.status_code}")
-        
-        # Получаем реальный размер файла с камеры
-        total_size = int(head_response.headers.get('content-length', 0))
-        if total_size == 0:
-            raise Exception("Content-Length header is missing or zero")
-        
-        # Getting the actual file size from the camera
-        dest_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Copying file
-        downloaded_size = 0
-        with requests.get(source_url, stream=True, timeout=30) as response:
-            response.raise_for_status()
-            with open(dest_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
-                        if total_size > 0:
-                            progress = (downloaded_size / total_size) * 100
-                            if progress % 5 < 1:
-                                logging.info(f"Download progress for {dest_path.name}: {progress:.1f}%")
-        
-        # Checking the size of the copied file
-        actual_size = os.path.getsize(dest_path)
-        if actual_size != total_size:
-            logging.error(f"Size mismatch after download for {dest_path.name}: expected from camera {total_size}, got {actual_size}")
-            if os.path.exists(dest_path):
-                os.remove(dest_path)
-            return False
+        total_size = expected_size
+        if verify_with_camera or not total_size:
+            head_response = http_session.head(source_url, timeout=5)
+            if head_response.status_code != 200:
+                raise Exception(f"File not accessible. Status code: {head_response.status_code}")
+            total_size = int(head_response.headers.get('content-length', 0)) or expected_size
+        
+        directories.ensure(dest_path.parent)
+        
+        def log_progress(downloaded_size, size):
+            if size > 0:
+                progress = (downloaded_size / size) * 100
+                if progress % 5 < 1:
+                    logging.info(f"Download progress for {dest_path.name}: {progress:.1f}%")
+        
+        # Copying file (the partial file is kept on interruption and resumed next time)
+        hasher = new_hasher()
+        started = datetime.now().timestamp()
+        actual_size = download_file(http_session, source_url, dest_path, expected_size=total_size,
+                                    timeout=30, progress_cb=log_progress, pipeline=write_pipeline,
+                                    hasher=hasher)
+        if manifest is not None:
+            manifest.record(ManifestEntry(
+                serial=serial or '',
+                source=source_url.split('/DCIM/', 1)[-1],
+                size=actual_size,
+                hash=hasher.hexdigest(),
+                algorithm=hasher_name(hasher),
+                dest=str(dest_path),
+                started=started,
+                finished=datetime.now().timestamp()
+            ))
         
         logging.info(f"Successfully copied and verified: {dest_path.name} ({actual_size} bytes)")
         return True
         
+    except VerificationError as e:
+        logging.error(f"Size mismatch after download for {dest_path.name}: {e}")
+        return False
     except Exception as e:
         logging.error(f"Error copying {source_url} to {dest_path}: {e}")
-        if os.path.exists(dest_path):
-            os.remove(dest_path)
         return False
 
 if __name__ == "__main__":
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from stat import S_ISREG
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class DestinationEntry:
+    """File found under the destination root"""
+    path: str
+    size: int
+    mtime: float
+
+class DestinationIndex:
+    """Files under a destination root by file name
+
+    The tree is walked once with `os.scandir`. The listing of every
+    directory is kept together with the directory mtime, so a rescan only
+    lists directories whose content changed (new, renamed or removed
+    files). The index can be persisted between sessions. Files written by
+    the copy are added with `add` as they finish. `find` stats the file it
+    returns, so a file changed in place is never judged by a stale size.
+    """
+
+    def __init__(self, root: Path, cache_path: Optional[Path] = None):
+        self.root = Path(root)
+        self.cache_path = cache_path
+        self._dirs: Dict[str, dict] = {}  # dir -> {'mtime', 'dirs', 'files': {name: [size, mtime]}}
+        self._names: Dict[str, DestinationEntry] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_root(cls, root: Path, persist: bool = True) -> 'DestinationIndex':
+        """Index of a destination, loaded from its cache in the data directory when persisted"""
+        cache_path = None
+        if persist:
+            digest = hashlib.sha1(str(Path(root).resolve()).encode('utf-8')).hexdigest()[:16]
+            cache_dir = get_data_dir() / 'destination_index'
+            cache_dir.mkdir(exist_ok=True)
+            cache_path = cache_dir / f"{digest}.json"
+        index = cls(root, cache_path)
+        index.load()
+        return index
+
+    def load(self):
+        """Read the persisted listing, an unreadable cache means a full scan"""
+        if not self.cache_path or not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('root') == str(self.root):
+                self._dirs = state.get('dirs', {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read destination index {self.cache_path}: {e}")
+
+    def save(self):
+        """Persist the listing for the next session"""
+        if not self.cache_path:
+            return
+        with self._lock:
+            state = {'root': str(self.root), 'dirs': self._dirs}
+            temp = self.cache_path.with_name(self.cache_path.name + '.tmp')
+            try:
+                with open(temp, 'w', encoding='utf-8') as f:
+                    json.dump(state, f)
+                os.replace(temp, self.cache_path)
+            except OSError as e:
+                logger.warning(f"Failed to save destination index {self.cache_path}: {e}")
+
+    def scan(self) -> int:
+        """Bring the index up to date with the tree
+
+        Returns:
+            int: Number of directories that had to be listed
+        """
+        started = time.monotonic()
+        with self._lock:
+            cached_dirs = self._dirs
+        dirs: Dict[str, dict] = {}
+        listed = 0
+        stack = [str(self.root)]
+        while stack:
+            path = stack.pop()
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            cached = cached_dirs.get(path)
+            if cached is None or cached['mtime'] != mtime:
+                cached = self._list_dir(path, mtime)
+                if cached is None:
+                    continue
+                listed += 1
+            dirs[path] = cached
+            stack.extend(cached['dirs'])
+
+        with self._lock:
+            self._dirs = dirs
+            self._rebuild_names()
+        logger.info(f"Destination index of {self.root}: {len(self._names)} files in {len(dirs)} folders, "
+                    f"{listed} listed in {time.monotonic() - started:.2f}s")
+        return listed
+
+    @staticmethod
+    def _list_dir(path: str, mtime: float) -> Optional[dict]:
+        subdirs: List[str] = []
+        files: Dict[str, list] = {}
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            stat = entry.stat(follow_symlinks=False)
+                            files[entry.name] = [stat.st_size, stat.st_mtime]
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warning(f"Cannot list {path}: {e}")
+            return None
+        return {'mtime': mtime, 'dirs': subdirs, 'files': files}
+
+    def _rebuild_names(self):
+        self._names = {}
+        for directory in sorted(self._dirs):
+            for name, (size, mtime) in self._dirs[directory]['files'].items():
+                self._names.setdefault(name, DestinationEntry(os.path.join(directory, name), size, mtime))
+
+    def get(self, name: str) -> Optional[DestinationEntry]:
+        """Entry of a file name anywhere under the root"""
+        with self._lock:
+            return self._names.get(name)
+
+    def find(self, path: Path) -> Optional[DestinationEntry]:
+        """Entry of an exact path, None if that file is not there
+
+        The listing only names the candidate. Its size and mtime are read
+        from the file again, because rewriting or truncating a file in place
+        leaves the mtime of its directory, and so the cached listing, as it was.
+        """
+        path = Path(path)
+        with self._lock:
+            listing = self._dirs.get(str(path.parent))
+            if listing is None or path.name not in listing['files']:
+                return None
+        try:
+            stat = os.stat(path, follow_symlinks=False)
+        except OSError:
+            stat = None
+        if stat is None or not S_ISREG(stat.st_mode):
+            self.remove(path)
+            return None
+        entry = DestinationEntry(str(path), stat.st_size, stat.st_mtime)
+        with self._lock:
+            listing = self._dirs.get(str(path.parent))
+            if listing is not None:
+                listing['files'][path.name] = [stat.st_size, stat.st_mtime]
+            if path.name in self._names and self._names[path.name].path == entry.path:
+                self._names[path.name] = entry
+        return entry
+
+    def add(self, path: Path):
+        """Record a file written during the session"""
+        path = Path(path)
+        try:
+            stat = path.stat()
+        except OSError:
+            return
+        with self._lock:
+            # The directory keeps its old mtime so it is listed again on the next scan
+            listing = self._dirs.setdefault(str(path.parent), {'mtime': 0, 'dirs': [], 'files': {}})
+            listing['files'][path.name] = [stat.st_size, stat.st_mtime]
+            self._names[path.name] = DestinationEntry(str(path), stat.st_size, stat.st_mtime)
+
+    def remove(self, path: Path):
+        """Forget a file that was deleted"""
+        path = Path(path)
+        with self._lock:
+            listing = self._dirs.get(str(path.parent))
+            if listing is not None:
+                listing['files'].pop(path.name, None)
+            entry = self._names.get(path.name)
+            if entry is not None and entry.path == str(path):
+                del self._names[path.name]
@@ -0,0 +1,160 @@
+import errno
+import logging
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bytes a file needs under each destination root
+SpaceNeeds = Sequence[Tuple[Path, int]]
+
+class DestinationFull(Exception):
+    """A file was refused because a destination disk has no room for it"""
+
+    def __init__(self, destination: str):
+        super().__init__(f"Not enough space on {destination}")
+        self.destination = destination
+
+@dataclass
+class DeviceSpace:
+    """Free space of one disk holding one or more destination roots"""
+    roots: List[Path]
+    available: int  # Free bytes at the start of the session minus the margin
+    reserved: int = 0
+    full: bool = False  # Set on the first refused file, the disk admits nothing after it
+
+    @property
+    def left(self) -> int:
+        return self.available - self.reserved
+
+@dataclass
+class SpacePlan:
+    """Outcome of the preflight: what the session needs and what does not fit"""
+    needed: Dict[str, int] = field(default_factory=dict)  # Disk (its roots) -> bytes the session needs
+    available: Dict[str, int] = field(default_factory=dict)
+    unfit_scenes: List[str] = field(default_factory=list)  # In copy order
+
+    @property
+    def fits(self) -> bool:
+        return not self.unfit_scenes
+
+def is_disk_full(error: BaseException) -> bool:
+    """True if an error, or the error it was raised from, is ENOSPC"""
+    while error is not None:
+        if isinstance(error, OSError) and error.errno == errno.ENOSPC:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def existing_parent(path: Path) -> Path:
+    """The path itself or its closest ancestor that exists"""
+    path = Path(path).absolute()
+    while not path.exists() and path.parent != path:
+        path = path.parent
+    return path
+
+class SpaceLedger:
+    """Free space of the destination disks, reserved by the files as they start
+
+    Roots on the same disk share its free space, measured once when the
+    ledger is made, less `margin` bytes. A file reserves what it still has
+    to write on every root before its download starts; the download then
+    preallocates that space. The first file that does not fit marks the
+    disk full, so no later file starts on it and the session winds down
+    instead of failing on a full disk.
+    """
+
+    def __init__(self, roots: Iterable[Path], margin: int = 1024 * 1024 * 1024):
+        self.margin = margin
+        self._devices: Dict[int, DeviceSpace] = {}
+        self._root_devices: Dict[Path, int] = {}
+        self._reserved: Set[str] = set()
+        self._lock = threading.Lock()
+        for root in roots:
+            root = Path(root)
+            existing = existing_parent(root)
+            device_id = os.stat(existing).st_dev
+            self._root_devices[root] = device_id
+            device = self._devices.get(device_id)
+            if device is None:
+                free = shutil.disk_usage(existing).free
+                self._devices[device_id] = DeviceSpace([root], free - margin)
+            else:
+                device.roots.append(root)
+
+    @staticmethod
+    def _name(device: DeviceSpace) -> str:
+        return ", ".join(str(root) for root in device.roots)
+
+    def _per_device(self, needs: SpaceNeeds) -> Dict[int, int]:
+        per_device: Dict[int, int] = {}
+        for root, size in needs:
+            device_id = self._root_devices[Path(root)]
+            per_device[device_id] = per_device.get(device_id, 0) + size
+        return per_device
+
+    def plan(self, scenes: Iterable[Tuple[str, Iterable[SpaceNeeds]]]) -> SpacePlan:
+        """Check the session against the free space before anything is copied
+
+        Args:
+            scenes: (scene name, needs of each file left to copy) in copy order
+
+        Returns:
+            SpacePlan: Bytes needed per disk and the scenes past the point where a disk is full
+        """
+        plan = SpacePlan()
+        totals = {device_id: 0 for device_id in self._devices}
+        for name, files in scenes:
+            fits = True
+            for needs in files:
+                for device_id, size in self._per_device(needs).items():
+                    totals[device_id] += size
+                    fits = fits and totals[device_id] <= self._devices[device_id].left
+            if not fits:
+                plan.unfit_scenes.append(name)
+        for device_id, device in self._devices.items():
+            plan.needed[self._name(device)] = totals[device_id]
+            plan.available[self._name(device)] = max(device.left, 0)
+        return plan
+
+    def mark_full(self, path: Path) -> Optional[str]:
+        """Stop admitting files to the disk of a destination root that ran out of space
+
+        Returns:
+            Optional[str]: The disk, None if `path` is under no root of the ledger
+        """
+        path = Path(path)
+        for root, device_id in self._root_devices.items():
+            if path == root or root in path.parents:
+                device = self._devices[device_id]
+                with self._lock:
+                    device.full = True
+                return self._name(device)
+        return None
+
+    def reserve(self, key: str, needs: SpaceNeeds) -> Optional[str]:
+        """Reserve the space of a file on all its roots, once per file
+
+        Returns:
+            Optional[str]: None when the file may start, else the disk that is full
+        """
+        per_device = self._per_device(needs)
+        with self._lock:
+            if key in self._reserved:
+                return None
+            for device_id, size in per_device.items():
+                device = self._devices[device_id]
+                if device.full or size > device.left:
+                    if not device.full:
+                        device.full = True
+                        logger.error(f"Destination {self._name(device)} is full: {device.left / 1e9:.2f} GB "
+                                     f"left above the margin, no further files start there")
+                    return self._name(device)
+            for device_id, size in per_device.items():
+                self._devices[device_id].reserved += size
+            self._reserved.add(key)
+        return None
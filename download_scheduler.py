@@ -0,0 +1,275 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Task = Callable[[], Any]
+DoneCallback = Callable[[Any, Optional[Exception]], None]
+
+def global_download_cap(host_throughput_mb_s: float, camera_link_mb_s: float) -> int:
+    """Number of concurrent downloads the host can absorb
+
+    The host side (disk and USB controllers) is shared by all lanes, so
+    more concurrent transfers than it can sink only thrash.
+    """
+    if camera_link_mb_s <= 0:
+        return 1
+    return max(1, int(host_throughput_mb_s // camera_link_mb_s))
+
+def infer_hub(camera_ip: str) -> str:
+    """Link a camera shares with other cameras
+
+    Cameras on USB (172.2X.1YZ.51) all go through the host USB controllers,
+    cameras on WiFi share the access point of their subnet.
+    """
+    octets = camera_ip.split('.')
+    if len(octets) == 4 and octets[0] == '172' and octets[1].startswith('2') and octets[3] == '51':
+        return 'usb'
+    return '.'.join(octets[:3]) if len(octets) == 4 else camera_ip
+
+class _AimdLimit:
+    """Concurrency limit adjusted from measured throughput
+
+    Additive increase by probing: after the throughput at the current limit
+    has settled, one more transfer is tried and kept only if it brings a
+    clear gain, otherwise the limit goes back and stays there for a while.
+    Multiplicative decrease: when throughput collapses at an unchanged
+    limit (the link is thrashing) the limit is halved.
+    """
+
+    SETTLE_TICKS = 2  # Ticks before the throughput at a new limit is judged
+    HOLD_TICKS = 5    # Ticks without probing after a probe did not pay off
+
+    def __init__(self, initial: int, maximum: int, gain: float, drop: float):
+        self.limit = max(1, min(initial, maximum))
+        self.maximum = max(1, maximum)
+        self.gain = gain
+        self.drop = drop
+        self.rate = 0.0  # Smoothed bytes per second
+        self.active = 0
+        self.peak_active = 0
+        self.bytes = 0
+        self._ticks = 0
+        self._hold = 0
+        self._settled_rate: Optional[float] = None
+        self._probe: Optional[Tuple[int, float]] = None  # (limit before the probe, its throughput)
+
+    def update(self, elapsed: float):
+        sample = self.bytes / elapsed
+        self.rate = sample if not self.rate else 0.5 * self.rate + 0.5 * sample
+        saturated = self.peak_active >= self.limit
+        self.bytes = 0
+        self.peak_active = self.active
+        if not saturated:
+            return  # The limit was not reached, throughput says nothing about it
+        self._ticks += 1
+        if self._ticks < self.SETTLE_TICKS:
+            return
+
+        if self._probe is not None:
+            previous_limit, previous_rate = self._probe
+            self._probe = None
+            if self.rate <= previous_rate * (1 + self.gain):
+                self.limit = previous_limit
+                self._hold = self.HOLD_TICKS
+            self._ticks = 0
+            self._settled_rate = None
+            return
+
+        if self._settled_rate is None:
+            self._settled_rate = self.rate
+        elif self.rate < self._settled_rate * (1 - self.drop):
+            self.limit = max(1, self.limit // 2)
+            self._ticks = 0
+            self._settled_rate = None
+            return
+
+        if self._hold:
+            self._hold -= 1
+        elif self.limit < self.maximum:
+            self._probe = (self.limit, self.rate)
+            self.limit += 1
+            self._ticks = 0
+
+class ConcurrencyController:
+    """Number of concurrent transfers per camera and per shared link (AIMD)
+
+    Throughput is measured per camera and per hub every `interval`
+    seconds. A camera or hub keeps one more transfer only while that raises
+    its throughput and gets half as many when throughput collapses (the
+    link is thrashing). A transfer may start only when its camera, its hub
+    and the global cap all have room.
+    """
+
+    def __init__(self, hubs: Dict[str, str], max_per_camera: int = 4, max_total: int = 8,
+                 initial_per_camera: int = 1, interval: float = 2.0, gain: float = 0.05, drop: float = 0.3):
+        self.max_total = max(1, max_total)
+        self.max_per_camera = max_per_camera
+        self.initial_per_camera = initial_per_camera
+        self.interval = interval
+        self.gain = gain
+        self.drop = drop
+        self._cameras = {camera_id: _AimdLimit(initial_per_camera, max_per_camera, gain, drop) for camera_id in hubs}
+        self._hub_of = dict(hubs)
+        self._hubs: Dict[str, _AimdLimit] = {}
+        for hub in set(hubs.values()):
+            cameras = sum(1 for h in hubs.values() if h == hub)
+            self._hubs[hub] = _AimdLimit(cameras * initial_per_camera, self.max_total, gain, drop)
+        self._active = 0
+        self._last_tick = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _limits(self, camera_id: str) -> Tuple[_AimdLimit, _AimdLimit]:
+        camera = self._cameras.get(camera_id)
+        if camera is None:
+            # Camera not known up front gets a hub of its own
+            camera = self._cameras[camera_id] = _AimdLimit(self.initial_per_camera, self.max_per_camera,
+                                                           self.gain, self.drop)
+            self._hub_of[camera_id] = camera_id
+            self._hubs[camera_id] = _AimdLimit(self.initial_per_camera, self.max_total, self.gain, self.drop)
+        return camera, self._hubs[self._hub_of[camera_id]]
+
+    def acquire(self, camera_id: str, is_cancelled: Callable[[], bool] = lambda: False) -> bool:
+        """Wait for room for one more transfer of a camera
+
+        Returns:
+            bool: False if the session was cancelled while waiting
+        """
+        with self._cond:
+            camera, hub = self._limits(camera_id)
+            while (camera.active >= camera.limit or hub.active >= hub.limit
+                   or self._active >= self.max_total):
+                if is_cancelled():
+                    return False
+                self._cond.wait(timeout=0.5)
+            for limit in (camera, hub):
+                limit.active += 1
+                limit.peak_active = max(limit.peak_active, limit.active)
+            self._active += 1
+            return True
+
+    def release(self, camera_id: str):
+        with self._cond:
+            camera, hub = self._limits(camera_id)
+            camera.active -= 1
+            hub.active -= 1
+            self._active -= 1
+            self._cond.notify_all()
+
+    def record(self, camera_id: str, size: int):
+        """Account bytes transferred from a camera"""
+        with self._cond:
+            camera, hub = self._limits(camera_id)
+            camera.bytes += size
+            hub.bytes += size
+            now = time.monotonic()
+            elapsed = now - self._last_tick
+            if elapsed < self.interval:
+                return
+            self._last_tick = now
+            for limit in list(self._cameras.values()) + list(self._hubs.values()):
+                limit.update(elapsed)
+            self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        """Chosen concurrency and measured throughput per camera and hub"""
+        with self._cond:
+            return {
+                "active": self._active,
+                "max_total": self.max_total,
+                "cameras": {camera_id: {"limit": l.limit, "active": l.active, "mb_s": round(l.rate / 1e6, 1)}
+                            for camera_id, l in self._cameras.items()},
+                "hubs": {hub: {"limit": l.limit, "active": l.active, "mb_s": round(l.rate / 1e6, 1)}
+                         for hub, l in self._hubs.items()}
+            }
+
+class DownloadScheduler:
+    """Runs download tasks on dedicated lanes per camera
+
+    Every camera has its own queue served by `lanes_per_camera` threads, so
+    all cameras stream at the same time over their own USB links. A global
+    cap limits how many transfers run at once across the rig; with a
+    ConcurrencyController the lanes of a camera only run as many transfers
+    as the controller currently allows.
+    """
+
+    def __init__(self, lanes_per_camera: int = 1, max_active: int = 8,
+                 is_cancelled: Callable[[], bool] = lambda: False,
+                 controller: Optional[ConcurrencyController] = None):
+        self.lanes_per_camera = max(1, lanes_per_camera)
+        self.max_active = max(1, max_active)
+        self.is_cancelled = is_cancelled
+        self.controller = controller
+        self._queues: Dict[str, Deque[Tuple[Task, Optional[DoneCallback]]]] = {}
+        self._lock = threading.Lock()
+        self._active = threading.BoundedSemaphore(self.max_active)
+
+    def submit(self, camera_id: str, task: Task, on_done: Optional[DoneCallback] = None):
+        """Queue a task on the lanes of a camera
+
+        Args:
+            camera_id: Camera whose link the task uses
+            task: Callable doing the transfer, its return value goes to on_done
+            on_done: Called with (result, error) in the lane thread
+        """
+        with self._lock:
+            self._queues.setdefault(camera_id, deque()).append((task, on_done))
+
+    def pending(self) -> int:
+        """Number of tasks not started yet"""
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def run(self):
+        """Run all queued tasks and wait for them to finish"""
+        with self._lock:
+            cameras = list(self._queues)
+        threads: List[threading.Thread] = []
+        for camera_id in cameras:
+            for lane in range(self.lanes_per_camera):
+                thread = threading.Thread(
+                    target=self._lane, args=(camera_id,),
+                    name=f"lane-{camera_id}-{lane}", daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+        logger.info(f"Download scheduler: {len(cameras)} cameras, {len(threads)} lanes, "
+                    f"at most {self.max_active} transfers at once")
+        for thread in threads:
+            thread.join()
+
+    def _next_task(self, camera_id: str) -> Optional[Tuple[Task, Optional[DoneCallback]]]:
+        with self._lock:
+            queue = self._queues.get(camera_id)
+            if not queue:
+                return None
+            return queue.popleft()
+
+    def _lane(self, camera_id: str):
+        while not self.is_cancelled():
+            if self.controller is not None and not self.controller.acquire(camera_id, self.is_cancelled):
+                return
+            item = self._next_task(camera_id)
+            if item is None:
+                if self.controller is not None:
+                    self.controller.release(camera_id)
+                return
+            task, on_done = item
+            result, error = None, None
+            with self._active:
+                try:
+                    result = task()
+                except Exception as e:
+                    logger.error(f"Download task for camera {camera_id} failed: {e}")
+                    error = e
+                finally:
+                    if self.controller is not None:
+                        self.controller.release(camera_id)
+            if on_done is not None:
+                try:
+                    on_done(result, error)
+                except Exception as e:
+                    logger.error(f"Download callback for camera {camera_id} failed: {e}")
@@ -1,7 +1,8 @@
+import threading
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 @dataclass
 class FileInfo:
@@ -18,6 +19,14 @@ class FileInfo:
     progress: float = 0.0  # Copy progress (0-100)
     error_message: str = ""  # Error message
     scene_id: Optional[str] = None  # Scene ID
+    folder: str = ""  # DCIM folder on the camera
+    chain_id: Optional[str] = None  # Recording the chapter belongs to (chaptered videos)
+    chapter: int = 0  # Chapter number inside the recording
+
+    @property
+    def media_key(self) -> Tuple[str, str, str, int, int]:
+        """Key of the file in the media index: (serial, folder, name, created, size)"""
+        return (self.camera_id, self.folder, self.original_name, int(self.created_at.timestamp()), self.size)
 
     @property
     def original_name(self) -> str:
@@ -70,11 +79,18 @@ class FileStatistics:
         self.copied_size: int = 0
         self.start_time: Optional[datetime] = None
         self.end_time: Optional[datetime] = None
+        self.concurrency: Dict = {}  # Transfers chosen per camera and hub by the adaptive controller
+        self._lock = threading.Lock()
         
     def start(self):
         """Start the copy session"""
         self.start_time = datetime.now()
         
+    def add_copied(self, size: int):
+        """Count the bytes of a file downloaded in this session, called from the copy lanes"""
+        with self._lock:
+            self.copied_size += size
+        
     def finish(self):
         """Finish the copy session"""
         self.end_time = datetime.now()
@@ -0,0 +1,667 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+COPY_BUFFER_SIZE = 4 * 1024 * 1024  # Reusable per-thread buffer for the copy loops
+CHECKPOINT_BYTES = 8 * 1024 * 1024  # How often the verified offset is persisted
+SEGMENT_BLOCK_SIZE = 8 * 1024 * 1024  # One Range request of a segmented download
+
+ProgressCallback = Callable[[int, int], None]
+
+_buffers = threading.local()
+
+class TransferError(Exception):
+    """Download failed, the partial file is kept for resuming"""
+
+class TransferCancelled(TransferError):
+    """Download stopped on request, the partial file is kept for resuming"""
+
+class VerificationError(TransferError):
+    """Downloaded data does not match the source, the partial file is discarded"""
+
+def part_path_for(dest_path: Path) -> Path:
+    """Path of the partial file next to the destination"""
+    return dest_path.with_name(dest_path.name + '.part')
+
+def sidecar_path_for(part_path: Path) -> Path:
+    """Path of the sidecar holding the verified offset of a partial file"""
+    return part_path.with_name(part_path.name + '.json')
+
+def _read_checkpoint(part_path: Path, url: str, expected_size: int) -> int:
+    """Offset up to which the partial file can be trusted, 0 if it cannot"""
+    sidecar = sidecar_path_for(part_path)
+    if not part_path.exists() or not sidecar.exists():
+        return 0
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if checkpoint.get('url') != url or (expected_size and checkpoint.get('size') not in (0, expected_size)):
+        return 0
+    return max(0, min(int(checkpoint.get('offset', 0)), part_path.stat().st_size))
+
+def _write_checkpoint(part_path: Path, url: str, size: int, offset: int):
+    _write_sidecar(part_path, {'url': url, 'size': size, 'offset': offset})
+
+def _write_sidecar(part_path: Path, state: dict):
+    sidecar = sidecar_path_for(part_path)
+    temp = sidecar.with_name(sidecar.name + '.tmp')
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(temp, sidecar)
+
+def preallocate(fd: int, size: int):
+    """Reserve the full size of a file on disk up front"""
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            pass  # Not supported by the file system
+    os.ftruncate(fd, size)
+
+def _pwrite(fd: int, data, offset: int, lock: threading.Lock) -> int:
+    """Write at a position without moving a shared file offset"""
+    if hasattr(os, 'pwrite'):
+        return os.pwrite(fd, data, offset)
+    with lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        return os.write(fd, data)
+
+def write_at(fd: int, data: memoryview, offset: int, lock: threading.Lock):
+    """Write all of `data` at a position in the file"""
+    while data:
+        written = _pwrite(fd, data, offset, lock)
+        data = data[written:]
+        offset += written
+
+def copy_buffer() -> memoryview:
+    """Copy buffer of the calling thread, allocated once and reused"""
+    view = getattr(_buffers, 'view', None)
+    if view is None:
+        view = _buffers.view = memoryview(bytearray(COPY_BUFFER_SIZE))
+    return view
+
+def copy_stream(source, fd: int, offset: int = 0, length: Optional[int] = None,
+                on_chunk: Optional[Callable[[int], None]] = None,
+                should_stop: Optional[Callable[[], bool]] = None,
+                lock: Optional[threading.Lock] = None, pipeline=None, hasher=None) -> int:
+    """Stream a readable object into a file at a position
+
+    Data goes through the reusable buffer of the thread with `readinto`,
+    so the loop allocates nothing per chunk and runs once per
+    COPY_BUFFER_SIZE bytes. With a `pipeline` the buffers come from its
+    pool and the writes are done by the writer thread of the destination
+    device while the next chunk is read.
+
+    Args:
+        source: Object with `readinto` (raw HTTP response or unbuffered file)
+        fd: Destination file descriptor
+        offset: Position in the destination where writing starts
+        length: Bytes to copy, None for everything up to EOF
+        on_chunk: Called with the size of every chunk written
+        should_stop: Polled before every chunk
+        pipeline: WritePipeline doing the writes, None to write inline
+        hasher: Object with `update` fed with the data in order
+
+    Returns:
+        int: Number of bytes copied
+
+    Raises:
+        TransferCancelled: should_stop returned True
+    """
+    if pipeline is not None:
+        return _copy_stream_pipelined(source, fd, offset, length, on_chunk, should_stop, pipeline, hasher)
+    view = copy_buffer()
+    lock = lock or threading.Lock()
+    copied = 0
+    while length is None or copied < length:
+        if should_stop is not None and should_stop():
+            raise TransferCancelled(f"Copy stopped after {copied} bytes")
+        wanted = len(view) if length is None else min(len(view), length - copied)
+        read = source.readinto(view[:wanted])
+        if not read:
+            break
+        if hasher is not None:
+            hasher.update(view[:read])
+        write_at(fd, view[:read], offset + copied, lock)
+        copied += read
+        if on_chunk is not None:
+            on_chunk(read)
+    return copied
+
+def _copy_stream_pipelined(source, fd: int, offset: int, length: Optional[int],
+                           on_chunk: Optional[Callable[[int], None]],
+                           should_stop: Optional[Callable[[], bool]], pipeline, hasher) -> int:
+    stream = pipeline.open_stream(fd)
+    copied = 0
+    reported = 0
+
+    def report():
+        # Progress only counts data the writer has put on disk
+        nonlocal reported
+        written = stream.written
+        if on_chunk is not None and written > reported:
+            on_chunk(written - reported)
+        reported = written
+
+    try:
+        while length is None or copied < length:
+            if should_stop is not None and should_stop():
+                raise TransferCancelled(f"Copy stopped after {copied} bytes")
+            if stream.error is not None:
+                raise stream.error
+            buffer = pipeline.pool.acquire()
+            try:
+                wanted = len(buffer) if length is None else min(len(buffer), length - copied)
+                read = source.readinto(buffer[:wanted])
+            except BaseException:
+                pipeline.pool.release(buffer)
+                raise
+            if not read:
+                pipeline.pool.release(buffer)
+                break
+            if hasher is not None:
+                hasher.update(buffer[:read])
+            stream.submit(buffer, read, offset + copied)
+            copied += read
+            report()
+    except BaseException:
+        stream.wait()
+        report()
+        raise
+    stream.drain()
+    report()
+    return copied
+
+def copy_local_file(source: Path, target: Path, on_chunk: Optional[Callable[[int], None]] = None,
+                    should_stop: Optional[Callable[[], bool]] = None, pipeline=None,
+                    hasher=None) -> int:
+    """Copy a local file into a preallocated target
+
+    Returns:
+        int: Number of bytes copied
+    """
+    size = source.stat().st_size
+    flags = os.O_RDWR | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+    with open(source, 'rb', buffering=0) as src:
+        fd = os.open(target, flags)
+        try:
+            preallocate(fd, size)
+            copied = copy_stream(src, fd, 0, size, on_chunk, should_stop, pipeline=pipeline, hasher=hasher)
+            os.ftruncate(fd, copied)
+        finally:
+            os.close(fd)
+    return copied
+
+def hash_existing(path: Path, length: int, hasher, offset: int = 0):
+    """Feed `length` bytes of a file on disk from `offset` to a hasher"""
+    view = copy_buffer()
+    with open(path, 'rb', buffering=0) as f:
+        f.seek(offset)
+        remaining = length
+        while remaining > 0:
+            read = f.readinto(view[:min(len(view), remaining)])
+            if not read:
+                raise TransferError(f"{path.name} is shorter than {length} bytes")
+            hasher.update(view[:read])
+            remaining -= read
+
+class DirectoryCache:
+    """Creates every destination directory only once per session"""
+
+    def __init__(self):
+        self._created = set()
+        self._lock = threading.Lock()
+
+    def ensure(self, path: Path) -> Path:
+        if path not in self._created:
+            path.mkdir(parents=True, exist_ok=True)
+            with self._lock:
+                self._created.add(path)
+        return path
+
+def discard_partial(dest_path: Path):
+    """Remove the partial file and its sidecar"""
+    part_path = part_path_for(dest_path)
+    for path in (part_path, sidecar_path_for(part_path)):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+def download_file(session: requests.Session, url: str, dest_path: Path, expected_size: int = 0,
+                  timeout: float = 30, progress_cb: Optional[ProgressCallback] = None,
+                  should_stop: Optional[Callable[[], bool]] = None, pipeline=None,
+                  hasher=None, on_size: Optional[Callable[[int], None]] = None) -> int:
+    """Download a file, resuming a previous partial download with a Range request
+
+    Data goes to `<dest>.part`; the offset that has been flushed to disk is
+    recorded in `<dest>.part.json` so an interrupted transfer continues
+    where it stopped. The result is verified by size whether it was
+    resumed or not, then renamed to the destination.
+
+    Args:
+        session: HTTP session used for the request
+        url: Source URL on the camera
+        dest_path: Final path of the file
+        expected_size: Size from the media list, 0 if unknown
+        timeout: Connect/read timeout in seconds
+        progress_cb: Called with (downloaded bytes, total bytes)
+        should_stop: Polled between chunks, stops the transfer when it returns True
+        pipeline: WritePipeline doing the disk writes, None to write inline
+        hasher: Fed with the file content while it streams (a resumed
+            download hashes the part already on disk first)
+        on_size: Called with the size the camera reports before anything is
+            written; raising from it refuses the download
+
+    Returns:
+        int: Size of the downloaded file
+
+    Raises:
+        TransferCancelled: should_stop returned True (partial file kept)
+        VerificationError: Size mismatch after download (partial file removed)
+        TransferError: Any other failure (partial file kept)
+    """
+    dest_path = Path(dest_path)
+    part_path = part_path_for(dest_path)
+    offset = _read_checkpoint(part_path, url, expected_size)
+    if offset:
+        logger.info(f"Resuming {dest_path.name} at {offset} bytes")
+
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+    try:
+        response = session.get(url, stream=True, timeout=timeout, headers=headers)
+    except requests.exceptions.RequestException as e:
+        raise TransferError(f"Request for {dest_path.name} failed: {e}") from e
+
+    with response:
+        if offset and response.status_code == 416 and offset == expected_size:
+            # The previous attempt got every byte but stopped before the rename
+            if hasher is not None:
+                hash_existing(part_path, offset, hasher)
+            return _finalize(part_path, dest_path, expected_size)
+        if offset and response.status_code == 206:
+            content_range = response.headers.get('Content-Range', '')
+            if not content_range.startswith(f'bytes {offset}-'):
+                raise TransferError(f"Unexpected Content-Range for {dest_path.name}: {content_range}")
+            total_size = int(content_range.rsplit('/', 1)[-1]) if '/' in content_range else expected_size
+        elif response.status_code == 200:
+            if offset:
+                logger.warning(f"Camera ignored the Range request for {dest_path.name}, restarting")
+                offset = 0
+            total_size = int(response.headers.get('Content-Length', 0)) or expected_size
+        else:
+            raise TransferError(f"Unexpected status {response.status_code} for {dest_path.name}")
+
+        if expected_size and total_size and total_size != expected_size:
+            logger.warning(f"Size of {dest_path.name} on camera is {total_size}, media list says {expected_size}")
+        if on_size is not None:
+            on_size(total_size)
+
+        if offset and hasher is not None:
+            hash_existing(part_path, offset, hasher)
+
+        progress = {'downloaded': offset, 'checkpoint': offset}
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        fd = os.open(part_path, flags)
+
+        def on_chunk(size: int):
+            progress['downloaded'] += size
+            downloaded = progress['downloaded']
+            if downloaded - progress['checkpoint'] >= CHECKPOINT_BYTES:
+                os.fsync(fd)
+                progress['checkpoint'] = downloaded
+                _write_checkpoint(part_path, url, total_size, downloaded)
+            if progress_cb is not None:
+                progress_cb(downloaded, total_size)
+
+        try:
+            os.ftruncate(fd, offset)
+            if total_size:
+                preallocate(fd, total_size)
+            response.raw.decode_content = True
+            copy_stream(response.raw, fd, offset, on_chunk=on_chunk, should_stop=should_stop,
+                        pipeline=pipeline, hasher=hasher)
+            # Preallocation may exceed what was received, the size check needs the real length
+            os.ftruncate(fd, progress['downloaded'])
+        except Exception as e:
+            # Only data flushed to disk is trusted on resume
+            downloaded = progress['downloaded']
+            os.fsync(fd)
+            _write_checkpoint(part_path, url, total_size, downloaded)
+            if isinstance(e, TransferCancelled):
+                raise TransferCancelled(f"Download of {dest_path.name} cancelled") from e
+            raise TransferError(f"Download of {dest_path.name} interrupted at {downloaded} bytes: {e}") from e
+        finally:
+            os.close(fd)
+
+    return _finalize(part_path, dest_path, total_size)
+
+def _finalize(part_path: Path, dest_path: Path, total_size: int) -> int:
+    """Verify the size of a complete partial file and move it to the destination"""
+    actual_size = part_path.stat().st_size
+    if total_size and actual_size != total_size:
+        discard_partial(dest_path)
+        raise VerificationError(f"Size mismatch after copy: expected {total_size}, got {actual_size}")
+
+    os.replace(part_path, dest_path)
+    try:
+        sidecar_path_for(part_path).unlink()
+    except FileNotFoundError:
+        pass
+    return actual_size
+
+class RangeNotSupported(TransferError):
+    """The camera answered a Range request with the whole file"""
+
+class _HeldBlock:
+    """Bytes of one block on their way to the hasher
+
+    The block the hasher waits for feeds it directly. Any other block is
+    kept in pool buffers until the hasher reaches it, and switches to
+    feeding it directly once it does. Buffers are only taken while
+    `reserve` others stay available to the readers of the pool, so held
+    blocks cannot starve the downloads; a block that gets no buffer is
+    dropped and hashed from disk instead.
+    """
+
+    def __init__(self, pool, reserve: int, hasher, is_next: Callable[[], bool]):
+        self.pool = pool
+        self.reserve = reserve
+        self.hasher = hasher
+        self.is_next = is_next
+        self.buffers: List[memoryview] = []
+        self.length = 0
+        self.direct = False
+        self.dropped = False
+
+    def update(self, view):
+        if not self.direct and not self.dropped and self.is_next():
+            # Nothing else feeds the hasher until this block is done
+            for held in self.views():
+                self.hasher.update(held)
+            self.release()
+            self.direct = True
+        if self.direct:
+            self.hasher.update(view)
+            return
+        view = memoryview(view)
+        while view and not self.dropped:
+            index, position = divmod(self.length, self.pool.size)
+            if index == len(self.buffers):
+                buffer = self.pool.try_acquire(self.reserve)
+                if buffer is None:
+                    self.release()
+                    self.dropped = True
+                    return
+                self.buffers.append(buffer)
+            size = min(self.pool.size - position, len(view))
+            self.buffers[index][position:position + size] = view[:size]
+            self.length += size
+            view = view[size:]
+
+    def views(self):
+        for index, buffer in enumerate(self.buffers):
+            yield buffer[:min(self.pool.size, self.length - index * self.pool.size)]
+
+    def release(self):
+        for buffer in self.buffers:
+            self.pool.release(buffer)
+        self.buffers = []
+
+def _split_segments(total_size: int, block_size: int = SEGMENT_BLOCK_SIZE) -> List[List[int]]:
+    """Split a file into [start, end, done] blocks (end exclusive)"""
+    return [[start, min(start + block_size, total_size), start]
+            for start in range(0, total_size, block_size)]
+
+def _read_segments(part_path: Path, url: str, total_size: int) -> Optional[List[List[int]]]:
+    """Segment progress of an earlier segmented attempt, None if it cannot be trusted"""
+    sidecar = sidecar_path_for(part_path)
+    if not part_path.exists() or not sidecar.exists() or part_path.stat().st_size != total_size:
+        return None
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('url') != url or state.get('size') != total_size or 'segments' not in state:
+        return None
+    return [[int(start), int(end), int(done)] for start, end, done in state['segments']]
+
+def download_file_segmented(session, url: str, dest_path: Path, total_size: int, segments: int = 4,
+                            timeout: float = 30, progress_cb: Optional[ProgressCallback] = None,
+                            should_stop: Optional[Callable[[], bool]] = None, pipeline=None,
+                            hasher=None) -> int:
+    """Download a large file as Range requests over parallel connections
+
+    The file is split into blocks of SEGMENT_BLOCK_SIZE that `segments`
+    connections fetch in file order, each written at its own position in
+    the preallocated partial file. Block progress is checkpointed in the
+    sidecar so an interrupted download resumes where it stopped. Falls
+    back to a single stream if the camera does not honour Range requests.
+
+    Writes go through the `pipeline` like those of single-stream downloads.
+    A `hasher` is fed while the data streams: a block that finishes before
+    the blocks ahead of it is kept in buffers of the pipeline's pool until
+    they are hashed, and a connection may run at most 2 * `segments` blocks
+    ahead of the hashed part. Only a block that finds no buffer to spare in
+    the pool is hashed from disk. Blocks finished by an earlier attempt are
+    hashed from disk; partial ones are fetched again.
+
+    `progress_cb` is called from one connection at a time.
+
+    Args:
+        total_size: Size of the file (from the media list)
+        segments: Number of parallel connections
+
+    Returns:
+        int: Size of the downloaded file
+    """
+    dest_path = Path(dest_path)
+    part_path = part_path_for(dest_path)
+    if total_size <= 0 or segments <= 1:
+        return download_file(session, url, dest_path, total_size, timeout, progress_cb, should_stop, pipeline, hasher)
+
+    ranges = _read_segments(part_path, url, total_size)
+    if ranges is not None:
+        if hasher is not None:
+            for block in ranges:
+                if block[2] < block[1]:
+                    block[2] = block[0]  # Its bytes on disk have not passed the hasher
+        logger.info(f"Resuming {dest_path.name} in {len(ranges)} blocks at "
+                    f"{sum(done - start for start, _, done in ranges)} bytes")
+    else:
+        ranges = _split_segments(total_size, SEGMENT_BLOCK_SIZE)
+
+    flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+    fd = os.open(part_path, flags)
+    stop = threading.Event()
+    lock = threading.Lock()
+    errors: List[Exception] = []
+    state: Dict[str, int] = {
+        'downloaded': sum(done - start for start, _, done in ranges),
+        'checkpoint': 0,
+        'next': 0,     # Next block handed to a connection
+        'hashed': 0    # Blocks fed to the hasher
+    }
+    window = 2 * segments if hasher is not None else len(ranges)
+    turn = threading.Condition()
+    ready: Dict[int, Optional[_HeldBlock]] = {}  # Finished blocks waiting for the hasher, None to read from disk
+    hashing = threading.Lock()
+    reporting = threading.Lock()
+    if pipeline is not None:
+        # Half of the shared buffers stay with the readers, so the held blocks never stall the copy
+        pool, reserve = pipeline.pool, max(1, pipeline.pool.count // 2)
+    else:
+        from write_pipeline import BufferPool
+        pool, reserve = BufferPool(window * -(-SEGMENT_BLOCK_SIZE // COPY_BUFFER_SIZE), COPY_BUFFER_SIZE), 0
+
+    def checkpoint():
+        with lock:
+            snapshot = [list(block) for block in ranges]
+        os.fsync(fd)
+        _write_sidecar(part_path, {'url': url, 'size': total_size, 'segments': snapshot})
+
+    def stopped() -> bool:
+        return stop.is_set() or (should_stop is not None and should_stop())
+
+    def next_block() -> Optional[int]:
+        with turn:
+            while not stopped() and state['next'] < len(ranges):
+                if state['next'] < state['hashed'] + window:
+                    state['next'] += 1
+                    return state['next'] - 1
+                turn.wait(0.1)
+        return None
+
+    def feed(index: int, buffer: Optional[_HeldBlock]):
+        # Whoever finishes the block the hasher waits for hashes every block ready after it
+        with turn:
+            ready[index] = buffer
+        with hashing:
+            while True:
+                with turn:
+                    index = state['hashed']
+                    if index not in ready:
+                        return
+                    buffer = ready.pop(index)
+                start, end, _ = ranges[index]
+                if buffer is None or buffer.dropped:
+                    hash_existing(part_path, end - start, hasher, start)
+                elif not buffer.direct:
+                    for view in buffer.views():
+                        hasher.update(view)
+                    buffer.release()
+                with turn:
+                    state['hashed'] += 1
+                    turn.notify_all()
+
+    def fetch(block: List[int], buffer: Optional[_HeldBlock]):
+        start, end, done = block
+        headers = {'Range': f'bytes={done}-{end - 1}'}
+        with session.get(url, stream=True, timeout=timeout, headers=headers) as response:
+            if response.status_code == 200:
+                raise RangeNotSupported(f"Camera ignored the Range request for {dest_path.name}")
+            if response.status_code != 206:
+                raise TransferError(f"Unexpected status {response.status_code} for {dest_path.name}")
+
+            def on_chunk(size: int):
+                with lock:
+                    block[2] += size
+                    state['downloaded'] += size
+                    due = state['downloaded'] - state['checkpoint'] >= CHECKPOINT_BYTES
+                    if due:
+                        state['checkpoint'] = state['downloaded']
+                if due:
+                    checkpoint()
+                if progress_cb is not None:
+                    # One report at a time, each with the latest total, so the totals never go back
+                    with reporting:
+                        with lock:
+                            downloaded = state['downloaded']
+                        progress_cb(downloaded, total_size)
+
+            response.raw.decode_content = True
+            copied = copy_stream(response.raw, fd, done, end - done, on_chunk=on_chunk, should_stop=stopped,
+                                 lock=lock, pipeline=pipeline, hasher=buffer)
+            if copied < end - done:
+                raise TransferError(f"Block at {start} of {dest_path.name} ended early")
+
+    def connection():
+        try:
+            while True:
+                index = next_block()
+                if index is None:
+                    return
+                block = ranges[index]
+                buffer = None
+                if block[2] < block[1]:
+                    if hasher is not None:
+                        buffer = _HeldBlock(pool, reserve, hasher, lambda index=index: state['hashed'] == index)
+                    try:
+                        fetch(block, buffer)
+                    except BaseException:
+                        if buffer is not None:
+                            buffer.release()
+                        raise
+                if hasher is not None:
+                    feed(index, buffer)
+        except TransferCancelled:
+            stop.set()
+        except Exception as e:
+            with lock:
+                errors.append(e)
+            stop.set()
+
+    try:
+        if os.fstat(fd).st_size != total_size:
+            preallocate(fd, total_size)
+        threads = [threading.Thread(target=connection, daemon=True) for _ in range(min(segments, len(ranges)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        checkpoint()
+    finally:
+        os.close(fd)
+        for buffer in ready.values():  # Blocks the hasher never reached after a failure
+            if buffer is not None:
+                buffer.release()
+
+    if any(isinstance(e, RangeNotSupported) for e in errors):
+        logger.warning(f"{errors[0]}, downloading as a single stream")
+        discard_partial(dest_path)
+        return download_file(session, url, dest_path, total_size, timeout, progress_cb, should_stop, pipeline, hasher)
+    if errors:
+        raise TransferError(f"Download of {dest_path.name} interrupted: {errors[0]}") from errors[0]
+    if any(done < end for _, end, done in ranges):
+        if should_stop is not None and should_stop():
+            raise TransferCancelled(f"Download of {dest_path.name} cancelled")
+        raise TransferError(f"Download of {dest_path.name} ended early")
+    if hasher is not None and state['hashed'] != len(ranges):
+        raise TransferError(f"Hash of {dest_path.name} is incomplete")
+
+    return _finalize(part_path, dest_path, total_size)
+
+class SegmentTuner:
+    """Picks the number of segments per camera from measured throughput
+
+    Hill climbing: the count keeps moving in the same direction while the
+    throughput improves by more than `gain` and turns around when it drops.
+    """
+
+    def __init__(self, initial: int = 2, max_segments: int = 8, gain: float = 0.1):
+        self.initial = initial
+        self.max_segments = max_segments
+        self.gain = gain
+        self._state: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def segments_for(self, camera_id: str) -> int:
+        with self._lock:
+            return self._state.get(camera_id, {}).get('segments', self.initial)
+
+    def record(self, camera_id: str, size: int, elapsed: float):
+        """Feed the throughput of a finished segmented download"""
+        if elapsed <= 0:
+            return
+        rate = size / elapsed
+        with self._lock:
+            state = self._state.setdefault(camera_id, {'segments': self.initial, 'rate': 0.0, 'step': 1})
+            if state['rate'] and rate < state['rate'] * (1 - self.gain):
+                state['step'] = -state['step']
+            elif state['rate'] and rate < state['rate'] * (1 + self.gain):
+                state['rate'] = max(state['rate'], rate)
+                return  # Plateau - keep the current count
+            state['rate'] = rate
+            state['segments'] = min(self.max_segments, max(1, state['segments'] + state['step']))
+            logger.debug(f"Camera {camera_id}: {rate / 1e6:.1f} MB/s, next downloads use {state['segments']} segments")
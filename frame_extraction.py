@@ -0,0 +1,193 @@
+import logging
+import math
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import av
+except ImportError:  # PyAV is optional, ffmpeg is used when it is on the PATH
+    av = None
+
+FRAMES_DIR = "frames"
+DONE_DIR = ".extracted"  # Markers of the videos whose frames are complete, below FRAMES_DIR
+
+@dataclass
+class FrameJob:
+    """A copied video and where its frames go"""
+    video: Path  # Named with the camera prefix, unique within the scene
+    camera_id: str
+    frames_root: Path  # <scene>/frames
+    start: float  # Seconds from the start of the scene to the first frame of the video
+
+def frame_name(index: int, rate: float) -> str:
+    """Name of the frame at `index` on the frame grid of a scene: milliseconds from the scene start"""
+    return f"{round(index * 1000 / rate):09d}"
+
+def first_frame_index(start: float, rate: float) -> int:
+    """Index of the first point of the scene grid at or after `start` seconds"""
+    return math.ceil(round(start * rate, 6))  # A float product just above an integer is that point
+
+def grid_offset(start: float, rate: float) -> float:
+    """Seconds from the start of a video starting `start` seconds into the scene to its first grid point"""
+    return max(first_frame_index(start, rate) / rate - start, 0.0)
+
+def _extract_with_ffmpeg(video: Path, output_dir: Path, rate: float, image_format: str, threads: int,
+                         offset: float = 0.0) -> int:
+    """Write the frames at `rate` per second from `offset` on as 000001.<format>, 000002.<format>, ..."""
+    command = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-threads', str(threads)]
+    if offset > 0:  # Before -i, so the timestamps restart at the first grid point for the fps filter
+        command += ['-ss', f'{offset:.6f}']
+    command += ['-i', str(video), '-vf', f'fps={rate}', '-threads', str(threads)]
+    if image_format in ('jpg', 'jpeg'):
+        command += ['-q:v', '2']
+    command.append(str(output_dir / f'%06d.{image_format}'))
+    nice = shutil.which('nice')
+    if nice:  # Below the downloads and disk writes of the copy
+        command = [nice, '-n', '10'] + command
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"ffmpeg exited with {result.returncode}")
+    return len(list(output_dir.glob(f'*.{image_format}')))
+
+def _extract_with_av(video: Path, output_dir: Path, rate: float, image_format: str, threads: int,
+                     offset: float = 0.0) -> int:
+    """PyAV version of _extract_with_ffmpeg, run in a worker process"""
+    if hasattr(os, 'nice'):
+        os.nice(10)
+    count = 0
+    with av.open(str(video)) as container:
+        stream = container.streams.video[0]
+        stream.thread_type = 'AUTO'
+        stream.codec_context.thread_count = threads
+        for frame in container.decode(stream):
+            if frame.time is None or frame.time < offset + count / rate:
+                continue
+            count += 1
+            frame.to_image().save(output_dir / f'{count:06d}.{image_format}')
+    return count
+
+class FrameExtractor:
+    """Extracts still frames from the videos as they are copied
+
+    Every copied video is queued right away, while it is still in the page
+    cache, instead of in a separate pass over the disk after the offload.
+    At most `workers` videos are decoded at once, each with `threads`
+    decoder threads at a lower priority, so extraction runs alongside the
+    copy without starving it. ffmpeg is used when it is on the PATH, else
+    PyAV in a process pool.
+
+    Frames are taken `rate` times per second on a grid that starts at the
+    scene start, using the camera times corrected by the clock offsets, so
+    frames of different cameras taken at the same moment share a name. With
+    the "camera" layout they go to <scene>/frames/<camera>/<ms>.<format>,
+    with "time" to <scene>/frames/<ms>/<camera>.<format>, one folder per
+    moment as multi-view training expects. A video whose frames are all
+    written leaves a marker and is skipped in later sessions.
+    """
+
+    def __init__(self, rate: float = 2.0, workers: int = 2, threads: int = 2,
+                 layout: str = "camera", image_format: str = "jpg"):
+        self.rate = rate
+        self.threads = threads
+        self.layout = layout
+        self.image_format = image_format.lower().lstrip('.')
+        self.extracted = 0
+        self.failed = 0
+        self.frames = 0
+        self._lock = threading.Lock()
+        self._futures: List[Future] = []
+        if shutil.which('ffmpeg'):
+            self._extract = _extract_with_ffmpeg
+            # Each job is an ffmpeg process already, a thread only waits for it
+            self._executor: Executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='frames')
+        else:
+            self._extract = _extract_with_av
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+
+    @staticmethod
+    def available() -> bool:
+        return shutil.which('ffmpeg') is not None or av is not None
+
+    def submit(self, job: FrameJob) -> Optional[Future]:
+        """Queue a copied video, None if its frames were extracted before"""
+        if self._marker(job).exists():
+            logger.debug(f"Frames of {job.video.name} already extracted")
+            return None
+        future = self._executor.submit(self._extract, job.video, self._temp_dir(job), self.rate,
+                                       self.image_format, self.threads, grid_offset(job.start, self.rate))
+        future.add_done_callback(lambda done: self._finish(job, done))
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    def _marker(self, job: FrameJob) -> Path:
+        return job.frames_root / DONE_DIR / job.video.stem
+
+    def _temp_dir(self, job: FrameJob) -> Path:
+        temp_dir = self._temp_dir_path(job)
+        if temp_dir.exists():
+            shutil.rmtree(temp_dir, ignore_errors=True)  # Left over from an interrupted session
+        temp_dir.mkdir(parents=True)
+        return temp_dir
+
+    @staticmethod
+    def _temp_dir_path(job: FrameJob) -> Path:
+        return job.frames_root / f".tmp_{job.video.stem}"
+
+    def _finish(self, job: FrameJob, future: Future):
+        temp_dir = self._temp_dir_path(job)
+        try:
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                with self._lock:
+                    self.failed += 1
+                logger.error(f"Frame extraction of {job.video.name} failed: {error}")
+                return
+            count = self._place_frames(job, temp_dir)
+            marker = self._marker(job)
+            marker.parent.mkdir(parents=True, exist_ok=True)
+            marker.touch()
+            with self._lock:
+                self.extracted += 1
+                self.frames += count
+            logger.info(f"Extracted {count} frames from {job.video.name} ({job.camera_id})")
+        except OSError as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"Failed to store the frames of {job.video.name}: {e}")
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _place_frames(self, job: FrameJob, temp_dir: Path) -> int:
+        """Move the extracted frames to their names on the scene grid"""
+        first = first_frame_index(job.start, self.rate)
+        count = 0
+        for frame in sorted(temp_dir.glob(f'*.{self.image_format}')):
+            name = frame_name(first + int(frame.stem) - 1, self.rate)
+            if self.layout == "time":
+                target = job.frames_root / name / f"{job.camera_id}.{self.image_format}"
+            else:
+                target = job.frames_root / job.camera_id / f"{name}.{self.image_format}"
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(frame, target)
+            count += 1
+        return count
+
+    def close(self, cancel: bool = False):
+        """Wait for the queued videos, or only for the running ones with cancel=True"""
+        with self._lock:
+            pending = sum(1 for future in self._futures if not future.done())
+        if pending:
+            logger.info(f"{'Dropping' if cancel else 'Waiting for'} frame extraction of {pending} videos")
+        self._executor.shutdown(wait=True, cancel_futures=cancel)
+        logger.info(f"Extracted {self.frames} frames from {self.extracted} videos, {self.failed} failed")
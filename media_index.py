@@ -0,0 +1,193 @@
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+# (serial, folder, name, created, size) - identifies a media file across sessions
+MediaKey = Tuple[str, str, str, int, int]
+
+@dataclass
+class MediaRecord:
+    """Media file known to the index"""
+    serial: str
+    folder: str
+    name: str
+    created: int
+    size: int
+    status: str = "pending"  # pending, copied, failed
+    dest_path: Optional[str] = None
+    on_camera: bool = True
+
+    @property
+    def key(self) -> MediaKey:
+        return (self.serial, self.folder, self.name, self.created, self.size)
+
+@dataclass
+class MediaDelta:
+    """Result of refreshing the index with a fresh media list"""
+    added: List[MediaKey] = field(default_factory=list)
+    removed: List[MediaKey] = field(default_factory=list)
+    unchanged: int = 0
+
+class MediaIndex:
+    """Persistent index of camera media and its offload status
+
+    One row per media file keyed by (serial, folder, name, created, size).
+    Refreshing a camera only diffs its new media list against the stored
+    rows, so the state of earlier sessions (copy status and destination)
+    survives re-listing.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path) if db_path else get_data_dir() / 'media_index.db'
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS media (
+                    serial TEXT NOT NULL,
+                    folder TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    created INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    dest_path TEXT,
+                    on_camera INTEGER NOT NULL DEFAULT 1,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (serial, folder, name, created, size)
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_media_pending ON media (on_camera, status, serial)"
+            )
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    def refresh(self, serial: str, entries: Iterable[Tuple[str, str, int, int]]) -> MediaDelta:
+        """Update the index with the current media list of a camera
+
+        Args:
+            serial: Camera serial number
+            entries: (folder, name, created, size) of every file on the camera
+
+        Returns:
+            MediaDelta: Files that appeared on or disappeared from the camera
+        """
+        current = {(serial, folder, name, int(created), int(size)) for folder, name, created, size in entries}
+        now = time.time()
+        delta = MediaDelta()
+
+        with self._lock, self._conn:
+            known = {
+                tuple(row[:5]): bool(row[5])
+                for row in self._conn.execute(
+                    "SELECT serial, folder, name, created, size, on_camera FROM media WHERE serial = ?",
+                    (serial,)
+                )
+            }
+
+            delta.added = sorted(key for key in current if not known.get(key, False))
+            delta.removed = sorted(key for key, on_camera in known.items() if on_camera and key not in current)
+            delta.unchanged = len(current) - len(delta.added)
+
+            self._conn.executemany(
+                "INSERT INTO media (serial, folder, name, created, size, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (serial, folder, name, created, size) DO UPDATE SET on_camera = 1, updated_at = excluded.updated_at",
+                [key + (now,) for key in delta.added]
+            )
+            self._conn.executemany(
+                "UPDATE media SET on_camera = 0, updated_at = ? "
+                "WHERE serial = ? AND folder = ? AND name = ? AND created = ? AND size = ?",
+                [(now,) + key for key in delta.removed]
+            )
+
+        if delta.added or delta.removed:
+            logger.info(f"Media index for {serial}: {len(delta.added)} new, {len(delta.removed)} removed, "
+                        f"{delta.unchanged} unchanged")
+        return delta
+
+    def set_status(self, key: MediaKey, status: str, dest_path: Optional[str] = None):
+        """Set the copy status (and destination) of a file"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO media (serial, folder, name, created, size, status, dest_path, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (serial, folder, name, created, size) DO UPDATE SET "
+                "status = excluded.status, dest_path = COALESCE(excluded.dest_path, dest_path), "
+                "updated_at = excluded.updated_at",
+                key + (status, str(dest_path) if dest_path else None, time.time())
+            )
+
+    def mark_copied(self, key: MediaKey, dest_path: Path):
+        """Record a successfully copied file"""
+        self.set_status(key, "copied", str(dest_path))
+
+    def mark_failed(self, key: MediaKey):
+        """Record a failed copy"""
+        self.set_status(key, "failed")
+
+    def mark_deleted(self, key: MediaKey):
+        """Record a copied file that was deleted from its camera"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE media SET on_camera = 0, updated_at = ? "
+                "WHERE serial = ? AND folder = ? AND name = ? AND created = ? AND size = ?",
+                (time.time(),) + key
+            )
+
+    def copied(self, serial: Optional[str] = None) -> Dict[MediaKey, str]:
+        """Destinations of the copied files still on the cameras"""
+        query = "SELECT serial, folder, name, created, size, dest_path FROM media WHERE on_camera = 1 AND status = 'copied'"
+        params: tuple = ()
+        if serial is not None:
+            query += " AND serial = ?"
+            params = (serial,)
+        with self._lock:
+            return {tuple(row[:5]): row[5] for row in self._conn.execute(query, params)}
+
+    def pending(self, serial: Optional[str] = None) -> List[MediaRecord]:
+        """Files on the cameras that have not been offloaded yet"""
+        query = "SELECT * FROM media WHERE on_camera = 1 AND status != 'copied'"
+        params: tuple = ()
+        if serial is not None:
+            query += " AND serial = ?"
+            params = (serial,)
+        query += " ORDER BY serial, created, name"
+        with self._lock:
+            return [self._record(row) for row in self._conn.execute(query, params)]
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """Number of files on the cameras per serial and status"""
+        result: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            for row in self._conn.execute(
+                "SELECT serial, status, COUNT(*) FROM media WHERE on_camera = 1 GROUP BY serial, status"
+            ):
+                result.setdefault(row[0], {})[row[1]] = row[2]
+        return result
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> MediaRecord:
+        return MediaRecord(
+            serial=row['serial'],
+            folder=row['folder'],
+            name=row['name'],
+            created=row['created'],
+            size=row['size'],
+            status=row['status'],
+            dest_path=row['dest_path'],
+            on_camera=bool(row['on_camera'])
+        )
@@ -0,0 +1,78 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from camera_http import create_camera_session, media_list_url
+
+logger = logging.getLogger(__name__)
+
+MAX_LISTING_WORKERS = 32
+
+def fetch_media_list(session: requests.Session, camera_ip: str, timeout: float = 10) -> List[Dict]:
+    """Fetch and parse the media list of a single camera
+
+    Returns:
+        List[Dict]: Directories of the camera in the `/gopro/media/list` format
+            ({'d': folder, 'fs': [files]})
+    """
+    response = session.get(media_list_url(camera_ip), timeout=timeout)
+    response.raise_for_status()
+    return response.json().get('media', [])
+
+def iter_media_lists(cameras: Iterable[Dict], timeout: float = 10,
+                     session: Optional[requests.Session] = None,
+                     max_workers: Optional[int] = None
+                     ) -> Iterator[Tuple[Dict, Optional[List[Dict]], Optional[Exception]]]:
+    """Fetch the media lists of all cameras concurrently
+
+    Requests go through one shared session and the JSON is parsed in the
+    worker threads. Results are yielded per camera as soon as they arrive,
+    so the caller can start processing the fast cameras while the slow ones
+    are still answering.
+
+    Args:
+        cameras: Camera dicts with an 'ip' key
+        timeout: Request timeout per camera in seconds
+        session: Shared session (created if not given)
+        max_workers: Number of concurrent requests (one per camera by default)
+
+    Yields:
+        Tuple: (camera, media list or None, error or None)
+    """
+    cameras = [camera for camera in cameras if camera.get('ip')]
+    if not cameras:
+        return
+
+    workers = max_workers or min(len(cameras), MAX_LISTING_WORKERS)
+    own_session = session is None
+    if own_session:
+        session = create_camera_session(pool_size=workers)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(fetch_media_list, session, camera['ip'], timeout): camera
+                for camera in cameras
+            }
+            for future in as_completed(futures):
+                camera = futures[future]
+                try:
+                    yield camera, future.result(), None
+                except Exception as e:
+                    logger.error(f"Failed to get media list from camera {camera['ip']}: {e}")
+                    yield camera, None, e
+    finally:
+        if own_session:
+            session.close()
+
+def flatten_media_list(media_list: List[Dict]) -> List[Dict]:
+    """Flatten the directories of a media list into a list of files with their folder in 'd'"""
+    files = []
+    for media in media_list:
+        directory = media.get('d', '')
+        for file in media.get('fs', []):
+            file['d'] = directory
+            files.append(file)
+    return files
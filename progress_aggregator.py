@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from throughput_model import ThroughputModel
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = ("Completed", "Failed", "Cancelled")
+
+class FileProgress:
+    """Counters of one file, written only by the thread copying it"""
+    __slots__ = ('name', 'scene_id', 'camera_id', 'size', 'done', 'status', 'folded')
+
+    def __init__(self, name: str, scene_id: str, camera_id: str, size: int, status: str):
+        self.name = name
+        self.scene_id = scene_id
+        self.camera_id = camera_id
+        self.size = size
+        self.done = 0
+        self.status = status
+        self.folded: Optional[int] = None  # Bytes counted in the running totals once the file is finished
+
+class ProgressAggregator:
+    """Collects copy progress from the worker threads and reports it in batches
+
+    Workers only store plain attributes on their file's counters, so they
+    take no lock and build no events per chunk; only when a file starts or
+    changes status it joins the active set under a lock. A reporter thread
+    reads the counters of the active files `rate_hz` times a second and
+    hands one snapshot to `callback`. Files not started yet and finished
+    files are kept as running totals per camera, a finished file is folded
+    into them once after its final status was sent, so a snapshot costs
+    the files in flight rather than the whole session. The
+    snapshot has the files that changed since the previous one, the totals,
+    and the throughput and ETA of `model`, which averages the rate of each
+    camera over about `window` seconds. Nothing is sent while nothing
+    changes, except an update once a second so a stalled transfer shows
+    up. Every `log_interval` seconds the estimate is also logged.
+    """
+
+    def __init__(self, callback: Callable[[dict], None], rate_hz: float = 10.0, window: float = 5.0,
+                 extras: Optional[Callable[[], dict]] = None, log_interval: float = 30.0):
+        self.callback = callback
+        self.interval = 1.0 / rate_hz
+        self.model = ThroughputModel(tau=window)
+        self.log_interval = log_interval
+        self.extras = extras  # Further values for the totals, evaluated once per snapshot
+        self.totals: Dict[str, int] = {"total_files": 0, "copied_files": 0, "failed_files": 0}
+        self._files: Dict[str, FileProgress] = {}
+        self._active: Dict[str, FileProgress] = {}  # Started files and files whose status changed
+        self._lock = threading.Lock()  # Active set and running totals, taken once per file transition
+        self._total_bytes = 0
+        self._folded_bytes = 0
+        self._camera_pending: Dict[str, int] = {}  # camera -> bytes of the files not started yet
+        self._camera_folded: Dict[str, int] = {}   # camera -> bytes of the finished files
+        self._sent: Dict[str, Tuple[int, str]] = {}
+        self._started = time.monotonic()
+        self._last_emit = 0.0
+        self._last_log = time.monotonic()
+        self._last_totals: Optional[tuple] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_file(self, key: str, name: str, scene_id: str, camera_id: str, size: int, status: str = "Pending"):
+        """Register a file before it is copied"""
+        progress = FileProgress(name, scene_id, camera_id, size, status)
+        with self._lock:
+            self._files[key] = progress
+            self._total_bytes += size
+            self._camera_pending.setdefault(camera_id, 0)
+            self._camera_folded.setdefault(camera_id, 0)
+            if status == "Completed":
+                progress.done = size
+                self._fold(progress)
+            else:
+                self._camera_pending[camera_id] += size
+
+    def update(self, key: str, done: int):
+        """Bytes of a file on disk so far"""
+        progress = self._files.get(key)
+        if progress is not None:
+            progress.done = done
+            if progress.status != "Copying...":
+                self._activate(key, progress, "Copying...")
+
+    def set_status(self, key: str, status: str, done: Optional[int] = None):
+        progress = self._files.get(key)
+        if progress is not None:
+            if done is not None:
+                progress.done = done
+            self._activate(key, progress, status)
+
+    def _activate(self, key: str, progress: FileProgress, status: str):
+        """Move a file into the active set, out of the running totals it was counted in"""
+        with self._lock:
+            progress.status = status
+            if key in self._active:
+                return
+            if progress.folded is not None:
+                self._folded_bytes -= progress.folded
+                self._camera_folded[progress.camera_id] -= progress.folded
+                progress.folded = None
+            else:
+                self._camera_pending[progress.camera_id] -= progress.size
+            self._active[key] = progress
+
+    def _fold(self, progress: FileProgress):
+        """Count a finished file in the running totals, with the lock held"""
+        progress.folded = progress.done
+        self._folded_bytes += progress.done
+        self._camera_folded[progress.camera_id] += progress.done
+
+    def start(self):
+        self._started = time.monotonic()
+        self._last_log = self._started
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="progress-aggregator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop reporting after a final snapshot"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        totals = self._emit(force=True)
+        rates = {camera_id: round(rate / 1e6, 1) for camera_id, rate in sorted(self.model.rates.items())}
+        logger.info(f"Copied {totals['bytes_done'] / 1e9:.2f} GB in {totals['duration']:.0f}s, "
+                    f"last rate per camera (MB/s): {rates}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._emit()
+            except Exception as e:
+                logger.error(f"Progress snapshot failed: {e}", exc_info=True)
+
+    def snapshot(self) -> Tuple[list, dict]:
+        """Files changed since the previous snapshot and the current totals"""
+        with self._lock:
+            active = list(self._active.items())
+            done_bytes = self._folded_bytes
+            total_bytes = self._total_bytes
+            camera_done = dict(self._camera_folded)
+            camera_left = dict(self._camera_pending)
+        files = []
+        finished = []
+        for key, progress in active:
+            done, status = progress.done, progress.status
+            done_bytes += done
+            camera_done[progress.camera_id] += done
+            # Failed and cancelled files are not copied any more in this run
+            left = progress.size - done if status not in ("Failed", "Cancelled") else 0
+            camera_left[progress.camera_id] += max(left, 0)
+            if status in FINAL_STATUSES:
+                finished.append((key, progress))
+            if self._sent.get(key) != (done, status):
+                self._sent[key] = (done, status)
+                files.append({
+                    "key": key,
+                    "file": progress.name,
+                    "progress": done * 100 / progress.size if progress.size else (100 if status == "Completed" else 0),
+                    "scene_id": progress.scene_id,
+                    "status": status,
+                    "camera_id": progress.camera_id
+                })
+
+        # Their final state is sent, from now on they only count in the totals
+        with self._lock:
+            for key, progress in finished:
+                if progress.status in FINAL_STATUSES and self._active.get(key) is progress:
+                    del self._active[key]
+                    self._sent.pop(key, None)
+                    self._fold(progress)
+
+        now = time.monotonic()
+        # A finished camera keeps its last rate instead of decaying towards zero
+        self.model.update(now, {camera_id: done for camera_id, done in camera_done.items()
+                                if camera_left[camera_id] > 0})
+        totals = dict(self.totals)
+        totals.update({
+            "bytes_done": done_bytes,
+            "total_bytes": total_bytes,
+            "duration": now - self._started
+        })
+        totals.update(self.model.estimate(camera_left))
+        return files, totals
+
+    def _emit(self, force: bool = False) -> dict:
+        files, totals = self.snapshot()
+        now = time.monotonic()
+        if now - self._last_log >= self.log_interval:
+            self._last_log = now
+            self._log_estimate(totals)
+        counts = (totals["copied_files"], totals["failed_files"], totals["total_files"])
+        if not (force or files or counts != self._last_totals or now - self._last_emit >= 1.0):
+            return totals
+        self._last_emit = now
+        self._last_totals = counts
+        if self.extras is not None:
+            totals.update(self.extras())
+        totals["files"] = files
+        self.callback(totals)
+        return totals
+
+    @staticmethod
+    def _log_estimate(totals: dict):
+        eta = f"{totals['eta']:.0f}s" if totals["eta"] is not None else "unknown"
+        message = (f"Throughput {totals['speed'] / 1e6:.1f} MB/s, {totals['bytes_done'] / 1e9:.2f} of "
+                   f"{totals['total_bytes'] / 1e9:.2f} GB, ETA {eta}")
+        bottleneck = totals.get("bottleneck")
+        if totals.get("capped"):
+            message += ", limited by the number of concurrent downloads"
+        elif bottleneck:
+            camera = totals["cameras"][bottleneck]
+            message += (f", limited by {bottleneck} ({camera['mb_s']} MB/s, "
+                        f"{camera['remaining'] / 1e9:.2f} GB left)")
+        logger.info(message)
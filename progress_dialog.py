@@ -19,6 +19,8 @@ class CopySettingsThread(QThread):
         
     def run(self):
         try:
+            last_percent = [None]
+            
             def progress_callback(action, data):
                 if not self.is_running:
                     return True  # Signal cancellation
@@ -27,13 +29,16 @@ class CopySettingsThread(QThread):
                     self.status_signal.emit(data)
                 elif action == "progress":
                     current, total = data
-                    self.progress_signal.emit(current, total)
+                    # Only changes of the shown percentage reach the GUI thread
+                    percent = int(current * 100 / total) if total else 0
+                    if percent != last_percent[0]:
+                        last_percent[0] = percent
+                        self.progress_signal.emit(current, total)
                 elif action == "log":
                     self.log_signal.emit(data)
                 elif action == "complete":
                     self.complete_signal.emit()
                     
-                QApplication.processEvents()
                 return False  # Continue execution
                 
             # Add a method to check for cancellation in the callback
@@ -111,7 +116,6 @@ class SettingsProgressDialog(QDialog):
         
     def update_status(self, status):
         self.status_label.setText(status)
-        QApplication.processEvents()
         
     def update_progress(self, current, total):
         """Update the progress bar"""
@@ -119,7 +123,6 @@ class SettingsProgressDialog(QDialog):
             if total > 0:
                 progress = int((current / total) * 100)
                 self.progress_bar.setValue(progress)
-                QApplication.processEvents()
         except Exception as e:
             print(f"Error updating progress: {e}")
             
@@ -129,7 +132,6 @@ class SettingsProgressDialog(QDialog):
         cursor.insertText(message + "\n")
         self.log_text.setTextCursor(cursor)
         self.log_text.ensureCursorVisible()
-        QApplication.processEvents()
         
     def complete(self):
         """Called when operation is complete"""
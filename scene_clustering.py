@@ -0,0 +1,121 @@
+import logging
+from typing import Hashable, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+def factorize(values: Sequence[Optional[Hashable]]) -> Tuple[np.ndarray, List[Hashable]]:
+    """Map values to dense integer codes, None becomes -1
+
+    Returns:
+        Tuple: (codes, unique values in order of first appearance)
+    """
+    codes = np.empty(len(values), dtype=np.int64)
+    uniques: dict = {}
+    for i, value in enumerate(values):
+        if value is None or value == '':
+            codes[i] = -1
+        else:
+            codes[i] = uniques.setdefault(value, len(uniques))
+    return codes, list(uniques)
+
+def cluster_scenes(timestamps: np.ndarray, camera_index: np.ndarray,
+                   group_ids: Optional[np.ndarray] = None, gap: float = 5.0,
+                   one_per_camera: bool = True, isolate_groups: bool = False) -> np.ndarray:
+    """Split files from all cameras into scenes
+
+    Files are sorted once by time and a new scene starts wherever the gap to
+    everything before it exceeds `gap` seconds. Files sharing a group id
+    (bursts, time-lapses, JPG+GPR pairs) form one unit that is never split.
+    With `one_per_camera` a scene also ends where a unit starts more than
+    `gap` seconds after the first unit of the scene or comes from a camera
+    already in it, so a camera that missed one shot does not shift its
+    later shots into other scenes. Sorting and segmentation are O(n log n)
+    in NumPy, the per-camera split is one pass over the units.
+
+    Args:
+        timestamps: Creation times in seconds
+        camera_index: Integer camera code per file
+        group_ids: Integer group code per file, -1 for ungrouped files
+        gap: Maximum gap in seconds inside a scene
+        one_per_camera: Allow only one unit per camera in a scene
+        isolate_groups: Close the scene after a group so it is not merged with later files
+
+    Returns:
+        np.ndarray: Scene number per file, numbered chronologically from 0
+    """
+    t = np.asarray(timestamps, dtype=np.float64)
+    cam = np.asarray(camera_index, dtype=np.int64)
+    n = len(t)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    g = np.full(n, -1, dtype=np.int64) if group_ids is None else np.asarray(group_ids, dtype=np.int64)
+
+    # A group spans from its first to its last file
+    start = t.copy()
+    end = t.copy()
+    grouped = g >= 0
+    if grouped.any():
+        codes, inverse = np.unique(g[grouped], return_inverse=True)
+        group_start = np.full(len(codes), np.inf)
+        group_end = np.full(len(codes), -np.inf)
+        np.minimum.at(group_start, inverse, t[grouped])
+        np.maximum.at(group_end, inverse, t[grouped])
+        start[grouped] = group_start[inverse]
+        end[grouped] = group_end[inverse]
+
+    order = np.lexsort((cam, t, g, start))
+    s, e, gs, cs = start[order], end[order], g[order], cam[order]
+
+    # Gap-based segmentation against the running end of the current segment
+    boundary = np.empty(n, dtype=bool)
+    boundary[0] = True
+    boundary[1:] = s[1:] - np.maximum.accumulate(e)[:-1] > gap
+    if isolate_groups:
+        boundary[1:] |= (gs[1:] != gs[:-1]) & (gs[:-1] >= 0)
+    segment = np.cumsum(boundary) - 1
+
+    if not one_per_camera:
+        labels = np.empty(n, dtype=np.int64)
+        labels[order] = segment
+        return labels
+
+    # Units: a whole group or a single file, in time order
+    unit = np.where(gs >= 0, gs, np.arange(n) + (gs.max() + 1 if grouped.any() else 0))
+    _, first, unit_inverse = np.unique(unit, return_index=True, return_inverse=True)
+    unit_order = np.argsort(first, kind='stable')
+    unit_start = s[first].tolist()
+    unit_camera = cs[first].tolist()
+    unit_segment = segment[first].tolist()
+
+    # A scene ends where a unit starts more than `gap` after the scene start
+    # or comes from a camera that is already in the scene
+    unit_scene = np.empty(len(first), dtype=np.int64)
+    scene = -1
+    scene_start = 0.0
+    scene_segment = -1
+    cameras: set = set()
+    for u in unit_order.tolist():
+        if unit_segment[u] != scene_segment or unit_start[u] - scene_start > gap or unit_camera[u] in cameras:
+            scene += 1
+            scene_start = unit_start[u]
+            scene_segment = unit_segment[u]
+            cameras = set()
+        cameras.add(unit_camera[u])
+        unit_scene[u] = scene
+
+    labels = np.empty(n, dtype=np.int64)
+    labels[order] = unit_scene[unit_inverse.ravel()]
+    return labels
+
+def group_by_labels(items: Sequence[T], labels: np.ndarray, timestamps: np.ndarray) -> List[List[T]]:
+    """Collect items into their scenes, each scene sorted by time"""
+    if len(items) == 0:
+        return []
+    order = np.lexsort((np.asarray(timestamps, dtype=np.float64), labels))
+    sorted_labels = labels[order]
+    splits = np.flatnonzero(sorted_labels[1:] != sorted_labels[:-1]) + 1
+    return [[items[i] for i in chunk] for chunk in np.split(order, splits)]
@@ -0,0 +1,214 @@
+import logging
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from scene_clustering import cluster_scenes
+
+logger = logging.getLogger(__name__)
+
+# Upper bound of candidate pairs per camera when estimating clock offsets
+MAX_OFFSET_CANDIDATES = 2_000_000
+
+@dataclass
+class TakeMatch:
+    """Result of matching units (files, groups or chapter chains) into takes"""
+    labels: np.ndarray      # Take number per unit, numbered chronologically
+    confidence: np.ndarray  # Confidence per take (0..1)
+    offsets: np.ndarray     # Clock offset per camera code in seconds (camera clock - reference clock)
+
+def estimate_clock_offsets(times: np.ndarray, cameras: np.ndarray, n_cameras: int,
+                           reference: Optional[int] = None, max_offset: float = 30.0,
+                           tolerance: float = 1.0, min_support: int = 2) -> np.ndarray:
+    """Estimate the clock offset of every camera relative to a reference camera
+
+    For each camera all time differences to the reference camera within
+    `max_offset` are candidates; the offset supported by the most pairs
+    within `tolerance` wins (ties go to the smallest offset) and is refined
+    as the median of the supporting differences. Cameras without enough
+    overlap with the reference get NaN.
+
+    Args:
+        times: Unit start times in seconds
+        cameras: Camera code per unit (0..n_cameras-1)
+        n_cameras: Number of cameras
+        reference: Reference camera code (the camera with most units by default)
+
+    Returns:
+        np.ndarray: Offset per camera code, NaN where it could not be estimated
+    """
+    times = np.asarray(times, dtype=np.float64)
+    cameras = np.asarray(cameras, dtype=np.int64)
+    offsets = np.full(n_cameras, np.nan)
+    if len(times) == 0:
+        return offsets
+
+    if reference is None:
+        reference = int(np.argmax(np.bincount(cameras, minlength=n_cameras)))
+    offsets[reference] = 0.0
+    ref_times = np.sort(times[cameras == reference])
+
+    for camera in range(n_cameras):
+        if camera == reference:
+            continue
+        cam_times = np.sort(times[cameras == camera])
+        if len(cam_times) == 0 or len(ref_times) == 0:
+            continue
+
+        lo = np.searchsorted(ref_times, cam_times - max_offset, side='left')
+        hi = np.searchsorted(ref_times, cam_times + max_offset, side='right')
+        counts = hi - lo
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        if total > MAX_OFFSET_CANDIDATES:
+            step = int(np.ceil(total / MAX_OFFSET_CANDIDATES))
+            cam_times, lo, counts = cam_times[::step], lo[::step], counts[::step]
+            total = int(counts.sum())
+
+        # All (camera unit, reference unit) pairs within max_offset
+        cam_idx = np.repeat(np.arange(len(cam_times)), counts)
+        within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        diffs = np.sort(cam_times[cam_idx] - ref_times[np.repeat(lo, counts) + within])
+
+        support = np.searchsorted(diffs, diffs + tolerance, side='right') - \
+                  np.searchsorted(diffs, diffs - tolerance, side='left')
+        best_support = support.max()
+        if best_support < min_support:
+            continue
+        candidates = np.flatnonzero(support == best_support)
+        best = diffs[candidates[np.argmin(np.abs(diffs[candidates]))]]
+        window = diffs[(diffs >= best - tolerance) & (diffs <= best + tolerance)]
+        offsets[camera] = float(np.median(window))
+
+    return offsets
+
+def _assign_monotone(unit_times: np.ndarray, centers: np.ndarray, reach: int = 8) -> np.ndarray:
+    """Assign sorted units to sorted take centers, order-preserving and one unit per take
+
+    Dynamic programming minimizing the total absolute deviation. Unit i can
+    only take slot i + d with d between 0 and the number of missed takes,
+    and d never decreases, so each row of the table is a band of offsets.
+    The band is further cut to the `reach` centers on either side of the
+    unit's nearest one (widened until every row has a feasible offset), so
+    a unit only competes for nearby takes. Memory and time are O(units * band).
+    """
+    m, k = len(unit_times), len(centers)
+    spare = k - m
+    if spare <= 0 or m == 0:
+        return np.arange(m)
+    rows = np.arange(m)
+    nearest = np.clip(np.searchsorted(centers, unit_times), 0, k - 1)
+    reach = max(int(reach), 1)  # Doubling from 0 would never widen the band
+    while True:
+        lo = np.maximum.accumulate(np.clip(nearest - reach - rows, 0, spare))
+        hi = np.minimum.accumulate(np.clip(nearest + reach - rows, 0, spare)[::-1])[::-1]
+        if (lo <= hi).all():
+            break
+        reach *= 2  # At reach >= takes the band is the full 0..spare
+
+    width = int((hi - lo).max()) + 1
+    columns = np.arange(width)
+    choice = np.zeros((m, width), dtype=np.int32)  # Column of the previous row on the best path
+    offsets = lo[0] + columns
+    total = np.where(offsets <= hi[0], np.abs(unit_times[0] - centers[np.minimum(offsets, spare)]), np.inf)
+    for i in range(1, m):
+        # Best previous assignment with an offset up to each column's offset
+        best = np.minimum.accumulate(total)
+        improved = np.concatenate(([False], total[1:] < best[:-1]))
+        best_arg = np.maximum.accumulate(np.where(improved, columns, 0))
+        offsets = lo[i] + columns
+        previous = np.minimum(offsets - lo[i - 1], width - 1)
+        cost = np.abs(unit_times[i] - centers[i + np.minimum(offsets, spare)])
+        total = np.where(offsets <= hi[i], cost + best[previous], np.inf)
+        choice[i] = best_arg[previous]
+
+    slots = np.empty(m, dtype=np.int64)
+    column = int(np.argmin(total))
+    slots[-1] = m - 1 + lo[-1] + column
+    for i in range(m - 1, 0, -1):
+        column = int(choice[i, column])
+        slots[i - 1] = i - 1 + lo[i - 1] + column
+    return slots
+
+def match_takes(times: np.ndarray, cameras: np.ndarray, n_cameras: int,
+                offsets: Optional[np.ndarray] = None, gap: float = 5.0, tolerance: float = 2.0,
+                estimate_offsets: bool = True, max_offset: float = 30.0) -> TakeMatch:
+    """Match units from all cameras into takes with one unit per camera
+
+    Camera times are corrected by the per-camera clock offsets (measured
+    values win, missing ones are estimated from the data when
+    `estimate_offsets` is set). The corrected times are split into segments
+    by `gap`; a segment where a camera has several units holds as many takes
+    as the largest such count. Cameras with fewer units are assigned to the
+    takes by an order-preserving optimal sweep.
+
+    Confidence of a take is its camera coverage times 1 / (1 + spread / tolerance),
+    where spread is the range of corrected times inside the take.
+
+    Args:
+        times: Unit start times in seconds
+        cameras: Camera code per unit (0..n_cameras-1)
+        n_cameras: Number of cameras in the session
+        offsets: Measured clock offsets per camera code, NaN where unknown
+
+    Returns:
+        TakeMatch: Take labels per unit, confidence per take and the offsets used
+    """
+    times = np.asarray(times, dtype=np.float64)
+    cameras = np.asarray(cameras, dtype=np.int64)
+    n = len(times)
+
+    used_offsets = np.full(n_cameras, np.nan) if offsets is None else np.asarray(offsets, dtype=np.float64).copy()
+    if estimate_offsets and np.isnan(used_offsets).any() and n:
+        estimated = estimate_clock_offsets(times, cameras, n_cameras, max_offset=max_offset)
+        missing = np.isnan(used_offsets)
+        used_offsets[missing] = estimated[missing]
+    used_offsets = np.nan_to_num(used_offsets, nan=0.0)
+
+    if n == 0:
+        return TakeMatch(np.empty(0, dtype=np.int64), np.empty(0), used_offsets)
+
+    corrected = times - used_offsets[cameras]
+    segments = cluster_scenes(corrected, cameras, gap=gap, one_per_camera=False)
+
+    labels = np.empty(n, dtype=np.int64)
+    next_take = 0
+    order = np.lexsort((corrected, segments))
+    bounds = np.flatnonzero(np.diff(segments[order])) + 1
+    for members in np.split(order, bounds):
+        member_cameras = cameras[members]
+        counts = np.bincount(member_cameras, minlength=n_cameras)
+        takes = int(counts.max())
+        if takes == 1:
+            labels[members] = next_take
+            next_take += 1
+            continue
+
+        # Take centers from the cameras that saw every take of the segment
+        full = np.flatnonzero(counts == takes)
+        centers = np.median(
+            np.stack([corrected[members[member_cameras == camera]] for camera in full]), axis=0
+        )
+        for camera in np.flatnonzero(counts):
+            camera_members = members[member_cameras == camera]
+            if counts[camera] == takes:
+                slots = np.arange(takes)
+            else:
+                slots = _assign_monotone(corrected[camera_members], centers)
+            labels[camera_members] = next_take + slots
+        next_take += takes
+
+    # Confidence per take
+    take_cameras: List[set] = [set() for _ in range(next_take)]
+    for label, camera in zip(labels.tolist(), cameras.tolist()):
+        take_cameras[label].add(camera)
+    coverage = np.array([len(c) for c in take_cameras], dtype=np.float64) / max(n_cameras, 1)
+    take_min = np.full(next_take, np.inf)
+    take_max = np.full(next_take, -np.inf)
+    np.minimum.at(take_min, labels, corrected)
+    np.maximum.at(take_max, labels, corrected)
+    confidence = coverage / (1.0 + (take_max - take_min) / tolerance)
+
+    return TakeMatch(labels, confidence, used_offsets)
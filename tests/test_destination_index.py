@@ -0,0 +1,29 @@
+import os
+
+from destination_index import DestinationIndex
+
+def test_find_sees_a_file_truncated_in_place(tmp_path):
+    scene = tmp_path / "scene01"
+    scene.mkdir()
+    video = scene / "C0_GX010001.MP4"
+    video.write_bytes(b"x" * 1000)
+    index = DestinationIndex(tmp_path)
+    index.scan()
+    listed = os.stat(scene).st_mtime
+
+    with open(video, "r+b") as f:
+        f.truncate(10)
+    os.utime(scene, (listed, listed))  # The directory looks unchanged to the rescan
+    index.scan()
+
+    assert index.find(video).size == 10
+
+def test_find_forgets_a_deleted_file(tmp_path):
+    video = tmp_path / "C0_GX010001.MP4"
+    video.write_bytes(b"x")
+    index = DestinationIndex(tmp_path)
+    index.scan()
+    video.unlink()
+
+    assert index.find(video) is None
+    assert index.get(video.name) is None
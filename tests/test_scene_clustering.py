@@ -0,0 +1,49 @@
+import numpy as np
+
+from scene_clustering import cluster_scenes
+
+def _baseline_scenes(timestamps, cameras, gap):
+    """The original per-file rule: within `gap` of the scene start and one file per camera"""
+    order = sorted(range(len(timestamps)), key=lambda i: timestamps[i])
+    labels = [0] * len(timestamps)
+    scene = -1
+    scene_start = None
+    scene_cameras = set()
+    for i in order:
+        if scene_start is None or timestamps[i] - scene_start > gap or cameras[i] in scene_cameras:
+            scene += 1
+            scene_start = timestamps[i]
+            scene_cameras = set()
+        scene_cameras.add(cameras[i])
+        labels[i] = scene
+    return labels
+
+def test_missed_shot_does_not_shift_later_shots():
+    # Three cameras fire every 3 s, camera 2 misses the second shot
+    timestamps, cameras = [], []
+    for shot in range(4):
+        for camera in range(3):
+            if camera == 2 and shot == 1:
+                continue
+            timestamps.append(shot * 3.0 + camera * 0.1)
+            cameras.append(camera)
+    labels = cluster_scenes(np.array(timestamps), np.array(cameras), gap=5.0)
+    expected = [int(round(t // 3)) for t in timestamps]
+    assert labels.tolist() == expected
+
+def test_matches_baseline_rule():
+    rng = np.random.default_rng(7)
+    for _ in range(200):
+        n = int(rng.integers(1, 40))
+        timestamps = np.cumsum(rng.exponential(2.0, n))
+        cameras = rng.integers(0, 4, n)
+        labels = cluster_scenes(timestamps, cameras, gap=5.0)
+        assert labels.tolist() == _baseline_scenes(timestamps.tolist(), cameras.tolist(), 5.0)
+
+def test_group_is_one_unit():
+    # A burst of camera 0 stays in one scene next to the single shot of camera 1
+    timestamps = np.array([0.0, 0.5, 1.0, 0.2])
+    cameras = np.array([0, 0, 0, 1])
+    groups = np.array([3, 3, 3, -1])
+    labels = cluster_scenes(timestamps, cameras, groups, gap=5.0)
+    assert labels.tolist() == [0, 0, 0, 0]
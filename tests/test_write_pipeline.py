@@ -0,0 +1,100 @@
+import io
+import os
+import threading
+
+import pytest
+
+import write_pipeline
+from file_transfer import copy_stream
+from write_pipeline import BufferPool, LagBudget, WritePipeline
+
+BUFFER_SIZE = 4096
+
+@pytest.fixture
+def pipeline():
+    pipeline = WritePipeline(buffers=4, buffer_size=BUFFER_SIZE)
+    yield pipeline
+    pipeline.close()
+
+@pytest.fixture
+def failing_write(monkeypatch):
+    """The first write to `failing["fd"]` (any file if None) blocks until released, then fails"""
+    release = threading.Event()
+    calls = []
+    failing = {"fd": None, "failed": False}
+    real_write_at = write_pipeline.write_at
+
+    def write_at(fd, data, offset, lock):
+        calls.append((fd, offset))
+        if not failing["failed"] and failing["fd"] in (None, fd):
+            failing["failed"] = True
+            release.wait(5)
+            raise OSError(28, "No space left on device")
+        real_write_at(fd, data, offset, lock)
+    monkeypatch.setattr(write_pipeline, "write_at", write_at)
+    return release, calls, failing
+
+def _open(path):
+    return os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0))
+
+def test_writes_queued_after_a_failed_write_are_not_counted(tmp_path, pipeline, failing_write):
+    release, calls, _ = failing_write
+    fd = _open(tmp_path / "file.part")
+    try:
+        stream = pipeline.open_stream(fd)
+        for index in range(3):
+            stream.submit(pipeline.pool.acquire(), BUFFER_SIZE, index * BUFFER_SIZE)
+        release.set()
+        with pytest.raises(OSError):
+            stream.drain()
+    finally:
+        os.close(fd)
+    assert stream.written == 0
+    assert calls == [(fd, 0)]
+    assert pipeline.pool.in_use == 0
+
+def test_copy_stream_reports_no_progress_for_skipped_writes(tmp_path, pipeline, failing_write):
+    release, _, _ = failing_write
+    reported = []
+    timer = threading.Timer(0.2, release.set)  # The pool is empty by then, later reads wait for the writer
+    timer.start()
+    fd = _open(tmp_path / "file.part")
+    try:
+        with pytest.raises(OSError):
+            copy_stream(io.BytesIO(os.urandom(8 * BUFFER_SIZE)), fd, on_chunk=reported.append, pipeline=pipeline)
+    finally:
+        timer.cancel()
+        os.close(fd)
+    assert sum(reported) == 0
+    assert (tmp_path / "file.part").stat().st_size == 0
+
+def test_mirror_keeps_gaps_for_skipped_writes(tmp_path, pipeline, failing_write):
+    release, _, failing = failing_write
+    primary_fd = _open(tmp_path / "primary.part")
+    mirror_fd = _open(tmp_path / "mirror.part")
+    failing["fd"] = mirror_fd
+    try:
+        mirror = pipeline.open_mirror(mirror_fd, LagBudget(16 * BUFFER_SIZE))
+        stream = pipeline.mirrored([mirror]).open_stream(primary_fd)
+        for index in range(3):
+            stream.submit(pipeline.pool.acquire(), BUFFER_SIZE, index * BUFFER_SIZE)
+        release.set()
+        stream.drain()
+        mirror.wait()
+    finally:
+        os.close(primary_fd)
+        os.close(mirror_fd)
+    assert stream.written == 3 * BUFFER_SIZE
+    assert mirror.error is not None
+    assert mirror.gaps(3 * BUFFER_SIZE) == [(0, 3 * BUFFER_SIZE)]
+    assert pipeline.pool.in_use == 0
+
+def test_try_acquire_leaves_the_reserve_to_the_readers():
+    pool = BufferPool(4, BUFFER_SIZE)
+    held = [pool.try_acquire(reserve=2), pool.try_acquire(reserve=2)]
+    assert all(buffer is not None for buffer in held)
+    assert pool.try_acquire(reserve=2) is None
+    readers = [pool.acquire(), pool.acquire()]
+    for buffer in held + readers:
+        pool.release(buffer)
+    assert pool.in_use == 0
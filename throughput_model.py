@@ -0,0 +1,109 @@
+import math
+from typing import Dict, Optional, Tuple
+
+class ThroughputModel:
+    """Transfer rate per camera and the predicted end of the session
+
+    Each camera's rate is an exponentially weighted average of the bytes
+    all its lanes delivered between two samples, with time constant `tau`
+    seconds, so a stalled camera slows its estimate down within seconds.
+    Progress arrives in whole write buffers, so for the first `tau` seconds
+    the rate is the plain average since the camera was first seen instead.
+
+    The lanes of a camera share its link and the cameras run side by side,
+    so the session ends when the camera with the most remaining time is
+    done: the ETA is the largest remaining bytes / rate over the cameras.
+    A camera that has not delivered anything yet uses its rate from earlier
+    sessions, or the average rate of the cameras that have.
+
+    When more transfers are waiting than the host runs at once
+    (`set_download_cap`), the cameras take turns instead of running side by
+    side, so the ETA is at least the total remaining bytes over what
+    `max_active` transfers deliver at the cameras' average rate per transfer.
+    """
+
+    def __init__(self, tau: float = 5.0):
+        self.tau = tau
+        self.rates: Dict[str, float] = {}     # camera -> bytes/s
+        self.priors: Dict[str, float] = {}    # camera -> bytes/s measured in earlier sessions
+        self._first: Dict[str, Tuple[float, int]] = {}  # camera -> (time, bytes done) of the first sample
+        self._last: Dict[str, Tuple[float, int]] = {}   # camera -> (time, bytes done)
+        self.max_active: Optional[int] = None  # Transfers the host runs at once over all cameras
+        self.transfers_per_camera = 1
+
+    def set_download_cap(self, max_active: int, transfers_per_camera: int = 1):
+        self.max_active = max(1, max_active)
+        self.transfers_per_camera = max(1, transfers_per_camera)
+
+    def set_prior(self, camera_id: str, rate: Optional[float]):
+        if rate:
+            self.priors[camera_id] = rate
+
+    def update(self, now: float, done: Dict[str, int]):
+        """Add a sample of the bytes done per camera, for the cameras that still have work"""
+        for camera_id, camera_done in done.items():
+            first = self._first.setdefault(camera_id, (now, camera_done))
+            last = self._last.get(camera_id)
+            self._last[camera_id] = (now, camera_done)
+            if last is None:
+                continue
+            elapsed = now - last[0]
+            delivered = camera_done - last[1]
+            if elapsed <= 0 or delivered < 0:
+                continue  # A restarted file reports fewer bytes, skip that sample
+            age = now - first[0]
+            if age < self.tau or camera_id not in self.rates:
+                if camera_done > first[1]:  # Until then the prior stays in use
+                    self.rates[camera_id] = (camera_done - first[1]) / age
+            else:
+                weight = 1 - math.exp(-elapsed / self.tau)
+                self.rates[camera_id] += weight * (delivered / elapsed - self.rates[camera_id])
+
+    def rate(self, camera_id: str) -> Optional[float]:
+        """Expected bytes/s of a camera"""
+        rate = self.rates.get(camera_id)
+        if rate:
+            return rate
+        if camera_id in self.priors:
+            return self.priors[camera_id]
+        measured = [rate for rate in self.rates.values() if rate > 0]
+        return sum(measured) / len(measured) if measured else None
+
+    def estimate(self, remaining: Dict[str, int]) -> dict:
+        """Speed, ETA and the camera that limits the ETA
+
+        Args:
+            remaining: Bytes left to copy per camera
+        """
+        cameras = {}
+        eta: Optional[float] = 0.0
+        bottleneck = None
+        capped = False
+        for camera_id, left in remaining.items():
+            rate = self.rate(camera_id)
+            camera_eta = 0.0 if left <= 0 else (left / rate if rate else None)
+            cameras[camera_id] = {
+                "mb_s": round(self.rates.get(camera_id, 0.0) / 1e6, 1),
+                "remaining": left,
+                "eta": camera_eta
+            }
+            if camera_eta is None:
+                eta = None
+            elif eta is not None and camera_eta > eta:
+                eta = camera_eta
+                bottleneck = camera_id
+        busy = [camera_id for camera_id, left in remaining.items() if left > 0]
+        if eta is not None and self.max_active and len(busy) * self.transfers_per_camera > self.max_active:
+            per_transfer = sum(self.rate(camera_id) for camera_id in busy) / (len(busy) * self.transfers_per_camera)
+            capped_eta = sum(remaining[camera_id] for camera_id in busy) / (per_transfer * self.max_active)
+            if capped_eta > eta:
+                eta = capped_eta
+                capped = True
+        return {
+            "speed": sum(rate for camera_id, rate in self.rates.items()
+                         if remaining.get(camera_id, 0) > 0),
+            "eta": eta if remaining else None,
+            "bottleneck": bottleneck,
+            "capped": capped,  # The ETA is set by the limit on concurrent transfers, not by one camera
+            "cameras": cameras
+        }
@@ -0,0 +1,162 @@
+import atexit
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+import requests
+
+from camera_http import keep_alive_url, turbo_transfer_url
+from utils import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+KEEP_ALIVE_INTERVAL = 3.0  # Seconds, as recommended by the OpenAPI spec
+
+class TurboTransferSession:
+    """Turbo Transfer on the cameras of one copy session
+
+    `start` enables Turbo Transfer on all cameras at once and starts a
+    keep alive thread so no camera falls asleep during the offload. `stop`
+    disables it again on every camera where it was enabled; it runs from
+    the copy thread's `finally` and, as a last resort, at interpreter exit.
+    """
+
+    def __init__(self, session: requests.Session, camera_ips: Dict[str, str],
+                 keep_alive_interval: float = KEEP_ALIVE_INTERVAL, timeout: float = 5):
+        self.session = session
+        self.camera_ips = dict(camera_ips)
+        self.keep_alive_interval = keep_alive_interval
+        self.timeout = timeout
+        self.enabled: Set[str] = set()
+        self._stop = threading.Event()
+        self._keep_alive_thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'TurboTransferSession':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def is_enabled(self, camera_id: str) -> bool:
+        return camera_id in self.enabled
+
+    def start(self):
+        """Enable Turbo Transfer on every camera and start the keep alive"""
+        if not self.camera_ips:
+            return
+        atexit.register(self.stop)
+        results = self._for_all_cameras(True)
+        with self._lock:
+            self.enabled = {camera_id for camera_id, ok in results.items() if ok}
+        logger.info(f"Turbo Transfer enabled on {len(self.enabled)} of {len(self.camera_ips)} cameras")
+
+        self._stop.clear()
+        self._keep_alive_thread = threading.Thread(target=self._keep_alive, name="turbo-keep-alive", daemon=True)
+        self._keep_alive_thread.start()
+
+    def disable_all(self):
+        """Switch Turbo Transfer off on every camera, clearing a mode left on by an earlier crash"""
+        results = self._for_all_cameras(False)
+        logger.info(f"Turbo Transfer off on {sum(results.values())} of {len(results)} cameras")
+
+    def stop(self):
+        """Disable Turbo Transfer wherever it was enabled, safe to call more than once"""
+        self._stop.set()
+        if self._keep_alive_thread is not None and self._keep_alive_thread is not threading.current_thread():
+            self._keep_alive_thread.join(timeout=self.timeout)
+        self._keep_alive_thread = None
+
+        with self._lock:
+            enabled, self.enabled = self.enabled, set()
+        if enabled:
+            results = self._for_all_cameras(False, enabled)
+            failed = [camera_id for camera_id, ok in results.items() if not ok]
+            if failed:
+                logger.warning(f"Could not disable Turbo Transfer on cameras: {', '.join(failed)}")
+            else:
+                logger.info(f"Turbo Transfer disabled on {len(enabled)} cameras")
+        atexit.unregister(self.stop)
+
+    def _for_all_cameras(self, enable: bool, camera_ids: Optional[Set[str]] = None) -> Dict[str, bool]:
+        camera_ids = list(camera_ids if camera_ids is not None else self.camera_ips)
+        if not camera_ids:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(32, len(camera_ids))) as executor:
+            results = executor.map(lambda camera_id: self._set_turbo(camera_id, enable), camera_ids)
+            return dict(zip(camera_ids, results))
+
+    def _set_turbo(self, camera_id: str, enable: bool) -> bool:
+        try:
+            response = self.session.get(turbo_transfer_url(self.camera_ips[camera_id], enable), timeout=self.timeout)
+            if response.status_code != 200:
+                logger.warning(f"Turbo Transfer {'on' if enable else 'off'} failed for camera {camera_id}: "
+                               f"{response.status_code}")
+                return False
+            return True
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Turbo Transfer {'on' if enable else 'off'} failed for camera {camera_id}: {e}")
+            return False
+
+    def _keep_alive(self):
+        while not self._stop.wait(self.keep_alive_interval):
+            for camera_id in list(self.enabled):
+                try:
+                    self.session.get(keep_alive_url(self.camera_ips[camera_id]), timeout=self.timeout)
+                except requests.exceptions.RequestException as e:
+                    logger.debug(f"Keep alive failed for camera {camera_id}: {e}")
+
+class TransferThroughput:
+    """Download throughput per camera with and without Turbo Transfer
+
+    Totals are kept across sessions in the data directory so the gain can
+    be compared even when a session ran in only one of the modes.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else get_data_dir() / 'transfer_throughput.json'
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, list]] = {}  # camera -> mode -> [bytes, seconds]
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._totals = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def record(self, camera_id: str, turbo: bool, size: int, seconds: float):
+        if seconds <= 0:
+            return
+        mode = 'turbo' if turbo else 'normal'
+        with self._lock:
+            totals = self._totals.setdefault(camera_id, {}).setdefault(mode, [0, 0.0])
+            totals[0] += size
+            totals[1] += seconds
+
+    def rate(self, camera_id: str, turbo: bool) -> Optional[float]:
+        """Average bytes/s of a camera in a mode over all sessions, None if never measured"""
+        with self._lock:
+            size, seconds = self._totals.get(camera_id, {}).get('turbo' if turbo else 'normal', [0, 0.0])
+        return size / seconds if seconds else None
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """MB/s per camera and mode, plus the turbo gain where both were measured"""
+        result: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            for camera_id, modes in self._totals.items():
+                rates = {mode: round(size / seconds / 1e6, 2) for mode, (size, seconds) in modes.items() if seconds}
+                if rates.get('turbo') and rates.get('normal'):
+                    rates['gain'] = round(rates['turbo'] / rates['normal'], 2)
+                result[camera_id] = rates
+        return result
+
+    def save(self):
+        with self._lock:
+            try:
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(self._totals, f)
+            except OSError as e:
+                logger.warning(f"Failed to save transfer throughput: {e}")
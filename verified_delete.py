@@ -0,0 +1,182 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import requests
+
+from camera_http import media_delete_url
+from copy_manifest import hash_file
+from media_index import MediaIndex, MediaKey
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class DeleteTicket:
+    """A copied file waiting to be deleted from its camera"""
+    key: str
+    camera_id: str
+    camera_path: str  # Path below DCIM, e.g. 100GOPRO/GX010001.MP4
+    primary: Path
+    size: int
+    content_hash: str
+    media_key: MediaKey
+    pending_backups: int
+    attempts: int = 0
+
+class VerifiedDeleter:
+    """Deletes files from the cameras once every copy of them is verified
+
+    A file is tracked when its primary copy is written. When the backups
+    of the file are verified too, the primary is hashed again from disk
+    (unless `reread_primary` is off) and must match the hash taken during
+    the download. Only then is the file deleted on the camera and marked
+    as gone in the media index. Deletes are
+    spaced `interval` seconds apart per camera while the downloads run, so
+    they add a small request now and then instead of a burst; what is left
+    when the session closes is deleted without waiting. A failed backup or
+    hash mismatch keeps the file on the camera.
+    """
+
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, session: requests.Session, camera_ips: Dict[str, str], media_index: MediaIndex,
+                 algorithm: str, interval: float = 1.0, reread_primary: bool = True, timeout: float = 5):
+        self.session = session
+        self.camera_ips = camera_ips
+        self.media_index = media_index
+        self.algorithm = algorithm
+        self.interval = interval
+        self.reread_primary = reread_primary
+        self.timeout = timeout
+        self.deleted = 0
+        self.kept = 0  # Files left on the cameras because a copy could not be verified
+        self._tickets: Dict[str, DeleteTicket] = {}
+        self._queue: List[Tuple[float, int, DeleteTicket]] = []
+        self._next_slot: Dict[str, float] = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closing = False
+        self._verifier = ThreadPoolExecutor(max_workers=2, thread_name_prefix="delete-verify")
+        self._deleters = ThreadPoolExecutor(max_workers=4, thread_name_prefix="camera-delete")
+        self._thread = threading.Thread(target=self._run, name="delete-scheduler", daemon=True)
+        self._thread.start()
+
+    def track(self, key: str, camera_id: str, camera_path: str, primary: Path, size: int,
+              content_hash: str, media_key: MediaKey, backups: int = 0):
+        """Register a file whose primary copy is written, before its backups are finished
+
+        Args:
+            backups: Number of backup copies that still have to be verified
+        """
+        ticket = DeleteTicket(key, camera_id, camera_path, Path(primary), size, content_hash, media_key, backups)
+        if backups:
+            with self._condition:
+                self._tickets[key] = ticket
+        else:
+            self._verifier.submit(self._verify, ticket)
+
+    def backup_verified(self, key: str):
+        with self._condition:
+            ticket = self._tickets.get(key)
+            if ticket is None:
+                return
+            ticket.pending_backups -= 1
+            if ticket.pending_backups > 0:
+                return
+            del self._tickets[key]
+        self._verifier.submit(self._verify, ticket)
+
+    def backup_failed(self, key: str):
+        with self._condition:
+            ticket = self._tickets.pop(key, None)
+            if ticket is not None:
+                self.kept += 1
+        if ticket is not None:
+            logger.warning(f"Keeping {ticket.camera_path} on {ticket.camera_id}: a backup copy failed")
+
+    def _verify(self, ticket: DeleteTicket):
+        try:
+            if ticket.primary.stat().st_size != ticket.size:
+                raise ValueError("size differs")
+            if self.reread_primary and hash_file(ticket.primary, self.algorithm) != ticket.content_hash:
+                raise ValueError("hash differs")
+        except (OSError, ValueError) as e:
+            with self._condition:
+                self.kept += 1
+            logger.error(f"Keeping {ticket.camera_path} on {ticket.camera_id}: {ticket.primary} failed verification ({e})")
+            return
+        self._schedule(ticket)
+
+    def _schedule(self, ticket: DeleteTicket):
+        with self._condition:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(ticket.camera_id, now))
+            self._next_slot[ticket.camera_id] = slot + self.interval
+            heapq.heappush(self._queue, (slot, next(self._sequence), ticket))
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if not self._queue:
+                        if self._closing:
+                            return
+                        self._condition.wait()
+                        continue
+                    # Once the downloads are done the spacing is no longer needed
+                    delay = 0 if self._closing else self._queue[0][0] - time.monotonic()
+                    if delay <= 0:
+                        ticket = heapq.heappop(self._queue)[2]
+                        break
+                    self._condition.wait(delay)
+            self._deleters.submit(self._delete, ticket)
+
+    def _delete(self, ticket: DeleteTicket):
+        camera_ip = self.camera_ips.get(ticket.camera_id)
+        if not camera_ip:
+            logger.warning(f"No IP for camera {ticket.camera_id}, {ticket.camera_path} is not deleted")
+            return
+        while True:
+            ticket.attempts += 1
+            try:
+                response = self.session.get(media_delete_url(camera_ip, ticket.camera_path), timeout=self.timeout)
+                response.raise_for_status()
+                break
+            except requests.RequestException as e:
+                if ticket.attempts >= self.MAX_ATTEMPTS:
+                    with self._condition:
+                        self.kept += 1
+                    logger.error(f"Could not delete {ticket.camera_path} on {ticket.camera_id}: {e}")
+                    return
+                logger.warning(f"Deleting {ticket.camera_path} on {ticket.camera_id} failed, retrying: {e}")
+                time.sleep(self.interval)
+        with self._condition:
+            self.deleted += 1
+        logger.info(f"Deleted {ticket.camera_path} from {ticket.camera_id}")
+        try:
+            self.media_index.mark_deleted(ticket.media_key)
+        except Exception as e:
+            logger.warning(f"Failed to update media index for {ticket.camera_path}: {e}")
+
+    def close(self, drain: bool = True):
+        """Stop after the queued deletes, or drop them with drain=False"""
+        self._verifier.shutdown(wait=True)
+        with self._condition:
+            if not drain:
+                dropped = len(self._queue) + len(self._tickets)
+                if dropped:
+                    logger.info(f"{dropped} verified files stay on the cameras, the session was cancelled")
+                self._queue.clear()
+            self._tickets.clear()
+            self._closing = True
+            self._condition.notify()
+        self._thread.join()
+        self._deleters.shutdown(wait=True)
+        logger.info(f"Deleted {self.deleted} files from the cameras, kept {self.kept} that could not be verified")
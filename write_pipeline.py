@@ -0,0 +1,318 @@
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from file_transfer import write_at
+
+logger = logging.getLogger(__name__)
+
+class BufferPool:
+    """Bounded set of reusable buffers shared by all readers
+
+    Buffers are allocated on first use. Readers block in `acquire` when
+    every buffer is waiting for a writer, which bounds memory and slows the
+    network down to what the disks take.
+    """
+
+    def __init__(self, count: int, size: int):
+        self.count = count
+        self.size = size
+        self.created = 0
+        self._free: "queue.Queue[memoryview]" = queue.Queue()
+        self._lock = threading.Lock()
+        self.wait_time = 0.0  # Seconds readers spent waiting for a free buffer
+
+    def acquire(self) -> memoryview:
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self.created < self.count:
+                self.created += 1
+                return memoryview(bytearray(self.size))
+        started = time.monotonic()
+        buffer = self._free.get()
+        with self._lock:
+            self.wait_time += time.monotonic() - started
+        return buffer
+
+    def try_acquire(self, reserve: int = 0) -> Optional[memoryview]:
+        """A buffer without waiting, None unless `reserve` more stay available to the readers"""
+        with self._lock:
+            if self._free.qsize() + self.count - self.created <= reserve:
+                return None
+            try:
+                return self._free.get_nowait()
+            except queue.Empty:
+                pass
+            if self.created < self.count:
+                self.created += 1
+                return memoryview(bytearray(self.size))
+        return None
+
+    def release(self, buffer: memoryview):
+        self._free.put(buffer)
+
+    @property
+    def in_use(self) -> int:
+        return self.created - self._free.qsize()
+
+def _shared_release(pool: BufferPool, count: int) -> Callable[[memoryview], None]:
+    """Release callback returning a buffer to the pool after `count` writes of it"""
+    remaining = [count]
+    lock = threading.Lock()
+
+    def release(buffer: memoryview):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            pool.release(buffer)
+    return release
+
+class LagBudget:
+    """Bytes a destination may have queued before its mirrors stop taking data"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, length: int) -> bool:
+        with self._lock:
+            if self.pending + length > self.limit:
+                return False
+            self.pending += length
+            return True
+
+    def release(self, length: int):
+        with self._lock:
+            self.pending -= length
+
+class MirrorTarget:
+    """Further destination of a file, written from the buffers of the primary
+
+    The mirror gets every buffer of the primary streams while its
+    destination stays within its lag budget. Once the destination falls
+    further behind, the mirror detaches so it cannot hold back the primary;
+    the ranges it missed (`gaps`) are copied from the primary file later.
+    """
+
+    def __init__(self, fd: int, writer: 'DiskWriter', budget: LagBudget):
+        self.fd = fd
+        self.writer = writer
+        self.budget = budget
+        self.detached = False
+        self.error: Optional[Exception] = None
+        self._written: List[Tuple[int, int]] = []
+        self._pending = 0
+        self._done = threading.Condition()
+
+    def reserve(self, length: int) -> bool:
+        """Take a buffer unless the mirror detached or its destination lags too far"""
+        if self.detached or self.error is not None:
+            return False
+        if not self.budget.reserve(length):
+            self.detached = True
+            return False
+        with self._done:
+            self._pending += 1
+        return True
+
+    def _completed(self, offset: int, length: int, error: Optional[Exception]):
+        self.budget.release(length)
+        with self._done:
+            self._pending -= 1
+            if error is not None:
+                self.error = self.error or error
+            else:
+                self._written.append((offset, offset + length))
+            self._done.notify_all()
+
+    def wait(self):
+        """Wait until every queued write of the mirror is finished"""
+        with self._done:
+            while self._pending:
+                self._done.wait()
+
+    def gaps(self, size: int) -> List[Tuple[int, int]]:
+        """Ranges of the file the mirror did not receive, as (start, end)"""
+        gaps = []
+        position = 0
+        with self._done:
+            written = sorted(self._written)
+        for start, end in written:
+            if start > position:
+                gaps.append((position, start))
+            position = max(position, end)
+        if position < size:
+            gaps.append((position, size))
+        return gaps
+
+class WriteStream:
+    """Writes of one file, queued to the writer of its device in order"""
+
+    def __init__(self, writer: 'DiskWriter', fd: int, mirrors: Sequence[MirrorTarget] = ()):
+        self.writer = writer
+        self.fd = fd
+        self.mirrors = list(mirrors)
+        self.written = 0
+        self.error: Optional[Exception] = None
+        self._pending = 0
+        self._done = threading.Condition()
+
+    def submit(self, buffer: memoryview, length: int, offset: int):
+        with self._done:
+            self._pending += 1
+        mirrors = [mirror for mirror in self.mirrors if mirror.reserve(length)]
+        if not mirrors:
+            self.writer.put(self, buffer, length, offset, self.writer.pool.release)
+            return
+        # The buffer goes back to the pool once the primary and every mirror wrote it
+        release = _shared_release(self.writer.pool, len(mirrors) + 1)
+        self.writer.put(self, buffer, length, offset, release)
+        for mirror in mirrors:
+            mirror.writer.put(mirror, buffer, length, offset, release)
+
+    def _completed(self, offset: int, length: int, error: Optional[Exception]):
+        with self._done:
+            self._pending -= 1
+            if error is not None:
+                self.error = self.error or error
+            else:
+                self.written += length
+            self._done.notify_all()
+
+    def wait(self):
+        """Wait until every queued write of the file is finished"""
+        with self._done:
+            while self._pending:
+                self._done.wait()
+
+    def drain(self):
+        """Wait for the queued writes and raise the first write error"""
+        self.wait()
+        if self.error is not None:
+            raise self.error
+
+class DiskWriter:
+    """Thread doing all writes for one destination device"""
+
+    def __init__(self, device: int, pool: BufferPool):
+        self.device = device
+        self.pool = pool
+        self.bytes_written = 0
+        self.idle_time = 0.0  # Seconds the writer waited for data
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"writer-{device}", daemon=True)
+        self._thread.start()
+
+    def put(self, stream, buffer: memoryview, length: int, offset: int,
+            release: Callable[[memoryview], None]):
+        self._queue.put((stream, buffer, length, offset, release))
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            started = time.monotonic()
+            item = self._queue.get()
+            self.idle_time += time.monotonic() - started
+            if item is None:
+                return
+            stream, buffer, length, offset, release = item
+            # Writes queued after a failed one are skipped and fail with it, they never count as written
+            error = stream.error
+            try:
+                if error is None:
+                    write_at(stream.fd, buffer[:length], offset, self._lock)
+                    self.bytes_written += length
+            except (OSError, ValueError) as e:
+                logger.error(f"Write to device {self.device} failed: {e}")
+                error = e
+            finally:
+                release(buffer)
+            stream._completed(offset, length, error)
+
+class WritePipeline:
+    """Decouples network readers from disk writers
+
+    Readers fill buffers from a bounded pool and hand them to the writer
+    thread of the destination device, so camera links and disks work at the
+    same time and every device gets large sequential writes from one thread.
+    """
+
+    def __init__(self, buffers: int = 32, buffer_size: int = 4 * 1024 * 1024):
+        self.pool = BufferPool(buffers, buffer_size)
+        self._writers: Dict[int, DiskWriter] = {}
+        self._lock = threading.Lock()
+
+    def _writer_for(self, fd: int) -> DiskWriter:
+        device = os.fstat(fd).st_dev
+        with self._lock:
+            writer = self._writers.get(device)
+            if writer is None:
+                writer = self._writers[device] = DiskWriter(device, self.pool)
+                logger.info(f"Started disk writer for device {device}")
+        return writer
+
+    def open_stream(self, fd: int) -> WriteStream:
+        """Write stream for an open file, served by the writer of its device"""
+        return WriteStream(self._writer_for(fd), fd)
+
+    def open_mirror(self, fd: int, budget: LagBudget) -> MirrorTarget:
+        """Mirror of the next file into another open file, served by the writer of its device"""
+        return MirrorTarget(fd, self._writer_for(fd), budget)
+
+    def mirrored(self, mirrors: Sequence[MirrorTarget]) -> 'MirroredPipeline':
+        """Pipeline whose streams also write every buffer to the mirrors"""
+        return MirroredPipeline(self, mirrors)
+
+    def metrics(self) -> dict:
+        """Queue occupancy and wait times that show which side limits the copy
+
+        Readers waiting for buffers means the disks are the bottleneck,
+        writers waiting for data means the cameras are.
+        """
+        with self._lock:
+            writers = list(self._writers.values())
+        reader_wait = self.pool.wait_time
+        writer_idle = sum(w.idle_time for w in writers) / max(len(writers), 1)
+        return {
+            "buffers_total": self.pool.count,
+            "buffers_in_use": self.pool.in_use,
+            "write_queues": {w.device: w.queued for w in writers},
+            "bytes_written": sum(w.bytes_written for w in writers),
+            "reader_wait_s": round(reader_wait, 2),
+            "writer_idle_s": round(writer_idle, 2),
+            "bottleneck": "disk" if reader_wait > writer_idle else "network"
+        }
+
+    def close(self):
+        with self._lock:
+            writers = list(self._writers.values())
+            self._writers.clear()
+        for writer in writers:
+            writer.close()
+
+class MirroredPipeline:
+    """WritePipeline view for one file that fans its writes out to mirrors"""
+
+    def __init__(self, pipeline: WritePipeline, mirrors: Sequence[MirrorTarget]):
+        self.pipeline = pipeline
+        self.pool = pipeline.pool
+        self.mirrors = list(mirrors)
+
+    def open_stream(self, fd: int) -> WriteStream:
+        return WriteStream(self.pipeline._writer_for(fd), fd, self.mirrors)